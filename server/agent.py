@@ -3,18 +3,21 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import json
 import logging
 import os
 import uuid
 from dataclasses import asdict, dataclass
-from typing import Any, Dict
+from typing import Any
 
 from dotenv import load_dotenv
 from livekit import rtc
 from livekit.agents import (
     AutoSubscribe,
     JobContext,
+    JobExecutorType,
+    JobRequest,
     WorkerOptions,
     WorkerType,
     cli,
@@ -22,13 +25,19 @@ from livekit.agents import (
 )
 from livekit.plugins import openai
 
+import metrics
+from agent_resources import AgentResources, JobSlots, prewarm
 from multimodal_agent import CustomMultimodalAgent  # Import the custom agent
+from transcription_publisher import TranscriptionPublisher
 
 load_dotenv()
 
 logger = logging.getLogger("my-worker")
 logger.setLevel(logging.INFO)
 
+# rooms this worker process serves at once (AGENT_MAX_JOBS)
+job_slots = JobSlots.from_env()
+
 @dataclass
 class SessionConfig:
     openai_api_key: str
@@ -55,16 +64,23 @@ class SessionConfig:
         return modalities_map.get(modalities, ["text", "audio"])
 
 
-def parse_session_config(data: Dict[str, Any]) -> SessionConfig:
+@functools.lru_cache(maxsize=32)
+def _parse_turn_detection(data: str) -> openai.realtime.ServerVadOptions:
+    # attributes are re-parsed on every change of any attribute, the slider
+    # value is usually the same string as last time
+    turn_detection_json = json.loads(data)
+    return openai.realtime.ServerVadOptions(
+        threshold=turn_detection_json.get("threshold", 0.5),
+        prefix_padding_ms=turn_detection_json.get("prefix_padding_ms", 200),
+        silence_duration_ms=turn_detection_json.get("silence_duration_ms", 300),
+    )
+
+
+def parse_session_config(data: dict[str, Any]) -> SessionConfig:
     turn_detection = None
 
     if data.get("turn_detection"):
-        turn_detection_json = json.loads(data.get("turn_detection"))
-        turn_detection = openai.realtime.ServerVadOptions(
-            threshold=turn_detection_json.get("threshold", 0.5),
-            prefix_padding_ms=turn_detection_json.get("prefix_padding_ms", 200),
-            silence_duration_ms=turn_detection_json.get("silence_duration_ms", 300),
-        )
+        turn_detection = _parse_turn_detection(data.get("turn_detection"))
     else:
         turn_detection = openai.realtime.DEFAULT_SERVER_VAD_OPTIONS
 
@@ -82,7 +98,56 @@ def parse_session_config(data: Dict[str, Any]) -> SessionConfig:
     return config
 
 
+# participant attributes / metadata keys parse_session_config reads; others
+# (video_id, playback_position) never change the session
+_SESSION_ATTRIBUTES = frozenset(
+    {
+        "instructions",
+        "voice",
+        "temperature",
+        "max_output_tokens",
+        "modalities",
+        "turn_detection",
+    }
+)
+
+# SessionConfig fields that session.session_update accepts
+_SESSION_UPDATE_FIELDS = (
+    "instructions",
+    "voice",
+    "temperature",
+    "max_response_output_tokens",
+    "turn_detection",
+    "modalities",
+)
+
+
+def session_config_changes(
+    applied: SessionConfig, new: SessionConfig
+) -> dict[str, Any]:
+    """``session_update`` arguments for the fields of ``new`` that differ."""
+    return {
+        name: getattr(new, name)
+        for name in _SESSION_UPDATE_FIELDS
+        if getattr(new, name) != getattr(applied, name)
+    }
+
+
+async def request_fnc(req: JobRequest):
+    if not job_slots.reserve():
+        logger.info(f"rejecting job {req.id}: {job_slots.limit} rooms in progress")
+        await req.reject()
+        return
+    await req.accept()
+
+
 async def entrypoint(ctx: JobContext):
+    job_slots.start()
+
+    async def release_slot():
+        job_slots.finish()
+
+    ctx.add_shutdown_callback(release_slot)
     logger.info(f"connecting to room {ctx.room.name}")
     await ctx.connect(auto_subscribe=AutoSubscribe.AUDIO_ONLY)
 
@@ -94,6 +159,9 @@ async def entrypoint(ctx: JobContext):
 
 
 def run_multimodal_agent(ctx: JobContext, participant: rtc.Participant):
+    # built by prewarm before the job was assigned; None if prewarm is off
+    resources: AgentResources | None = ctx.proc.userdata.get("resources")
+
     metadata = json.loads(participant.metadata)
     config = parse_session_config(metadata)
     logger.info(f"starting omni assistant with config: {config.to_dict()}")
@@ -108,7 +176,9 @@ def run_multimodal_agent(ctx: JobContext, participant: rtc.Participant):
         turn_detection=config.turn_detection,
     )
     # Use the CustomMultimodalAgent instead of the default one
-    assistant = CustomMultimodalAgent(model=model)
+    assistant = CustomMultimodalAgent(
+        model=model, resources=resources, instructions=config.instructions
+    )
     assistant.start(ctx.room)
     session = model.sessions[0]
 
@@ -121,50 +191,54 @@ def run_multimodal_agent(ctx: JobContext, participant: rtc.Participant):
         )
         session.response.create()
 
+    # attribute changes arrive in bursts while the user drags a slider; apply
+    # at most one session_update per interval, with only the changed fields
+    applied_config = config
+    update_task: asyncio.Task | None = None
+    update_interval = float(os.getenv("SESSION_UPDATE_DEBOUNCE_MS", "250")) / 1000
+
+    async def apply_attribute_changes():
+        nonlocal applied_config, update_task
+        await asyncio.sleep(update_interval)
+        update_task = None
+        # attributes override the token metadata the session started from;
+        # keys missing from the attributes keep their metadata value
+        new_config = parse_session_config(
+            {**json.loads(participant.metadata), **participant.attributes}
+        )
+        changes = session_config_changes(applied_config, new_config)
+        if not changes:
+            return
+        logger.info(f"participant attributes changed: {changes}, participant: {participant.identity}")
+        # through the agent, which appends the retrieved context to new instructions
+        assistant.update_session(**changes)
+        applied_config = new_config
+
     @ctx.room.on("participant_attributes_changed")
     def on_attributes_changed(
         changed_attributes: dict[str, str], changed_participant: rtc.Participant
     ):
+        nonlocal update_task
         if changed_participant != participant:
             return
-
-        new_config = parse_session_config(
-            {**participant.attributes, **changed_attributes}
-        )
-        logger.info(f"participant attributes changed: {new_config.to_dict()}, participant: {changed_participant.identity}")
-        session = model.sessions[0]
-        session.session_update(
-            instructions=new_config.instructions,
-            voice=new_config.voice,
-            temperature=new_config.temperature,
-            max_response_output_tokens=new_config.max_response_output_tokens,
-            turn_detection=new_config.turn_detection,
-            modalities=new_config.modalities,
-        )
-
-    async def send_transcription(
-        ctx: JobContext,
-        participant: rtc.Participant,
-        track_sid: str,
-        segment_id: str,
-        text: str,
-        is_final: bool = True,
-    ):
-        transcription = rtc.Transcription(
-            participant_identity=participant.identity,
-            track_sid=track_sid,
-            segments=[
-                rtc.TranscriptionSegment(
-                    id=segment_id,
-                    text=text,
-                    start_time=0,
-                    end_time=0,
-                    language="en",
-                    final=is_final,
-                )
-            ],
-        )
-        await ctx.room.local_participant.publish_transcription(transcription)
+        if changed_attributes.keys() & {"playback_position", "video_id"}:
+            # published every few seconds of playback, moves the prefetched
+            # transcript window; not part of the session config
+            assistant.update_playback_position()
+        if update_task is None and _SESSION_ATTRIBUTES.intersection(
+            changed_attributes
+        ):
+            update_task = asyncio.create_task(apply_attribute_changes())
+
+    # one ordered, coalescing publisher for every transcription update of the room
+    transcriptions = TranscriptionPublisher(
+        ctx.room,
+        interval=float(os.getenv("TRANSCRIPTION_DEBOUNCE_MS", "50")) / 1000,
+    )
+    ctx.add_shutdown_callback(transcriptions.aclose)
+    ctx.add_shutdown_callback(assistant.loop_lag.aclose)
+    if assistant.playback is not None:
+        ctx.add_shutdown_callback(assistant.playback.aclose)
 
     @session.on("response_done")
     def on_response_done(response: openai.realtime.RealtimeResponse):
@@ -194,20 +268,8 @@ def run_multimodal_agent(ctx: JobContext, participant: rtc.Participant):
         else:
             return
 
-        local_participant = ctx.room.local_participant
-        track_sid = next(
-            (
-                track.sid
-                for track in local_participant.track_publications.values()
-                if track.source == rtc.TrackSource.SOURCE_MICROPHONE
-            ),
-            None,
-        )
-
-        asyncio.create_task(
-            send_transcription(
-                ctx, local_participant, track_sid, "status-" + str(uuid.uuid4()), message
-            )
+        transcriptions.update(
+            ctx.room.local_participant, "status-" + str(uuid.uuid4()), message
         )
 
     last_transcript_id = None
@@ -220,28 +282,12 @@ def run_multimodal_agent(ctx: JobContext, participant: rtc.Participant):
         if not remote_participant:
             return
 
-        track_sid = next(
-            (
-                track.sid
-                for track in remote_participant.track_publications.values()
-                if track.source == rtc.TrackSource.SOURCE_MICROPHONE
-            ),
-            None,
-        )
         if last_transcript_id:
-            asyncio.create_task(
-                send_transcription(
-                    ctx, remote_participant, track_sid, last_transcript_id, ""
-                )
-            )
+            transcriptions.update(remote_participant, last_transcript_id, "")
 
         new_id = str(uuid.uuid4())
         last_transcript_id = new_id
-        asyncio.create_task(
-            send_transcription(
-                ctx, remote_participant, track_sid, new_id, "…", is_final=False
-            )
-        )
+        transcriptions.update(remote_participant, new_id, "…", final=False)
 
     @session.on("input_speech_transcription_completed")
     def on_input_speech_transcription_completed(
@@ -253,19 +299,7 @@ def run_multimodal_agent(ctx: JobContext, participant: rtc.Participant):
             if not remote_participant:
                 return
 
-            track_sid = next(
-                (
-                    track.sid
-                    for track in remote_participant.track_publications.values()
-                    if track.source == rtc.TrackSource.SOURCE_MICROPHONE
-                ),
-                None,
-            )
-            asyncio.create_task(
-                send_transcription(
-                    ctx, remote_participant, track_sid, last_transcript_id, ""
-                )
-            )
+            transcriptions.update(remote_participant, last_transcript_id, "")
             last_transcript_id = None
 
     @session.on("input_speech_transcription_failed")
@@ -278,27 +312,28 @@ def run_multimodal_agent(ctx: JobContext, participant: rtc.Participant):
             if not remote_participant:
                 return
 
-            track_sid = next(
-                (
-                    track.sid
-                    for track in remote_participant.track_publications.values()
-                    if track.source == rtc.TrackSource.SOURCE_MICROPHONE
-                ),
-                None,
-            )
-
             error_message = "⚠️ Transcription failed"
-            asyncio.create_task(
-                send_transcription(
-                    ctx,
-                    remote_participant,
-                    track_sid,
-                    last_transcript_id,
-                    error_message,
-                )
-            )
+            transcriptions.update(remote_participant, last_transcript_id, error_message)
             last_transcript_id = None
 
 
 if __name__ == "__main__":
-    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint, worker_type=WorkerType.ROOM))
+    # thread: all rooms of the worker share one process and one set of
+    # prewarmed resources; process: one room per prewarmed process
+    executor = JobExecutorType(os.getenv("AGENT_EXECUTOR", "thread"))
+    metrics_port = os.getenv("AGENT_METRICS_PORT")
+    if metrics_port:
+        # job processes record into files the worker aggregates
+        if executor == JobExecutorType.PROCESS:
+            metrics.enable_multiprocess()
+        metrics.start_metrics_server(int(metrics_port))
+        logger.info(f"serving metrics on port {metrics_port}")
+    cli.run_app(
+        WorkerOptions(
+            entrypoint_fnc=entrypoint,
+            request_fnc=request_fnc,
+            prewarm_fnc=prewarm,
+            job_executor_type=executor,
+            worker_type=WorkerType.ROOM,
+        )
+    )
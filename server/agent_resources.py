@@ -0,0 +1,202 @@
+"""Retrieval resources shared by every room a LiveKit worker process serves.
+
+Building them per job (an OpenAI client, the Pinecone client and index handle,
+the SQLite embedding cache, a retrieval thread pool) put their construction and
+the first TLS handshakes on the path of the user's first question. Instead one
+:class:`AgentResources` exists per process: :func:`prewarm` builds it and opens
+its connections from the worker's prewarm hook, before a job is assigned, and
+every :class:`~multimodal_agent.CustomMultimodalAgent` in that process reuses
+it. The transcription tokenizers are module-level defaults of
+``AgentTranscriptionOptions`` and are already shared.
+
+:class:`JobSlots` caps how many rooms one worker accepts at a time.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+import httpx
+import openai
+
+from embeddings import (
+    CachedEmbedder,
+    EmbeddingCache,
+    EmbeddingProfile,
+    OpenAIEmbedder,
+)
+from ingest import ManifestStore
+from lexical import LexicalStore
+from vector_store import VectorStore, open_vector_store
+
+if TYPE_CHECKING:
+    from livekit.agents import JobProcess
+
+logger = logging.getLogger("overlap-agent-resources")
+
+WARMUP_NAMESPACE = "__warmup__"
+
+
+class AgentResources:
+    """Thread-safe clients and caches used by the agent's retrieval.
+
+    Parameters
+    ----------
+    retrieval_threads
+        Size of the pool running the blocking embed + query calls of all rooms
+        in the process.
+    max_connections
+        Size of the OpenAI HTTP connection pool.
+    """
+
+    def __init__(
+        self,
+        *,
+        index_name: str | None = "overlap",
+        retrieval_threads: int = 4,
+        max_connections: int = 16,
+    ):
+        self.openai = openai.OpenAI(
+            api_key=os.getenv("OPENAI_API_KEY_EMBEDDINGS"),
+            http_client=openai.DefaultHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections,
+                )
+            ),
+        )
+        # must match the profile the server ingested with (same env vars)
+        self.profile = EmbeddingProfile.from_env()
+        self.index: VectorStore = open_vector_store(index_name, self.profile)
+        self.embedding_cache = EmbeddingCache.from_env()
+        self._raw_embedder = OpenAIEmbedder.for_profile(self.profile, self.openai)
+        self.embedder = CachedEmbedder(self._raw_embedder, self.embedding_cache)
+        self.lexical = LexicalStore()
+        # read-only here: their versions invalidate the rooms' result caches
+        self.manifests = ManifestStore()
+        self.retrieval_executor = ThreadPoolExecutor(
+            max_workers=retrieval_threads, thread_name_prefix="retrieval"
+        )
+        self.warmed = False
+
+    @classmethod
+    def from_env(cls) -> AgentResources:
+        return cls(
+            retrieval_threads=int(os.getenv("RETRIEVAL_THREADS", "4")),
+            max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "16")),
+        )
+
+    def warm(self) -> float:
+        """Open the embedding and vector-store connections; returns seconds taken.
+
+        Embeds a constant string with the uncached embedder (the point is the
+        request, not the vector) and queries an empty namespace with it.
+        """
+        started = time.perf_counter()
+        vector = self._raw_embedder.embed(["warmup"])[0]
+        self.index.query(
+            vector=vector, top_k=1, namespace=WARMUP_NAMESPACE, include_metadata=False
+        )
+        self.warmed = True
+        return time.perf_counter() - started
+
+    def close(self) -> None:
+        self.retrieval_executor.shutdown(wait=False, cancel_futures=True)
+        self.index.flush()
+        self.embedding_cache.close()
+        self.openai.close()
+
+
+_shared: AgentResources | None = None
+_shared_lock = threading.Lock()
+
+
+def shared_resources() -> AgentResources:
+    """The process-wide :class:`AgentResources`, built on first use."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            started = time.perf_counter()
+            _shared = AgentResources.from_env()
+            logger.info(
+                "built agent resources in process %d (%.0f ms)",
+                os.getpid(),
+                (time.perf_counter() - started) * 1000,
+            )
+        return _shared
+
+
+def prewarm(proc: JobProcess) -> None:
+    """``WorkerOptions.prewarm_fnc``: build and warm the shared resources.
+
+    With the thread executor it runs once per job runner inside the same
+    process, so only the first call does any work. A failed warm-up is logged
+    and left to the first real retrieval.
+    """
+    resources = shared_resources()
+    proc.userdata["resources"] = resources
+    with _shared_lock:
+        if resources.warmed:
+            return
+        try:
+            seconds = resources.warm()
+        except Exception as e:  # noqa: BLE001
+            # best effort: OpenAI and Pinecone API errors, network errors of
+            # urllib3 and httpx, ... none of them should fail the worker
+            logger.warning(f"warming agent resources failed: {e}")
+            return
+    logger.info(f"warmed agent resources in {seconds * 1000:.0f} ms")
+
+
+class JobSlots:
+    """Counts rooms in progress against ``AGENT_MAX_JOBS``.
+
+    A slot is reserved when the worker accepts a job request and becomes
+    active when the job's entrypoint runs in this process; reservations whose
+    job never started here expire after ``reservation_ttl`` seconds.
+    """
+
+    def __init__(self, limit: int, *, reservation_ttl: float = 30.0):
+        self.limit = limit
+        self._reservation_ttl = reservation_ttl
+        self._reserved: list[float] = []
+        self._active = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> JobSlots:
+        return cls(int(os.getenv("AGENT_MAX_JOBS", "4")))
+
+    def _prune(self) -> None:
+        cutoff = time.monotonic() - self._reservation_ttl
+        self._reserved = [t for t in self._reserved if t > cutoff]
+
+    @property
+    def in_use(self) -> int:
+        with self._lock:
+            self._prune()
+            return self._active + len(self._reserved)
+
+    def reserve(self) -> bool:
+        """Take a slot for an incoming job; False when the worker is full."""
+        with self._lock:
+            self._prune()
+            if self._active + len(self._reserved) >= self.limit:
+                return False
+            self._reserved.append(time.monotonic())
+            return True
+
+    def start(self) -> None:
+        with self._lock:
+            if self._reserved:
+                self._reserved.pop(0)
+            self._active += 1
+
+    def finish(self) -> None:
+        with self._lock:
+            self._active = max(0, self._active - 1)
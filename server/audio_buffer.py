@@ -0,0 +1,99 @@
+"""Bounded int16 ring buffer between the microphone and the realtime session.
+
+Incoming frames are copied once, straight from the frame's memory into a
+preallocated buffer, and read back out in fixed-size frames into caller-owned
+memory, using memoryview slices only: no ``bytes`` objects are created on the
+way. Memory stays bounded: when the reader falls behind by more than
+``capacity`` samples the oldest audio is dropped (stale speech is useless to a
+realtime model) and counted.
+"""
+
+from __future__ import annotations
+
+
+def _samples_view(buffer) -> memoryview:
+    """int16 view of ``buffer``; ``AudioFrame.data`` already is one."""
+    if isinstance(buffer, memoryview) and buffer.format == "h":
+        return buffer
+    return memoryview(buffer).cast("B").cast("h")
+
+
+class AudioRingBuffer:
+    """Fixed-capacity FIFO of int16 samples with drop-oldest overflow.
+
+    Parameters
+    ----------
+    capacity
+        Maximum number of buffered samples.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self._capacity = capacity
+        self._buf = memoryview(bytearray(2 * capacity)).cast("h")
+        # absolute sample positions, the buffer index is ``pos % capacity``
+        self._read = 0
+        self._write = 0
+        self.written = 0  # samples accepted since creation
+        self.dropped = 0  # samples discarded because the buffer was full
+
+    def __len__(self) -> int:
+        return self._write - self._read
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def write(self, samples) -> int:
+        """Append int16 ``samples`` (any buffer, e.g. ``AudioFrame.data``).
+
+        Returns the number of samples dropped to make room.
+        """
+        data = _samples_view(samples)
+        n = len(data)
+        capacity = self._capacity
+        self.written += n
+        dropped = 0
+        if n > capacity:
+            dropped = n - capacity
+            data = data[dropped:]
+            n = capacity
+        overflow = self._write - self._read + n - capacity
+        if overflow > 0:
+            self._read += overflow
+            dropped += overflow
+        self.dropped += dropped
+
+        start = self._write % capacity
+        if start + n <= capacity:
+            self._buf[start : start + n] = data
+        else:
+            first = capacity - start
+            self._buf[start:] = data[:first]
+            self._buf[: n - first] = data[first:]
+        self._write += n
+        return dropped
+
+    def read_into(self, out: memoryview) -> bool:
+        """Fill ``out`` with the next ``len(out)`` samples if that many are buffered.
+
+        ``out`` is a writable int16 memoryview, e.g. the ``data`` of a reused
+        ``AudioFrame``.
+        """
+        n = len(out)
+        if self._write - self._read < n:
+            return False
+        capacity = self._capacity
+        start = self._read % capacity
+        if start + n <= capacity:
+            out[:] = self._buf[start : start + n]
+        else:
+            first = capacity - start
+            out[:first] = self._buf[start:]
+            out[first:] = self._buf[: n - first]
+        self._read += n
+        return True
+
+    def clear(self) -> None:
+        self._read = self._write
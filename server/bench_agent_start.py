@@ -0,0 +1,95 @@
+"""Job start latency of the agent with and without prewarmed resources.
+
+A job is "started" once its retrieval dependencies exist and the first
+question's embedding + vector query have returned. Without prewarm the job
+builds :class:`AgentResources` itself and pays the connection setup on that
+first question; with prewarm both happened before the job was assigned::
+
+    python bench_agent_start.py --trials 20 --connect-ms 150
+
+The embeddings API is the stub from ``bench_server.py``; ``--connect-ms`` is
+slept once per new connection to stand in for the TCP + TLS handshake with the
+real API. The vector store is the local backend (no network), so the Pinecone
+client's own start-up and handshake are not part of the numbers.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from agent_resources import AgentResources
+from bench_server import StubOpenAIHandler, percentile, start_stub
+
+
+class HandshakeStubHandler(StubOpenAIHandler):
+    connect_latency = 0.15
+
+    def setup(self):
+        super().setup()
+        time.sleep(self.connect_latency)
+
+
+def first_question(resources, question: str) -> None:
+    vector = resources.embedder.embed([question])[0]
+    resources.index.query(vector=vector, top_k=5, namespace="bench")
+
+
+def run(label: str, prewarmed: bool, trials: int) -> None:
+    samples = []
+    for i in range(trials):
+        if prewarmed:
+            resources = AgentResources.from_env()
+            resources.warm()
+        started = time.perf_counter()
+        if not prewarmed:
+            resources = AgentResources.from_env()
+        first_question(resources, f"what did they say about topic {label} {i}?")
+        samples.append(time.perf_counter() - started)
+        resources.close()
+
+    print(
+        f"{label:<12} mean={statistics.mean(samples) * 1000:>7.1f} ms  "
+        f"p50={percentile(samples, 50) * 1000:>7.1f} ms  "
+        f"p95={percentile(samples, 95) * 1000:>7.1f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--connect-ms", type=float, default=150.0)
+    parser.add_argument("--backend-latency-ms", type=float, default=50.0)
+    parser.add_argument("--dims", type=int, default=256)
+    args = parser.parse_args()
+
+    handler = type(
+        "Handler",
+        (HandshakeStubHandler,),
+        {"connect_latency": args.connect_ms / 1000},
+    )
+    stub = start_stub(args.backend_latency_ms / 1000, args.dims, handler=handler)
+    with tempfile.TemporaryDirectory(prefix="overlap-bench-") as data_dir:
+        os.environ.update(
+            {
+                "OVERLAP_DATA_DIR": data_dir,
+                "VECTOR_BACKEND": "local",
+                "LOCAL_INDEX_DIR": os.path.join(data_dir, "index"),
+                "EMBEDDING_CACHE_PATH": "",
+                "OPENAI_BASE_URL": f"http://127.0.0.1:{stub.server_address[1]}/v1",
+                "OPENAI_API_KEY_EMBEDDINGS": "stub",
+                "EMBEDDING_DIMENSIONS": str(args.dims),
+            }
+        )
+        try:
+            run("cold", prewarmed=False, trials=args.trials)
+            run("prewarmed", prewarmed=True, trials=args.trials)
+        finally:
+            stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
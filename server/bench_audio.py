@@ -0,0 +1,136 @@
+"""Micro-benchmark for the agent's microphone -> realtime session audio path.
+
+Feeds 10ms 24 kHz frames (what ``rtc.AudioStream`` yields) through the old
+path (``frame.data.tobytes()`` into ``AudioByteStream``, a new ``AudioFrame``
+per 100ms chunk) and through :class:`AudioRingBuffer` with one reused output
+frame, and reports CPU time and allocations per second of audio::
+
+    python bench_audio.py --seconds 600
+
+The LiveKit classes are replaced by stand-ins with the same copy behaviour
+(``AudioFrame`` copies its data into a ``bytearray``), so it runs without the
+SDK.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from audio_buffer import AudioRingBuffer
+
+SAMPLE_RATE = 24000
+INPUT_SAMPLES = 240  # 10ms
+OUTPUT_SAMPLES = 2400  # 100ms
+
+
+class Frame:
+    """``rtc.AudioFrame`` stand-in: owns a bytearray, exposes an int16 view."""
+
+    def __init__(self, data) -> None:
+        self._data = bytearray(data)
+
+    @property
+    def data(self) -> memoryview:
+        return memoryview(self._data).cast("h")
+
+
+class ByteStream:
+    """``utils.audio.AudioByteStream.write`` as in livekit-agents 0.10."""
+
+    def __init__(self, samples_per_channel: int) -> None:
+        self._bytes_per_frame = samples_per_channel * 2
+        self._buf = bytearray()
+
+    def write(self, data: bytes) -> list[Frame]:
+        self._buf.extend(data)
+        frames = []
+        while len(self._buf) >= self._bytes_per_frame:
+            frame_data = self._buf[: self._bytes_per_frame]
+            self._buf = self._buf[self._bytes_per_frame :]
+            frames.append(Frame(frame_data))
+        return frames
+
+
+class Sink:
+    def __init__(self) -> None:
+        self.frames = 0
+
+    def append(self, frame: Frame) -> None:
+        self.frames += 1
+
+
+def make_frames(count: int) -> list[Frame]:
+    rng = np.random.default_rng(0)
+    return [
+        Frame(rng.integers(-3000, 3000, INPUT_SAMPLES, dtype=np.int16).tobytes())
+        for _ in range(count)
+    ]
+
+
+class BytestreamPath:
+    def __init__(self, sink: Sink) -> None:
+        self._stream = ByteStream(OUTPUT_SAMPLES)
+        self._sink = sink
+
+    def push(self, frame: Frame) -> None:
+        for f in self._stream.write(frame.data.tobytes()):
+            self._sink.append(f)
+
+
+class RingPath:
+    def __init__(self, sink: Sink) -> None:
+        self._ring = AudioRingBuffer(SAMPLE_RATE * 2)
+        self._out = Frame(bytes(OUTPUT_SAMPLES * 2))
+        self._out_samples = self._out.data
+        self._sink = sink
+
+    def push(self, frame: Frame) -> None:
+        self._ring.write(frame.data)
+        while self._ring.read_into(self._out_samples):
+            self._sink.append(self._out)
+
+
+def measure(label: str, path_cls, frames: list[Frame], seconds: float) -> None:
+    sink = Sink()
+    path = path_cls(sink)
+    started = time.process_time()
+    for frame in frames:
+        path.push(frame)
+    cpu = time.process_time() - started
+
+    # bytes allocated while handling each frame, from a traced run on a sample
+    traced = frames[: max(1, len(frames) // 10)]
+    path = path_cls(Sink())
+    allocated = 0
+    tracemalloc.start()
+    for frame in traced:
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        path.push(frame)
+        allocated += tracemalloc.get_traced_memory()[1] - current
+    tracemalloc.stop()
+    traced_seconds = len(traced) * INPUT_SAMPLES / SAMPLE_RATE
+
+    print(
+        f"{label:<12} {cpu / seconds * 1e6:>8.1f} us CPU per audio second  "
+        f"{allocated / traced_seconds / 1024:>8.1f} KiB allocated per audio second  "
+        f"frames out={sink.frames}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=600.0)
+    args = parser.parse_args()
+
+    frames = make_frames(int(args.seconds * SAMPLE_RATE / INPUT_SAMPLES))
+    measure("bytestream", BytestreamPath, frames, args.seconds)
+    measure("ring", RingPath, frames, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
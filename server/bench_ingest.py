@@ -0,0 +1,141 @@
+"""Offline benchmark for the ingest pipeline.
+
+Uses fake embedding and vector-store backends that sleep to simulate network
+round trips, so lines/sec can be compared without API keys::
+
+    python bench_ingest.py --lines 2500 --rtt-ms 40
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import threading
+import time
+from collections.abc import Sequence
+
+from ingest import IngestOptions, ingest_transcript
+
+
+class FakeEmbedder:
+    model = "fake"
+
+    def __init__(self, dims: int, rtt: float, per_item: float):
+        self._vector = [0.0] * dims
+        self._rtt = rtt
+        self._per_item = per_item
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def embed(self, texts: Sequence[str]) -> list[list[float]]:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self._rtt + self._per_item * len(texts))
+        return [self._vector for _ in texts]
+
+
+class FakeIndex:
+    def __init__(self, rtt: float):
+        self._rtt = rtt
+        self.vectors = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors: list[tuple], namespace: str | None = None) -> None:
+        time.sleep(self._rtt)
+        with self._lock:
+            self.calls += 1
+            self.vectors += len(vectors)
+
+    def delete(self, ids: list[str], namespace: str | None = None) -> None:
+        time.sleep(self._rtt)
+
+    def flush(self) -> None:
+        pass
+
+
+def make_transcript(lines: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    words = [
+        "the",
+        "podcast",
+        "guest",
+        "talks",
+        "about",
+        "startups",
+        "models",
+        "data",
+        "growth",
+        "markets",
+    ]
+    transcript, start = [], 0.0
+    for _ in range(lines):
+        duration = rng.uniform(1.5, 5.0)
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(3, 8)))
+        transcript.append({"text": text, "start": start, "duration": duration})
+        start += duration
+    return transcript
+
+
+def run(label: str, transcript: list[dict], opts: IngestOptions, args) -> None:
+    embedder = FakeEmbedder(args.dims, args.rtt_ms / 1000, args.per_item_us / 1e6)
+    index = FakeIndex(args.rtt_ms / 1000)
+    stats = ingest_transcript(
+        transcript,
+        "bench",
+        ids=[str(i) for i in range(len(transcript))],
+        embedder=embedder,
+        index=index,
+        options=opts,
+    )
+    print(
+        f"{label:<10} {stats.lines:>6} lines  {stats.seconds:>7.2f}s  "
+        f"{stats.lines_per_second:>9.1f} lines/s  "
+        f"embed calls={embedder.calls:<5} upsert calls={index.calls}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=2500)
+    parser.add_argument("--dims", type=int, default=3072)
+    parser.add_argument("--rtt-ms", type=float, default=40.0)
+    parser.add_argument("--per-item-us", type=float, default=200.0)
+    parser.add_argument(
+        "--batch-items", type=int, default=IngestOptions.max_batch_items
+    )
+    parser.add_argument(
+        "--upsert-chunk", type=int, default=IngestOptions.upsert_chunk_size
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=IngestOptions.max_concurrency
+    )
+    parser.add_argument(
+        "--baseline-lines",
+        type=int,
+        default=200,
+        help="lines used for the one-request-per-line baseline (it is slow)",
+    )
+    args = parser.parse_args()
+
+    transcript = make_transcript(args.lines)
+    run(
+        "baseline",
+        transcript[: args.baseline_lines],
+        IngestOptions(max_batch_items=1, upsert_chunk_size=1, max_concurrency=1),
+        args,
+    )
+    run(
+        "pipeline",
+        transcript,
+        IngestOptions(
+            max_batch_items=args.batch_items,
+            upsert_chunk_size=args.upsert_chunk,
+            max_concurrency=args.concurrency,
+        ),
+        args,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Latency and recall of hybrid (BM25 + vector) vs vector-only retrieval.
+
+Builds a synthetic podcast: segments about a handful of topics, some of which
+name a rare entity (a guest, a product). The stand-in embedder sums per-word
+vectors, where topic words point towards their topic and rare names only add
+a random direction, weaker than the topic: real embeddings know little about
+names they have never seen.
+Two kinds of questions are asked:
+
+* ``entity``: "what did they say about <name>", answered by the one segment
+  that names it;
+* ``topic``: a paraphrase with no word in common with the transcript,
+  answered by any segment of the topic.
+
+Embedding calls sleep ``--embed-ms`` and vector queries ``--query-ms`` to stand
+in for the network::
+
+    python bench_retrieval.py --segments 600 --questions 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import string
+import time
+
+import numpy as np
+
+from bench_server import percentile
+from lexical import BM25Index, fuse_matches
+from vector_store import LocalVectorStore
+
+TOP_K = 5
+
+
+class Corpus:
+    def __init__(self, segments: int, topics: int, dims: int, seed: int = 0):
+        rng = random.Random(seed)
+        nprng = np.random.default_rng(seed)
+
+        def word() -> str:
+            return "".join(rng.choice(string.ascii_lowercase) for _ in range(7))
+
+        self.topic_words = [[word() for _ in range(20)] for _ in range(topics)]
+        # words never used in the transcript, only in paraphrased questions
+        self.paraphrase_words = [[word() for _ in range(10)] for _ in range(topics)]
+        filler = [word() for _ in range(200)]
+        centroids = nprng.normal(size=(topics, dims))
+
+        self.vectors: dict[str, np.ndarray] = {}
+        for t in range(topics):
+            for w in self.topic_words[t] + self.paraphrase_words[t]:
+                self.vectors[w] = centroids[t] + 0.8 * nprng.normal(size=dims)
+        for w in filler:
+            self.vectors[w] = 0.5 * nprng.normal(size=dims)
+        self._nprng = nprng
+        self._dims = dims
+
+        self.ids, self.texts, self.topics = [], [], []
+        self.entities: dict[str, str] = {}  # entity -> segment id
+        for i in range(segments):
+            t = rng.randrange(topics)
+            words = rng.sample(self.topic_words[t], 6) + rng.sample(filler, 6)
+            if rng.random() < 0.3:
+                entity = word().capitalize()
+                self.entities[entity] = f"seg-{i}"
+                words.append(entity)
+            rng.shuffle(words)
+            self.ids.append(f"seg-{i}")
+            self.texts.append(" ".join(words))
+            self.topics.append(t)
+        self._rng = rng
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        out = []
+        for text in texts:
+            total = np.zeros(self._dims)
+            for w in text.lower().split():
+                if w not in self.vectors:
+                    # unseen tokens (names): random direction, weaker than topics
+                    self.vectors[w] = 0.8 * self._nprng.normal(size=self._dims)
+                total += self.vectors[w]
+            out.append((total / (np.linalg.norm(total) + 1e-9)).tolist())
+        return out
+
+    def questions(self, count: int) -> list[tuple[str, str, set[str]]]:
+        rng = self._rng
+        entities = list(self.entities.items())
+        out = []
+        for _ in range(count):
+            if rng.random() < 0.5:
+                entity, segment = rng.choice(entities)
+                out.append((f"what did they say about {entity}", "entity", {segment}))
+            else:
+                t = rng.randrange(len(self.topic_words))
+                words = " ".join(rng.sample(self.paraphrase_words[t], 3))
+                relevant = {
+                    sid for sid, topic in zip(self.ids, self.topics) if topic == t
+                }
+                out.append((f"what do they think about {words}", "topic", relevant))
+        return out
+
+
+class Retriever:
+    def __init__(self, corpus: Corpus, args):
+        self._corpus = corpus
+        self._embed_latency = args.embed_ms / 1000
+        self._query_latency = args.query_ms / 1000
+        self.store = LocalVectorStore(None)
+        metadata = [
+            {"content": text, "timestamp": i} for i, text in enumerate(corpus.texts)
+        ]
+        self.store.upsert(
+            list(zip(corpus.ids, corpus.embed(corpus.texts), metadata)),
+            namespace="bench",
+        )
+        self.lexical = BM25Index(corpus.ids, corpus.texts, metadata)
+        self.embed_calls = 0
+
+    def _vector(self, question: str) -> list:
+        time.sleep(self._embed_latency)
+        self.embed_calls += 1
+        vector = self._corpus.embed([question])[0]
+        time.sleep(self._query_latency)
+        return self.store.query(vector=vector, top_k=TOP_K, namespace="bench")[
+            "matches"
+        ]
+
+    def vector_only(self, question: str) -> list[str]:
+        return [m["id"] for m in self._vector(question)]
+
+    def hybrid(self, question: str) -> list[str]:
+        hits = self.lexical.search(question, TOP_K)
+        if self.lexical.decisive(question, hits):
+            return [hit.id for hit in hits]
+        return [m["id"] for m in fuse_matches(self._vector(question), hits, TOP_K)]
+
+
+def run(label: str, retrieve, questions) -> None:
+    latencies = []
+    found: dict[str, list[bool]] = {"entity": [], "topic": []}
+    for question, kind, relevant in questions:
+        started = time.perf_counter()
+        ids = retrieve(question)
+        latencies.append(time.perf_counter() - started)
+        found[kind].append(bool(relevant.intersection(ids)))
+    hits = [hit for kind_hits in found.values() for hit in kind_hits]
+    entity, topic = np.mean(found["entity"]), np.mean(found["topic"])
+    print(
+        f"{label:<8} recall@{TOP_K}={np.mean(hits):.2f} "
+        f"(entity {entity:.2f}, topic {topic:.2f})  "
+        f"mean={np.mean(latencies) * 1000:>6.1f} ms  "
+        f"p50={percentile(latencies, 50) * 1000:>6.1f} ms  "
+        f"p95={percentile(latencies, 95) * 1000:>6.1f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--segments", type=int, default=600)
+    parser.add_argument("--topics", type=int, default=12)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--dims", type=int, default=256)
+    parser.add_argument("--embed-ms", type=float, default=120.0)
+    parser.add_argument("--query-ms", type=float, default=40.0)
+    args = parser.parse_args()
+
+    corpus = Corpus(args.segments, args.topics, args.dims)
+    retriever = Retriever(corpus, args)
+    questions = corpus.questions(args.questions)
+
+    run("vector", retriever.vector_only, questions)
+    retriever.embed_calls = 0
+    run("hybrid", retriever.hybrid, questions)
+    print(
+        f"hybrid skipped the embedding for "
+        f"{1 - retriever.embed_calls / len(questions):.0%} of the questions"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""Load test for the production server against a local stub backend.
+
+Starts a stub of the OpenAI embeddings/chat API that sleeps to simulate
+network latency, seeds the transcript store with synthetic transcripts and
+runs ``gunicorn -c gunicorn.conf.py`` with the local vector store, once per
+worker count. Concurrent clients mix ``/transcript`` pages with
+``/process_video`` calls; latencies are reported per endpoint::
+
+    python bench_server.py --workers 1 2 4 --clients 32 --requests 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bench_ingest import make_transcript
+from transcript_store import TranscriptStore
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class StubOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.05
+    dims = 256
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, body: bytes, content_type: str = "application/json") -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.latency)
+        if self.path.endswith("/embeddings"):
+            texts = request["input"]
+            dims = request.get("dimensions", self.dims)
+            vector = [1.0 / dims**0.5] * dims
+            self._send(
+                json.dumps(
+                    {
+                        "object": "list",
+                        "model": request["model"],
+                        "data": [
+                            {"object": "embedding", "index": i, "embedding": vector}
+                            for i in range(len(texts))
+                        ],
+                        "usage": {"prompt_tokens": 0, "total_tokens": 0},
+                    }
+                ).encode()
+            )
+            return
+
+        words = ["stub", "summary", "sentence", "about", "the", "podcast"]
+        common = {"id": "stub", "created": int(time.time()), "model": "stub"}
+        if not request.get("stream"):
+            self._send(
+                json.dumps(
+                    {
+                        **common,
+                        "object": "chat.completion",
+                        "choices": [
+                            {
+                                "index": 0,
+                                "finish_reason": "stop",
+                                "message": {
+                                    "role": "assistant",
+                                    "content": " ".join(words),
+                                },
+                            }
+                        ],
+                    }
+                ).encode()
+            )
+            return
+
+        events = []
+        for word in words:
+            chunk = {
+                **common,
+                "object": "chat.completion.chunk",
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": None,
+                        "delta": {"content": f"{word} "},
+                    }
+                ],
+            }
+            events.append(f"data: {json.dumps(chunk)}\n\n")
+        events.append("data: [DONE]\n\n")
+        self._send("".join(events).encode(), "text/event-stream")
+
+
+def start_stub(
+    latency: float, dims: int, handler: type = StubOpenAIHandler
+) -> ThreadingHTTPServer:
+    handler = type("Handler", (handler,), {"latency": latency, "dims": dims})
+    stub = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    stub.daemon_threads = True
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    return stub
+
+
+def seed_transcripts(directory: str, videos: list[str], lines: int) -> None:
+    store = TranscriptStore(
+        directory, fetch=lambda video_id: make_transcript(lines, seed=hash(video_id))
+    )
+    for video_id in videos:
+        store.get(video_id)
+
+
+def wait_ready(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/healthz")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def percentile(samples: list[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def load(port: int, videos: list[str], args) -> tuple[dict[str, list[float]], int]:
+    latencies: dict[str, list[float]] = {"/transcript": [], "/process_video": []}
+    errors = 0
+    remaining = args.requests
+    lock = threading.Lock()
+
+    def client(seed: int) -> None:
+        nonlocal remaining, errors
+        rng = random.Random(seed)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+        while True:
+            with lock:
+                if remaining <= 0:
+                    break
+                remaining -= 1
+            video_id = rng.choice(videos)
+            if rng.random() < args.process_ratio:
+                path, body = "/process_video", {"videoId": video_id}
+            else:
+                offset = rng.randrange(0, args.lines, 100)
+                path = "/transcript"
+                body = {"videoId": video_id, "offset": offset, "limit": 100}
+            started = time.perf_counter()
+            try:
+                conn.request(
+                    "POST",
+                    path,
+                    json.dumps(body),
+                    {"Content-Type": "application/json"},
+                )
+                response = conn.getresponse()
+                response.read()
+                ok = response.status == 200
+            except OSError:
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                if ok:
+                    latencies[path].append(elapsed)
+                else:
+                    errors += 1
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def run(workers: int, stub_port: int, videos: list[str], args) -> None:
+    with tempfile.TemporaryDirectory(prefix="overlap-bench-") as data_dir:
+        seed_transcripts(os.path.join(data_dir, "transcripts"), videos, args.lines)
+        port = args.port
+        env = {
+            **os.environ,
+            "OVERLAP_DATA_DIR": data_dir,
+            "VECTOR_BACKEND": "local",
+            "OPENAI_BASE_URL": f"http://127.0.0.1:{stub_port}/v1",
+            "OPENAI_API_KEY_EMBEDDINGS": "stub",
+            "EMBEDDING_DIMENSIONS": str(args.dims),
+            "WEB_CONCURRENCY": str(workers),
+            "WEB_THREADS": str(args.threads),
+            "BIND": f"127.0.0.1:{port}",
+            "WEB_LOG_LEVEL": "warning",
+            "PYTHONWARNINGS": "ignore",
+        }
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"],
+            cwd=HERE,
+            env=env,
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            wait_ready(port)
+            started = time.perf_counter()
+            latencies, errors = load(port, videos, args)
+            seconds = time.perf_counter() - started
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=90)
+
+    total = sum(len(samples) for samples in latencies.values())
+    print(f"workers={workers:<3} {total / seconds:>8.1f} req/s  errors={errors}")
+    for path, samples in latencies.items():
+        print(
+            f"  {path:<15} n={len(samples):<6} "
+            f"p50={percentile(samples, 50) * 1000:>8.1f} ms  "
+            f"p99={percentile(samples, 99) * 1000:>8.1f} ms"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--videos", type=int, default=8)
+    parser.add_argument("--lines", type=int, default=1000)
+    parser.add_argument("--process-ratio", type=float, default=0.1)
+    parser.add_argument("--backend-latency-ms", type=float, default=50.0)
+    parser.add_argument("--dims", type=int, default=256)
+    parser.add_argument("--port", type=int, default=5055)
+    args = parser.parse_args()
+
+    stub = start_stub(args.backend_latency_ms / 1000, args.dims)
+    videos = [f"video{i:03d}" for i in range(args.videos)]
+    try:
+        for workers in args.workers:
+            run(workers, stub.server_address[1], videos, args)
+    finally:
+        stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
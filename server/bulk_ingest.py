@@ -0,0 +1,205 @@
+"""Ingest many videos from the command line, resumably.
+
+Runs the ``/process_video`` pipeline (see ``pipeline.py``) for every video ID
+given on the command line or in a file (one per line, ``#`` comments)::
+
+    python bulk_ingest.py --file channel.txt --workers 4 --rpm 3000 --tpm 1000000
+
+Videos are processed by ``--workers`` threads. Embedding requests that miss
+the cache share one rate limiter, so the run stays under the API's requests
+and tokens per minute. After every video its outcome is written to the
+checkpoint file; a re-run with the same checkpoint skips the videos already
+done (and, unless ``--retry-failed``, the ones that failed). A video
+interrupted halfway is ingested again, its embeddings are mostly cache hits.
+
+At the end it prints throughput and the embedding API usage and cost.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+
+from embeddings import DATA_DIR
+from jobs import Job
+from pipeline import process_video
+from rate_limit import RateLimiter
+from services import Services
+from transcript_store import is_video_id
+
+logger = logging.getLogger("overlap-bulk-ingest")
+
+EMBEDDING_PRICES = {
+    "text-embedding-3-large": 0.13,
+    "text-embedding-3-small": 0.02,
+    "text-embedding-ada-002": 0.10,
+}
+"""USD per million tokens"""
+
+
+class Checkpoint:
+    """Outcome of every video of a bulk run, saved to ``path`` after each one."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.videos: dict[str, dict] = json.load(f)["videos"]
+        except FileNotFoundError:
+            self.videos = {}
+
+    def pending(self, video_ids: list[str], *, retry_failed: bool) -> list[str]:
+        skip = {"done"} if retry_failed else {"done", "failed"}
+        return [
+            video_id
+            for video_id in video_ids
+            if self.videos.get(video_id, {}).get("status") not in skip
+        ]
+
+    def record(self, video_id: str, outcome: dict) -> None:
+        with self._lock:
+            self.videos[video_id] = {**outcome, "updated_at": time.time()}
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"videos": self.videos}, f, indent=1)
+            os.replace(tmp, self.path)
+
+
+def read_video_ids(ids: list[str], path: str | None) -> list[str]:
+    if path:
+        with open(path, encoding="utf-8") as f:
+            ids = ids + [line.split("#", 1)[0].strip() for line in f]
+    # keep the order, drop blanks and duplicates
+    return list(dict.fromkeys(video_id for video_id in ids if video_id))
+
+
+def main() -> None:
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(name)s: %(message)s")
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("video_ids", nargs="*")
+    parser.add_argument("--file", help="file with one video ID per line")
+    parser.add_argument("--workers", type=int, default=4, help="videos at once")
+    parser.add_argument(
+        "--rpm",
+        type=float,
+        default=float(os.getenv("EMBEDDING_RPM", "3000")),
+        help="embedding requests per minute, 0 for no limit",
+    )
+    parser.add_argument(
+        "--tpm",
+        type=float,
+        default=float(os.getenv("EMBEDDING_TPM", "1000000")),
+        help="embedding tokens per minute, 0 for no limit",
+    )
+    parser.add_argument(
+        "--checkpoint", default=os.path.join(DATA_DIR, "bulk_ingest.json")
+    )
+    parser.add_argument("--retry-failed", action="store_true")
+    parser.add_argument("--no-summary", action="store_true")
+    parser.add_argument("--price", type=float, help="USD per million tokens")
+    args = parser.parse_args()
+
+    video_ids = read_video_ids(args.video_ids, args.file)
+    if not video_ids:
+        parser.error("no video IDs given")
+    invalid = [video_id for video_id in video_ids if not is_video_id(video_id)]
+    if invalid:
+        parser.error(f"invalid video IDs: {', '.join(invalid)}")
+    checkpoint = Checkpoint(args.checkpoint)
+    todo = checkpoint.pending(video_ids, retry_failed=args.retry_failed)
+    print(
+        f"{len(video_ids)} videos, {len(video_ids) - len(todo)} already in "
+        f"{args.checkpoint}, {len(todo)} to process"
+    )
+
+    limiter = RateLimiter(args.rpm, args.tpm)
+    services = Services(
+        # every video runs its own pool of embedding batches
+        max_connections=max(32, args.workers * 8),
+        embedding_limiter=limiter,
+    )
+    counts = {"done": 0, "failed": 0, "lines": 0, "segments": 0, "unchanged": 0}
+    started = time.perf_counter()
+
+    def run(video_id: str) -> dict:
+        job = Job(id=uuid.uuid4().hex, key=video_id)
+        video_started = time.perf_counter()
+        try:
+            result = process_video(
+                services, video_id, job, summarize=not args.no_summary
+            )
+        except Exception as e:
+            logger.exception("%s failed", video_id)
+            return {"status": "failed", "error": str(e) or e.__class__.__name__}
+        stats = result.stats
+        return {
+            "status": "done",
+            "lines": stats.source_lines,
+            "segments": stats.lines,
+            "unchanged": stats.skipped,
+            "deleted": stats.deleted,
+            "seconds": round(time.perf_counter() - video_started, 3),
+        }
+
+    pool = ThreadPoolExecutor(max_workers=max(1, args.workers))
+    try:
+        futures = {pool.submit(run, video_id): video_id for video_id in todo}
+        for n, future in enumerate(as_completed(futures), 1):
+            video_id, outcome = futures[future], future.result()
+            checkpoint.record(video_id, outcome)
+            counts[outcome["status"]] += 1
+            if outcome["status"] == "done":
+                for key in ("lines", "segments", "unchanged"):
+                    counts[key] += outcome[key]
+                detail = (
+                    f"{outcome['segments']} embedded, {outcome['unchanged']} "
+                    f"unchanged in {outcome['seconds']:.1f}s"
+                )
+            else:
+                detail = f"failed: {outcome['error']}"
+            print(f"[{n}/{len(todo)}] {video_id}: {detail}")
+    except KeyboardInterrupt:
+        print("interrupted, finished videos are in the checkpoint")
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        pool.shutdown(wait=True)
+        seconds = time.perf_counter() - started
+        report(args, services, limiter, counts, seconds)
+        services.close()
+
+
+def report(args, services, limiter, counts, seconds) -> None:
+    api = services.api_embedder
+    model = services.embedding_profile.model
+    price = args.price if args.price is not None else EMBEDDING_PRICES.get(model)
+    cache = services.embedding_cache.stats()
+    print(
+        f"\n{counts['done']} videos done, {counts['failed']} failed "
+        f"in {seconds:.1f}s ({counts['done'] / seconds * 60:.1f} videos/min)\n"
+        f"{counts['lines']} caption lines ({counts['lines'] / seconds:.0f}/s), "
+        f"{counts['segments']} segments embedded, {counts['unchanged']} unchanged\n"
+        f"embeddings API ({model}): {api.requests} requests, {api.tokens} tokens, "
+        f"cache {cache['hits'] + cache['disk_hits']} hits / {cache['misses']} misses, "
+        f"{limiter.waited:.1f}s waiting for the rate limit"
+    )
+    if price is not None:
+        print(
+            f"embedding cost: ${api.tokens / 1e6 * price:.4f} "
+            f"(${price}/1M tokens; summaries not included)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Merge short caption fragments into overlapping retrieval chunks.
+
+YouTube captions are 3-8 word fragments; embedding each one separately costs
+roughly 10x more vectors than needed and retrieves poorly. Chunks are windows
+of consecutive entries bounded by an approximate token count and a duration,
+overlapping by a few entries so a sentence cut at a boundary is still found.
+
+Run it on a saved transcript to see how much the index shrinks::
+
+    python chunking.py transcript.json --max-tokens 200 --max-seconds 60
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English with the OpenAI tokenizers
+    return max(1, len(text) // 4)
+
+
+@dataclass(frozen=True)
+class ChunkOptions:
+    max_tokens: int = 200
+    """Upper bound on a chunk's approximate token count"""
+    max_seconds: float = 60.0
+    """Upper bound on the time span a chunk covers"""
+    overlap_lines: int = 2
+    """Entries repeated at the start of the next chunk"""
+
+    @classmethod
+    def from_env(cls) -> ChunkOptions:
+        return cls(
+            max_tokens=int(os.getenv("CHUNK_MAX_TOKENS", cls.max_tokens)),
+            max_seconds=float(os.getenv("CHUNK_MAX_SECONDS", cls.max_seconds)),
+            overlap_lines=int(os.getenv("CHUNK_OVERLAP_LINES", cls.overlap_lines)),
+        )
+
+
+def chunk_transcript(transcript: Sequence[dict], options: ChunkOptions) -> list[dict]:
+    """Group transcript entries into overlapping chunks.
+
+    Each chunk is shaped like a transcript entry (``text``, ``start``,
+    ``duration``) plus ``end`` and the inclusive source line range
+    ``first_line`` / ``last_line``.
+    """
+    chunks: list[dict] = []
+    n = len(transcript)
+    first = 0
+    while first < n:
+        last = first
+        tokens = estimate_tokens(transcript[first]["text"])
+        while last + 1 < n:
+            candidate = transcript[last + 1]
+            end = candidate["start"] + candidate["duration"]
+            next_tokens = tokens + estimate_tokens(candidate["text"])
+            if (
+                next_tokens > options.max_tokens
+                or end - transcript[first]["start"] > options.max_seconds
+            ):
+                break
+            tokens = next_tokens
+            last += 1
+
+        window = transcript[first : last + 1]
+        start = window[0]["start"]
+        end = window[-1]["start"] + window[-1]["duration"]
+        chunks.append(
+            {
+                "text": " ".join(entry["text"] for entry in window),
+                "start": start,
+                "duration": end - start,
+                "end": end,
+                "first_line": first,
+                "last_line": last,
+            }
+        )
+        if last + 1 >= n:
+            break
+        # always move forward, even when the overlap covers the whole window
+        first = max(first + 1, last + 1 - options.overlap_lines)
+    return chunks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("transcript", help="JSON list of {text, start, duration}")
+    parser.add_argument("--max-tokens", type=int, default=ChunkOptions.max_tokens)
+    parser.add_argument("--max-seconds", type=float, default=ChunkOptions.max_seconds)
+    parser.add_argument("--overlap-lines", type=int, default=ChunkOptions.overlap_lines)
+    parser.add_argument("--dims", type=int, default=3072)
+    args = parser.parse_args()
+
+    with open(args.transcript, encoding="utf-8") as f:
+        transcript = json.load(f)
+    if isinstance(transcript, dict):
+        transcript = transcript["transcript"]
+
+    chunks = chunk_transcript(
+        transcript,
+        ChunkOptions(args.max_tokens, args.max_seconds, args.overlap_lines),
+    )
+    lines = len(transcript)
+    vector_bytes = args.dims * 4
+    print(f"lines:   {lines:>7}  ({lines * vector_bytes / 1e6:.1f} MB of vectors)")
+    print(f"chunks:  {len(chunks):>7}  ({len(chunks) * vector_bytes / 1e6:.1f} MB)")
+    if lines:
+        print(f"index shrinks by {100 * (1 - len(chunks) / lines):.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""Embedding clients, profiles and the content-addressed embedding cache.
+
+The cache is shared by ingest (``server.py``) and retrieval
+(``multimodal_agent.py``): entries are keyed by ``(model, sha256(normalized
+text))`` and kept in an in-memory LRU bounded by bytes, backed by SQLite so
+they survive restarts.
+
+An :class:`EmbeddingProfile` (model, output dimensions, vector storage) is read
+from the environment by both sides, so queries are always embedded the way the
+index was built.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+import openai
+
+logger = logging.getLogger("overlap-embeddings")
+
+EMBEDDING_MODEL = "text-embedding-3-large"
+DATA_DIR = os.getenv("OVERLAP_DATA_DIR", "data")
+
+
+class Embedder(Protocol):
+    model: str
+
+    def embed(self, texts: Sequence[str]) -> list[list[float]]: ...
+
+
+NATIVE_DIMENSIONS = {
+    "text-embedding-3-large": 3072,
+    "text-embedding-3-small": 1536,
+    "text-embedding-ada-002": 1536,
+}
+
+STORAGE_TYPES = ("float32", "float16", "int8")
+
+
+@dataclass(frozen=True)
+class EmbeddingProfile:
+    """How transcript segments and questions are embedded and stored.
+
+    ``dimensions`` below the model's native size uses the API's ``dimensions``
+    parameter (text-embedding-3 models are trained so that a truncated,
+    re-normalized vector still works). ``storage`` only applies to the local
+    vector store: ``float16`` halves the matrix, ``int8`` keeps float16 rows on
+    disk and scans int8 codes in memory, rescoring the best candidates against
+    the rows.
+    """
+
+    model: str = EMBEDDING_MODEL
+    dimensions: int = 3072
+    storage: str = "float32"
+
+    def __post_init__(self):
+        if self.storage not in STORAGE_TYPES:
+            raise ValueError(f"unsupported embedding storage: {self.storage}")
+        native = NATIVE_DIMENSIONS.get(self.model)
+        if native is not None and not 0 < self.dimensions <= native:
+            raise ValueError(f"{self.model} has at most {native} dimensions")
+
+    @classmethod
+    def from_env(cls) -> EmbeddingProfile:
+        name = os.getenv("EMBEDDING_PROFILE")
+        if name:
+            if name not in PROFILES:
+                raise ValueError(f"unknown EMBEDDING_PROFILE: {name}")
+            return PROFILES[name]
+        model = os.getenv("EMBEDDING_MODEL", EMBEDDING_MODEL)
+        return cls(
+            model=model,
+            dimensions=int(
+                os.getenv("EMBEDDING_DIMENSIONS", NATIVE_DIMENSIONS.get(model, 3072))
+            ),
+            storage=os.getenv("EMBEDDING_STORAGE", "float32"),
+        )
+
+    @property
+    def api_dimensions(self) -> int | None:
+        """``dimensions`` argument of the API call, None for the native size."""
+        if self.dimensions == NATIVE_DIMENSIONS.get(self.model):
+            return None
+        return self.dimensions
+
+    @property
+    def embedding_key(self) -> str:
+        """Identity of the vectors (not of their storage), e.g. for the cache."""
+        if self.api_dimensions is None:
+            return self.model
+        return f"{self.model}@{self.dimensions}"
+
+    @property
+    def key(self) -> str:
+        return f"{self.model}-{self.dimensions}-{self.storage}"
+
+    @property
+    def is_default(self) -> bool:
+        return self == EmbeddingProfile()
+
+    @property
+    def bytes_per_vector(self) -> int:
+        """Resident index memory per vector in the local store."""
+        if self.storage == "float32":
+            return 4 * self.dimensions
+        if self.storage == "float16":
+            return 2 * self.dimensions
+        return self.dimensions + 4  # int8 codes + float32 scale
+
+
+PROFILES = {
+    "large": EmbeddingProfile(),
+    "large-1024": EmbeddingProfile(dimensions=1024),
+    "large-1024-int8": EmbeddingProfile(dimensions=1024, storage="int8"),
+    "large-256-float16": EmbeddingProfile(dimensions=256, storage="float16"),
+    "small": EmbeddingProfile("text-embedding-3-small", 1536),
+    "small-512-float16": EmbeddingProfile(
+        "text-embedding-3-small", 512, storage="float16"
+    ),
+}
+"""Named profiles selectable with ``EMBEDDING_PROFILE``"""
+
+
+class OpenAIEmbedder:
+    """Embeds a batch of texts with a single ``embeddings.create`` call.
+
+    ``model`` is the identity of the returned vectors (see
+    :attr:`EmbeddingProfile.embedding_key`), so it includes the dimensions.
+    """
+
+    def __init__(
+        self,
+        client: Any = None,
+        model: str = EMBEDDING_MODEL,
+        *,
+        dimensions: int | None = None,
+    ):
+        # the ``openai`` module itself exposes the default client's resources
+        self._client = client or openai
+        self._model = model
+        self._dimensions = dimensions
+        self.model = model if dimensions is None else f"{model}@{dimensions}"
+        # API usage, for cost reports
+        self.requests = 0
+        self.tokens = 0
+        self._usage_lock = threading.Lock()
+
+    @classmethod
+    def for_profile(
+        cls, profile: EmbeddingProfile, client: Any = None
+    ) -> OpenAIEmbedder:
+        return cls(client, profile.model, dimensions=profile.api_dimensions)
+
+    def embed(self, texts: Sequence[str]) -> list[list[float]]:
+        kwargs = {} if self._dimensions is None else {"dimensions": self._dimensions}
+        response = self._client.embeddings.create(
+            model=self._model, input=list(texts), **kwargs
+        )
+        usage = getattr(response, "usage", None)
+        with self._usage_lock:
+            self.requests += 1
+            self.tokens += getattr(usage, "total_tokens", 0) or 0
+        # the API documents ``index`` on every item, don't rely on response order
+        return [d.embedding for d in sorted(response.data, key=lambda d: d.index)]
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def text_key(model: str, text: str) -> tuple[str, bytes]:
+    return model, hashlib.sha256(normalize_text(text).encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """Two-level embedding cache: byte-bounded LRU in front of a SQLite table.
+
+    Vectors are stored as packed float32, which is what the index keeps anyway.
+    Pass ``path=None`` for a memory-only cache.
+    """
+
+    def __init__(self, path: str | None, *, max_memory_bytes: int = 64 << 20):
+        self._max_memory_bytes = max_memory_bytes
+        self._memory: OrderedDict[tuple[str, bytes], bytes] = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._db: sqlite3.Connection | None = None
+        if path is not None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL,"
+                " text_hash BLOB NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " PRIMARY KEY (model, text_hash))"
+            )
+            self._db.commit()
+
+    @classmethod
+    def from_env(cls) -> EmbeddingCache:
+        path = os.getenv(
+            "EMBEDDING_CACHE_PATH", os.path.join(DATA_DIR, "embeddings.sqlite3")
+        )
+        return cls(
+            path or None,
+            max_memory_bytes=int(os.getenv("EMBEDDING_CACHE_MEMORY_MB", "64")) << 20,
+        )
+
+    def get_many(self, model: str, texts: Sequence[str]) -> list[list[float] | None]:
+        keys = [text_key(model, text) for text in texts]
+        results: list[list[float] | None] = [None] * len(keys)
+        missing: dict[bytes, list[int]] = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                blob = self._memory.get(key)
+                if blob is not None:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    results[i] = array("f", blob).tolist()
+                else:
+                    missing.setdefault(key[1], []).append(i)
+
+            if missing and self._db is not None:
+                hashes = list(missing)
+                for start in range(0, len(hashes), 500):
+                    part = hashes[start : start + 500]
+                    rows = self._db.execute(
+                        "SELECT text_hash, vector FROM embeddings WHERE model = ?"
+                        f" AND text_hash IN ({','.join('?' * len(part))})",
+                        (model, *part),
+                    ).fetchall()
+                    for text_hash, blob in rows:
+                        self._remember((model, text_hash), blob)
+                        vector = array("f", blob).tolist()
+                        for i in missing.pop(text_hash):
+                            self.disk_hits += 1
+                            results[i] = vector
+
+            self.misses += sum(len(indices) for indices in missing.values())
+
+        return results
+
+    def put_many(
+        self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]
+    ) -> None:
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = text_key(model, text)
+                blob = array("f", vector).tobytes()
+                self._remember(key, blob)
+                rows.append((model, key[1], blob))
+
+            if self._db is not None and rows:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, text_hash, vector)"
+                    " VALUES (?, ?, ?)",
+                    rows,
+                )
+                self._db.commit()
+
+    def _remember(self, key: tuple[str, bytes], blob: bytes) -> None:
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = blob
+        self._memory_bytes += len(blob)
+        while self._memory_bytes > self._max_memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.evictions += 1
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+            }
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+class CachedEmbedder:
+    """Wraps an :class:`Embedder` so only cache misses reach the API.
+
+    Duplicate texts within a call are embedded once.
+    """
+
+    def __init__(self, embedder: Embedder, cache: EmbeddingCache):
+        self._embedder = embedder
+        self.cache = cache
+        self.model = embedder.model
+
+    def embed(self, texts: Sequence[str]) -> list[list[float]]:
+        results = self.cache.get_many(self.model, texts)
+        pending: dict[str, list[int]] = {}
+        for i, vector in enumerate(results):
+            if vector is None:
+                pending.setdefault(normalize_text(texts[i]), []).append(i)
+
+        if pending:
+            fresh_texts = list(pending)
+            fresh = self._embedder.embed(fresh_texts)
+            self.cache.put_many(self.model, fresh_texts, fresh)
+            for text, vector in zip(fresh_texts, fresh):
+                for i in pending[text]:
+                    results[i] = vector
+
+        return results  # type: ignore[return-value]
@@ -0,0 +1,164 @@
+"""Offline retrieval quality vs index memory of the embedding profiles.
+
+Runs over the transcripts already in the transcript store. A sample of each
+video's caption lines is held out as questions, and the rest is chunked the
+way ingest does it. A question is answered by a chunk whose time span covers
+its line, so it has to be found through the surrounding lines instead of by
+its own text (which would make every profile look perfect). Reported per
+profile: recall@1, recall@5 and the mean reciprocal rank of the first
+answering chunk in the top 5 results of its video's namespace::
+
+    python eval_profiles.py --profiles large large-1024 large-1024-int8 small
+
+Texts are embedded once per model at the native size through the embedding
+cache, so re-runs are free. Reduced profiles truncate and re-normalize those
+vectors, which is what the API's ``dimensions`` parameter does for the
+text-embedding-3 models. Search runs on the local vector store with each
+profile's storage.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+
+import numpy as np
+from dotenv import load_dotenv
+
+from chunking import ChunkOptions, chunk_transcript
+from embeddings import (
+    DATA_DIR,
+    NATIVE_DIMENSIONS,
+    PROFILES,
+    CachedEmbedder,
+    EmbeddingProfile,
+    OpenAIEmbedder,
+)
+from ingest import IngestOptions, iter_batches
+from services import Services
+from transcript_store import TranscriptStore
+from vector_store import LocalVectorStore
+
+TOP_K = 5
+
+
+def load_videos(directory: str, limit: int) -> dict[str, list[dict]]:
+    # never refetch: evaluate exactly what is stored
+    store = TranscriptStore(directory, ttl=float("inf"))
+    video_ids = sorted(
+        name[: -len(".npz")]
+        for name in os.listdir(directory)
+        if name.endswith(".npz") and ".tmp" not in name
+    )
+    return {video_id: store.get(video_id).entries() for video_id in video_ids[:limit]}
+
+
+def embed_all(embedder: CachedEmbedder, texts: list[str]) -> np.ndarray:
+    vectors = []
+    items = [(str(i), {"text": text}) for i, text in enumerate(texts)]
+    for batch in iter_batches(items, max_items=256, max_chars=64_000):
+        vectors.extend(embedder.embed([entry["text"] for _, entry in batch]))
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def reduce(vectors: np.ndarray, dimensions: int) -> np.ndarray:
+    truncated = vectors[:, :dimensions]
+    norms = np.linalg.norm(truncated, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return truncated / norms
+
+
+def main() -> None:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES))
+    parser.add_argument("--videos", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=50, help="per video")
+    parser.add_argument(
+        "--transcripts",
+        default=os.getenv(
+            "TRANSCRIPT_STORE_DIR", os.path.join(DATA_DIR, "transcripts")
+        ),
+        help="transcript store directory",
+    )
+    args = parser.parse_args()
+
+    profiles = [PROFILES[name] for name in args.profiles]
+    chunking = IngestOptions.from_env().chunking or ChunkOptions()
+    rng = random.Random(0)
+
+    docs: list[tuple[str, dict]] = []  # (video_id, chunk)
+    questions: list[tuple[str, str, float]] = []  # (video_id, text, start)
+    for video_id, transcript in load_videos(args.transcripts, args.videos).items():
+        lines = [i for i, e in enumerate(transcript) if len(e["text"].split()) >= 6]
+        held_out = set(rng.sample(lines, min(args.queries, len(lines))))
+        for i in sorted(held_out):
+            questions.append((video_id, transcript[i]["text"], transcript[i]["start"]))
+        kept = [e for i, e in enumerate(transcript) if i not in held_out]
+        docs.extend((video_id, chunk) for chunk in chunk_transcript(kept, chunking))
+    if not docs:
+        parser.error("no stored transcripts found")
+    if not questions:
+        parser.error("no caption lines of 6 or more words to ask about")
+
+    # the server's client: OPENAI_API_KEY_EMBEDDINGS, pooled connections
+    services = Services.from_env()
+    cache = services.embedding_cache
+    native: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+    for model in sorted({p.model for p in profiles}):
+        embedder = CachedEmbedder(OpenAIEmbedder(services.openai, model), cache)
+        native[model] = (
+            embed_all(embedder, [chunk["text"] for _, chunk in docs]),
+            embed_all(embedder, [text for _, text, _ in questions]),
+        )
+    services.close()
+
+    baseline = EmbeddingProfile().bytes_per_vector
+    print(
+        f"{len(docs)} chunks, {len(questions)} questions\n"
+        f"{'profile':<20} {'recall@1':>8} {'recall@5':>8} {'MRR@5':>6} "
+        f"{'memory':>10} {'vs large':>9}"
+    )
+    for name, profile in zip(args.profiles, profiles):
+        doc_vectors, query_vectors = native[profile.model]
+        if profile.dimensions < NATIVE_DIMENSIONS.get(profile.model, 0):
+            doc_vectors = reduce(doc_vectors, profile.dimensions)
+            query_vectors = reduce(query_vectors, profile.dimensions)
+
+        store = LocalVectorStore(
+            None,
+            quantization="int8" if profile.storage == "int8" else "none",
+            dtype="float32" if profile.storage == "float32" else "float16",
+        )
+        by_video: dict[str, list] = {}
+        for i, ((video_id, chunk), vector) in enumerate(zip(docs, doc_vectors)):
+            by_video.setdefault(video_id, []).append((f"{video_id}-{i}", vector, chunk))
+        for video_id, records in by_video.items():
+            store.upsert(records, namespace=video_id)
+
+        ranks = []  # 1-based rank of the first answering chunk, 0 if none
+        for (video_id, _, start), vector in zip(questions, query_vectors):
+            matches = store.query(vector=vector, top_k=TOP_K, namespace=video_id)
+            ranks.append(
+                next(
+                    (
+                        rank
+                        for rank, m in enumerate(matches["matches"], 1)
+                        if m["metadata"]["start"] <= start <= m["metadata"]["end"]
+                    ),
+                    0,
+                )
+            )
+        recall_1 = sum(rank == 1 for rank in ranks) / len(ranks)
+        recall_k = sum(rank > 0 for rank in ranks) / len(ranks)
+        mrr = sum(1 / rank for rank in ranks if rank) / len(ranks)
+        memory = profile.bytes_per_vector * len(docs)
+        print(
+            f"{name:<20} {recall_1:>8.3f} {recall_k:>8.3f} {mrr:>6.3f} "
+            f"{memory / 2**20:>7.2f} MiB {profile.bytes_per_vector / baseline:>8.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
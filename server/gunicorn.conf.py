@@ -0,0 +1,72 @@
+"""Production entry point: ``gunicorn -c gunicorn.conf.py`` (from ``server/``).
+
+``python server.py`` still starts the single-process development server. Here
+``WEB_CONCURRENCY`` worker processes each run ``WEB_THREADS`` request threads
+(gthread), which suits the blocking OpenAI/Pinecone SDKs and keeps streamed
+``/process_video`` responses from tying up a whole process. Clients are built
+lazily inside each worker (see ``services.py``). On SIGTERM a worker stops
+accepting requests, lets running jobs finish within ``GRACEFUL_TIMEOUT``
+seconds, drops queued ones and closes its clients.
+
+Environment:
+
+- ``BIND`` (or ``PORT``): listen address, default ``0.0.0.0:5000``
+- ``WEB_CONCURRENCY``: worker processes, default ``2 * CPUs + 1`` capped at 8
+- ``WEB_THREADS``: request threads per worker, default 8
+- ``WEB_TIMEOUT``: seconds before a silent worker is restarted, default 120
+- ``GRACEFUL_TIMEOUT``: seconds a stopping worker gets, default 60
+- ``WEB_MAX_REQUESTS``: recycle workers after this many requests, 0 disables
+- ``PROMETHEUS_MULTIPROC_DIR``: where workers write metric samples for
+  ``/metrics`` to aggregate, a fresh temporary directory by default
+"""
+
+import logging
+import multiprocessing
+import os
+import tempfile
+
+# must be set before any process imports prometheus_client (see metrics.py)
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="overlap-metrics-")
+)
+
+# child_exit runs from the master's signal handling, don't import in there
+from metrics import mark_process_dead
+
+wsgi_app = "server:app"
+
+bind = os.getenv("BIND") or f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", min(2 * multiprocessing.cpu_count() + 1, 8)))
+worker_class = "gthread"
+threads = int(os.getenv("WEB_THREADS", "8"))
+timeout = int(os.getenv("WEB_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "60"))
+keepalive = 5
+max_requests = int(os.getenv("WEB_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+accesslog = os.getenv("WEB_ACCESS_LOG") or None
+loglevel = os.getenv("WEB_LOG_LEVEL", "info")
+
+
+def on_starting(server):
+    # samples of a previous run would be aggregated with the new ones
+    directory = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith(".db"):
+            os.remove(os.path.join(directory, name))
+
+
+def post_worker_init(worker):
+    logging.basicConfig(level=logging.INFO)
+
+
+def worker_exit(server, worker):
+    # runs in the worker once it has stopped accepting connections
+    from server import services
+
+    services.close(wait=True)
+
+
+def child_exit(server, worker):
+    mark_process_dead(worker.pid)
@@ -0,0 +1,434 @@
+"""Batched embedding + bulk upsert pipeline used by ``/process_video``.
+
+Vector IDs are derived from ``(video_id, start, text hash)`` and every ingest
+writes a per-video manifest, so re-processing a video only embeds segments
+that are new or changed and removes the ones that disappeared.
+
+Caption fragments are merged into overlapping chunks first (see
+``chunking.py``); a segment is a chunk, or a single caption line when chunking
+is disabled. Each vector's metadata carries a precomputed ``context`` snippet
+(the segment plus its neighbouring segments) so retrieval can format answers
+without fetching anything else.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterable, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Callable
+
+from chunking import ChunkOptions, chunk_transcript
+from embeddings import DATA_DIR, Embedder, EmbeddingProfile, normalize_text
+from lexical import BM25Index, LexicalStore
+from metrics import span
+from vector_store import VectorStore
+
+logger = logging.getLogger("overlap-ingest")
+
+METADATA_VERSION = 3
+"""Bumped whenever the stored metadata layout changes, forces a full re-ingest"""
+
+
+def video_namespace(video_id: str, profile: EmbeddingProfile | None = None) -> str:
+    """Namespace of ``video_id``, one per embedding profile.
+
+    The default profile keeps the original name so existing indexes stay valid.
+    """
+    if profile is None or profile.is_default:
+        return f"overlap_{video_id}_embeddings"
+    return f"overlap_{video_id}_{profile.key}"
+
+
+def segment_id(video_id: str, entry: dict) -> str:
+    """Stable vector ID for a transcript entry of ``video_id``."""
+    text_hash = hashlib.sha256(normalize_text(entry["text"]).encode("utf-8"))
+    digest = hashlib.sha256(
+        f"{video_id}\0{float(entry['start']):.3f}\0{text_hash.hexdigest()}".encode()
+    ).hexdigest()
+    return f"{video_id}-{digest[:32]}"
+
+
+@dataclass(frozen=True)
+class IngestOptions:
+    max_batch_items: int = 256
+    """Maximum number of transcript entries per embeddings request (API cap: 2048)"""
+    max_batch_chars: int = 64_000
+    """Rough size budget per embeddings request, keeps us well below the token cap"""
+    upsert_chunk_size: int = 32
+    """Vectors per upsert call. 3072-dim vectors are ~60KB as JSON, Pinecone caps
+    requests at 2MB"""
+    max_concurrency: int = 4
+    """Number of batches embedded/upserted at the same time"""
+    context_lines: int = 0
+    """Neighbouring segments on each side included in a segment's context
+    snippet. Chunks already overlap, so none are added by default"""
+    chunking: ChunkOptions | None = field(default_factory=ChunkOptions)
+    """How caption lines are merged into chunks, ``None`` for one vector per line"""
+
+    @classmethod
+    def from_env(cls) -> IngestOptions:
+        return cls(
+            max_batch_items=int(os.getenv("INGEST_BATCH_ITEMS", cls.max_batch_items)),
+            max_batch_chars=int(os.getenv("INGEST_BATCH_CHARS", cls.max_batch_chars)),
+            upsert_chunk_size=int(
+                os.getenv("INGEST_UPSERT_CHUNK", cls.upsert_chunk_size)
+            ),
+            max_concurrency=int(os.getenv("INGEST_CONCURRENCY", cls.max_concurrency)),
+            context_lines=int(os.getenv("INGEST_CONTEXT_LINES", cls.context_lines)),
+            chunking=(
+                ChunkOptions.from_env()
+                if os.getenv("INGEST_CHUNKING", "1") != "0"
+                else None
+            ),
+        )
+
+
+@dataclass
+class IngestStats:
+    source_lines: int = 0
+    """Caption lines in the transcript"""
+    lines: int = 0
+    """Segments embedded and upserted by this run"""
+    batches: int = 0
+    upserts: int = 0
+    skipped: int = 0
+    """Segments already present in the index with the same content"""
+    deleted: int = 0
+    """Stale vectors removed because their segment changed or disappeared"""
+    seconds: float = 0.0
+
+    @property
+    def lines_per_second(self) -> float:
+        return self.lines / self.seconds if self.seconds > 0 else 0.0
+
+
+def iter_batches(
+    items: Iterable[tuple[str, dict]], *, max_items: int, max_chars: int
+) -> Iterator[list[tuple[str, dict]]]:
+    """Group ``(id, entry)`` pairs into batches bounded by item count and text size.
+
+    An entry larger than ``max_chars`` on its own still gets a batch of its own.
+    """
+    batch: list[tuple[str, dict]] = []
+    chars = 0
+    for item in items:
+        size = len(item[1]["text"])
+        if batch and (len(batch) >= max_items or chars + size > max_chars):
+            yield batch
+            batch, chars = [], 0
+        batch.append(item)
+        chars += size
+    if batch:
+        yield batch
+
+
+def _metadata(entry: dict) -> dict:
+    metadata = {
+        "timestamp": entry["start"],
+        "duration": entry["duration"],
+        "content": entry["text"],
+        "context": entry.get("context", entry["text"]),
+        "context_start": entry.get("context_start", entry["start"]),
+    }
+    if "first_line" in entry:
+        # chunk: keep where it came from in the caption list
+        metadata["end"] = entry["end"]
+        metadata["first_line"] = entry["first_line"]
+        metadata["last_line"] = entry["last_line"]
+    return metadata
+
+
+def _chunks(items: list, size: int) -> Iterator[list]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def ingest_transcript(
+    transcript: Sequence[dict],
+    namespace: str,
+    *,
+    ids: Sequence[str],
+    embedder: Embedder,
+    index: VectorStore,
+    options: IngestOptions | None = None,
+    on_progress: Callable[[int, int], None] | None = None,
+) -> IngestStats:
+    """Embed every transcript entry and upsert the vectors into ``namespace``.
+
+    ``ids[i]`` is the vector ID used for ``transcript[i]``.
+
+    Batches run concurrently on a thread pool bounded by ``options.max_concurrency``;
+    the first failing batch aborts the ingest and its exception is re-raised.
+    ``on_progress(done_lines, total_lines)`` is called after each batch completes.
+    """
+    opts = options or IngestOptions()
+    stats = IngestStats()
+    total = len(transcript)
+    started = time.perf_counter()
+
+    def _run_batch(batch: list[tuple[str, dict]]) -> int:
+        with span("embed"):
+            embeddings = embedder.embed([entry["text"] for _, entry in batch])
+        vectors = [
+            (vector_id, embedding, _metadata(entry))
+            for (vector_id, entry), embedding in zip(batch, embeddings)
+        ]
+        upserts = 0
+        for chunk in _chunks(vectors, opts.upsert_chunk_size):
+            with span("upsert"):
+                index.upsert(chunk, namespace=namespace)
+            upserts += 1
+        return upserts
+
+    batches = list(
+        iter_batches(
+            zip(ids, transcript),
+            max_items=opts.max_batch_items,
+            max_chars=opts.max_batch_chars,
+        )
+    )
+    with ThreadPoolExecutor(max_workers=max(1, opts.max_concurrency)) as pool:
+        futures = [(len(batch), pool.submit(_run_batch, batch)) for batch in batches]
+        try:
+            for size, future in futures:
+                stats.upserts += future.result()
+                stats.batches += 1
+                stats.lines += size
+                if on_progress is not None:
+                    on_progress(stats.lines, total)
+        except BaseException:
+            for _, future in futures:
+                future.cancel()
+            raise
+
+    stats.seconds = time.perf_counter() - started
+    logger.info(
+        "ingested %d lines into %s in %.2fs (%d batches, %d upserts, %.1f lines/s)",
+        stats.lines,
+        namespace,
+        stats.seconds,
+        stats.batches,
+        stats.upserts,
+        stats.lines_per_second,
+    )
+    return stats
+
+
+def with_context(transcript: Sequence[dict], lines: int) -> list[dict]:
+    """Copy of ``transcript`` where each entry has ``context``/``context_start``."""
+    enriched = []
+    for i, entry in enumerate(transcript):
+        window = transcript[max(0, i - lines) : i + lines + 1]
+        enriched.append(
+            {
+                **entry,
+                "context": " ".join(e["text"] for e in window),
+                "context_start": window[0]["start"],
+            }
+        )
+    return enriched
+
+
+def transcript_digest(transcript: Sequence[dict]) -> str:
+    payload = json.dumps(
+        [[round(float(e["start"]), 3), normalize_text(e["text"])] for e in transcript],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ManifestStore:
+    """One JSON manifest per video and namespace recording what is in it.
+
+    Each embedding profile has its own namespace (see :func:`video_namespace`)
+    and so its own manifest: switching a video to another profile and back
+    reuses what is still in the first namespace. The default namespace keeps
+    the original ``<video_id>.json`` file name.
+    """
+
+    def __init__(self, directory: str | None = None):
+        self._dir = directory or os.getenv(
+            "INGEST_MANIFEST_DIR", os.path.join(DATA_DIR, "manifests")
+        )
+        os.makedirs(self._dir, exist_ok=True)
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _path(self, video_id: str, namespace: str | None = None) -> str:
+        if namespace is None or namespace == video_namespace(video_id):
+            return os.path.join(self._dir, f"{video_id}.json")
+        return os.path.join(self._dir, f"{namespace}.json")
+
+    def lock(self, video_id: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(video_id, threading.Lock())
+
+    def load(self, video_id: str, namespace: str | None = None) -> dict | None:
+        try:
+            with open(self._path(video_id, namespace), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("ignoring unreadable manifest for %s: %s", video_id, e)
+            return None
+
+    def save(self, manifest: dict) -> None:
+        path = self._path(manifest["video_id"], manifest.get("namespace"))
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def version(self, video_id: str, namespace: str | None = None) -> int | None:
+        """Changes whenever ``namespace`` of ``video_id`` is (re-)ingested: the
+        manifest's mtime."""
+        try:
+            return os.stat(self._path(video_id, namespace)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def is_ingested(
+        self, video_id: str, model: str, namespace: str | None = None
+    ) -> bool:
+        manifest = self.load(video_id, namespace)
+        return manifest is not None and manifest.get("model") == model
+
+
+def ingest_video(
+    video_id: str,
+    transcript: Sequence[dict],
+    *,
+    embedder: Embedder,
+    index: VectorStore,
+    manifests: ManifestStore,
+    options: IngestOptions | None = None,
+    on_progress: Callable[[int, int], None] | None = None,
+    lexical: LexicalStore | None = None,
+    profile: EmbeddingProfile | None = None,
+) -> IngestStats:
+    """Incrementally (re-)ingest ``transcript`` into the namespace of ``video_id``.
+
+    Unchanged segments are skipped, new or changed ones are embedded and
+    upserted, and vectors of segments that no longer exist are deleted. When
+    the transcript matches the manifest exactly nothing is sent at all.
+
+    With a ``lexical`` store the video's BM25 index is rebuilt from all of its
+    segments (it is cheap, no network) whenever it is missing or stale.
+
+    ``profile`` selects the namespace (see :func:`video_namespace`). Every
+    namespace has its own manifest, so switching profiles ingests into the new
+    namespace and switching back only updates what changed in the old one.
+    """
+    started = time.perf_counter()
+    namespace = video_namespace(video_id, profile)
+    digest = transcript_digest(transcript)
+    opts = options or IngestOptions()
+    chunking = asdict(opts.chunking) if opts.chunking else None
+    # what the lexical index was built from
+    lexical_info = {
+        "transcript_digest": digest,
+        "metadata_version": METADATA_VERSION,
+        "chunking": chunking,
+        "context_lines": opts.context_lines,
+    }
+
+    with manifests.lock(video_id):
+        manifest = manifests.load(video_id, namespace)
+        if manifest is not None and manifest.get("namespace") != namespace:
+            # written before manifests were kept per namespace, for another one
+            manifest = None
+        previous = set(manifest["segments"]) if manifest else set()
+        reusable = (
+            manifest is not None
+            # vectors from another model or profile can't be reused
+            and manifest.get("model") == embedder.model
+            and manifest.get("namespace") == namespace
+            # nor ones written with older metadata or other segment boundaries
+            and manifest.get("metadata_version") == METADATA_VERSION
+            and manifest.get("chunking") == chunking
+            and manifest.get("context_lines") == opts.context_lines
+        )
+
+        unchanged = reusable and manifest.get("transcript_digest") == digest
+        if unchanged and (
+            lexical is None or lexical.is_current(video_id, lexical_info)
+        ):
+            stats = IngestStats(source_lines=len(transcript), skipped=len(previous))
+            stats.seconds = time.perf_counter() - started
+            if on_progress is not None:
+                on_progress(len(previous), len(previous))
+            return stats
+
+        segments = (
+            chunk_transcript(transcript, opts.chunking)
+            if opts.chunking
+            else list(transcript)
+        )
+        known = previous if reusable else set()
+        ids = [segment_id(video_id, segment) for segment in segments]
+        todo = [i for i, vector_id in enumerate(ids) if vector_id not in known]
+        enriched = with_context(segments, opts.context_lines)
+
+        if lexical is not None:
+            with span("lexical_index"):
+                lexical.save(
+                    video_id,
+                    BM25Index(
+                        ids,
+                        [segment["text"] for segment in segments],
+                        [_metadata(entry) for entry in enriched],
+                        info=lexical_info,
+                    ),
+                )
+
+        stats = ingest_transcript(
+            [enriched[i] for i in todo],
+            namespace,
+            ids=[ids[i] for i in todo],
+            embedder=embedder,
+            index=index,
+            options=opts,
+            on_progress=on_progress,
+        )
+        stats.source_lines = len(transcript)
+        stats.skipped = len(segments) - len(todo)
+
+        stale = sorted(previous.difference(ids))
+        for chunk in _chunks(stale, 1000):
+            index.delete(ids=chunk, namespace=namespace)
+        stats.deleted = len(stale)
+        index.flush()
+
+        manifests.save(
+            {
+                "video_id": video_id,
+                "namespace": namespace,
+                "model": embedder.model,
+                "profile": profile.key if profile else None,
+                "metadata_version": METADATA_VERSION,
+                "chunking": chunking,
+                "context_lines": opts.context_lines,
+                "transcript_digest": digest,
+                "segments": ids,
+                "updated_at": time.time(),
+            }
+        )
+
+    stats.seconds = time.perf_counter() - started
+    if segments and len(segments) < len(transcript):
+        logger.info(
+            "%s: %d caption lines -> %d chunks (index %.1f%% smaller)",
+            video_id,
+            len(transcript),
+            len(segments),
+            100 * (1 - len(segments) / len(transcript)),
+        )
+    return stats
@@ -0,0 +1,277 @@
+"""Background job queue for long-running video processing.
+
+Jobs run on a bounded thread pool. Submitting work for a key that already has a
+queued or running job returns that job instead of starting another one.
+
+With a ``state_dir`` every stage change is also written to a small JSON file,
+so a server running several worker processes can answer ``/jobs/<id>`` for a
+job that another worker runs.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Literal
+
+from embeddings import DATA_DIR
+
+logger = logging.getLogger("overlap-jobs")
+
+JobStatus = Literal["queued", "running", "succeeded", "failed"]
+
+
+_JOB_ID = re.compile(r"[0-9a-f]{32}")
+
+SAVED_RESULT_KEYS = ("status", "summary")
+"""Result fields ``/jobs/<id>`` reports; the transcript is served by ``/transcript``"""
+
+_SWEEP_INTERVAL = 60.0
+"""Seconds between scans of ``state_dir`` for expired state files"""
+
+
+class QueueFull(RuntimeError):
+    pass
+
+
+@dataclass
+class Job:
+    id: str
+    key: str
+    status: JobStatus = "queued"
+    stage: str = "queued"
+    done: int = 0
+    total: int = 0
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    timings: dict[str, float] = field(default_factory=dict)
+    """Seconds spent in each completed stage"""
+    result: Any = None
+    error: str | None = None
+    tokens: list[str] = field(default_factory=list)
+    """Output streamed while the job runs (summary tokens)"""
+    version: int = 0
+    """Incremented on every stage, progress or token update"""
+    _stage_started: float = field(default_factory=time.perf_counter, repr=False)
+    _finished: threading.Event = field(default_factory=threading.Event, repr=False)
+    _changed: threading.Condition = field(
+        default_factory=threading.Condition, repr=False
+    )
+    _on_stage: Callable[[Job], None] | None = field(default=None, repr=False)
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    @property
+    def percent(self) -> float:
+        if self.status == "succeeded":
+            return 100.0
+        return round(100.0 * self.done / self.total, 1) if self.total else 0.0
+
+    def set_stage(self, stage: str, total: int = 0) -> None:
+        now = time.perf_counter()
+        if self.status == "running":
+            self.timings[self.stage] = round(now - self._stage_started, 3)
+        self.stage, self.done, self.total = stage, 0, total
+        self._stage_started = now
+        self._notify()
+        if self._on_stage is not None:
+            self._on_stage(self)
+
+    def progress(self, done: int, total: int | None = None) -> None:
+        self.done = done
+        if total is not None:
+            self.total = total
+        self._notify()
+
+    def add_token(self, token: str) -> None:
+        self.tokens.append(token)
+        self._notify()
+
+    def _notify(self) -> None:
+        with self._changed:
+            self.version += 1
+            self._changed.notify_all()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self._finished.wait(timeout)
+
+    def wait_for_update(self, version: int, timeout: float | None = None) -> int:
+        """Block until ``self.version`` moves past ``version`` or the job ends."""
+        with self._changed:
+            self._changed.wait_for(
+                lambda: self.version != version or self._finished.is_set(), timeout
+            )
+            return self.version
+
+    def saved_result(self) -> dict[str, Any] | None:
+        """The :data:`SAVED_RESULT_KEYS` of a succeeded job's result."""
+        if self.status != "succeeded" or not isinstance(self.result, dict):
+            return None
+        return {key: self.result.get(key) for key in SAVED_RESULT_KEYS}
+
+    def to_dict(self) -> dict[str, Any]:
+        data = {
+            "jobId": self.id,
+            "key": self.key,
+            "status": self.status,
+            "stage": self.stage,
+            "percent": self.percent,
+            "createdAt": self.created_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+            "timings": dict(self.timings),
+        }
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+
+
+class JobQueue:
+    def __init__(
+        self,
+        *,
+        max_workers: int = 2,
+        max_queued: int = 16,
+        retention: float = 3600.0,
+        state_dir: str | None = None,
+    ):
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="overlap-job"
+        )
+        self._capacity = max_workers + max_queued
+        self._retention = retention
+        self._jobs: dict[str, Job] = {}
+        self._active_by_key: dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._state_dir = state_dir
+        self._next_sweep = 0.0
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> JobQueue:
+        return cls(
+            max_workers=int(os.getenv("JOB_WORKERS", "2")),
+            max_queued=int(os.getenv("JOB_QUEUE_SIZE", "16")),
+            retention=float(os.getenv("JOB_RETENTION_SECONDS", "3600")),
+            state_dir=os.getenv("JOB_STATE_DIR", os.path.join(DATA_DIR, "jobs"))
+            or None,
+        )
+
+    def submit(self, key: str, fn: Callable[[Job], Any]) -> Job:
+        """Run ``fn(job)`` in the background, coalescing on ``key``.
+
+        Raises :class:`QueueFull` when the pool and its queue are saturated.
+        """
+        with self._lock:
+            self._expire()
+            job = self._active_by_key.get(key)
+            if job is not None:
+                return job
+
+            if len(self._active_by_key) >= self._capacity:
+                raise QueueFull("too many pending jobs")
+
+            job = Job(id=uuid.uuid4().hex, key=key)
+            if self._state_dir:
+                job._on_stage = self._save_state
+            self._jobs[job.id] = job
+            self._active_by_key[key] = job
+
+        self._pool.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def load_state(self, job_id: str) -> dict[str, Any] | None:
+        """Last saved state of a job run by any process sharing ``state_dir``."""
+        if not self._state_dir or not _JOB_ID.fullmatch(job_id):
+            return None
+        try:
+            with open(os.path.join(self._state_dir, f"{job_id}.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_state(self, job: Job) -> None:
+        data = job.to_dict()
+        if job.status == "succeeded":
+            # not the whole result: it holds a second copy of the transcript
+            data["result"] = job.saved_result()
+        path = os.path.join(self._state_dir, f"{job.id}.json")
+        try:
+            with open(f"{path}.tmp", "w") as f:
+                json.dump(data, f)
+            os.replace(f"{path}.tmp", path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("could not save state of job %s: %s", job.id, e)
+
+    def _run(self, job: Job, fn: Callable[[Job], Any]) -> None:
+        job.started_at = time.time()
+        job.status = "running"
+        job.set_stage("running")
+        try:
+            job.result = fn(job)
+            job.set_stage("done")
+            job.status = "succeeded"
+        except Exception as e:
+            logger.exception("job %s (%s) failed", job.id, job.key)
+            job.error = str(e) or e.__class__.__name__
+            job.set_stage("failed")
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            if job._on_stage is not None:
+                job._on_stage(job)
+            with self._lock:
+                if self._active_by_key.get(job.key) is job:
+                    del self._active_by_key[job.key]
+            job._finished.set()
+            job._notify()
+
+    def _expire(self) -> None:
+        cutoff = time.time() - self._retention
+        for job_id in [
+            job.id
+            for job in self._jobs.values()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]:
+            del self._jobs[job_id]
+        # listing the directory costs a stat per file, not worth it every submit
+        if self._state_dir and time.monotonic() >= self._next_sweep:
+            self._next_sweep = time.monotonic() + min(_SWEEP_INTERVAL, self._retention)
+            for name in os.listdir(self._state_dir):
+                path = os.path.join(self._state_dir, name)
+                try:
+                    if os.stat(path).st_mtime < cutoff:
+                        os.remove(path)
+                except OSError:
+                    pass
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False) -> None:
+        """Stop accepting jobs; running ones finish, queued ones may be dropped."""
+        self._pool.shutdown(wait=wait, cancel_futures=cancel_pending)
+        if not cancel_pending:
+            return
+        with self._lock:
+            dropped = [job for job in self._jobs.values() if job.status == "queued"]
+        for job in dropped:
+            # release anyone waiting on a job that will never run
+            job.status, job.error = "failed", "server shutting down"
+            job.finished_at = time.time()
+            if job._on_stage is not None:
+                job._on_stage(job)
+            job._finished.set()
+            job._notify()
@@ -0,0 +1,321 @@
+"""Per-video BM25 index over the ingested transcript segments.
+
+Questions that name an exact term or guest ("what did they say about
+Kubernetes?") are answered by a keyword lookup in microseconds, while the
+vector path costs an embeddings round trip plus a vector-store query. The
+index is built during ingest from the same segments that are embedded, with
+the same IDs and metadata, and saved as ``<video_id>.npz`` in its own
+directory next to the transcripts and manifests.
+
+Postings are stored CSR-style (one ``docs``/``tfs`` slice per term), so a
+query is a few NumPy slices and one scatter-add per query term.
+:func:`fuse_matches` merges a lexical and a vector ranking by reciprocal rank.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import numpy as np
+
+from embeddings import DATA_DIR
+
+logger = logging.getLogger("overlap-lexical")
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# function words plus the phrasing of questions about a podcast, which would
+# otherwise match every segment that mentions "talk" or "say"
+# fmt: off
+STOPWORDS = frozenset({
+    "a", "about", "after", "again", "all", "also", "am", "an", "and", "any", "are",
+    "as", "at", "be", "been", "before", "being", "between", "both", "but", "by", "can",
+    "could", "did", "do", "does", "doing", "down", "during", "each", "few", "for",
+    "from", "further", "had", "has", "have", "having", "he", "her", "here", "hers",
+    "him", "his", "how", "i", "if", "in", "into", "is", "it", "its", "just", "me",
+    "more", "most", "my", "no", "nor", "not", "now", "of", "off", "on", "once", "only",
+    "or", "other", "our", "out", "over", "own", "same", "she", "should", "so", "some",
+    "such", "than", "that", "the", "their", "them", "then", "there", "these", "they",
+    "this", "those", "through", "to", "too", "under", "until", "up", "very", "was",
+    "we", "were", "what", "when", "where", "which", "while", "who", "whom", "why",
+    "will", "with", "would", "you", "your",
+    # question phrasing
+    "say", "said", "says", "talk", "talked", "talking", "mention", "mentioned", "tell",
+    "told", "think", "thought", "podcast", "episode", "video", "guest", "host",
+    "speaker",
+})
+# fmt: on
+
+
+def tokenize(text: str) -> list[str]:
+    return [
+        token
+        for token in _TOKEN.findall(text.lower())
+        if token not in STOPWORDS and not token.isdigit()
+    ]
+
+
+@dataclass(frozen=True)
+class LexicalHit:
+    id: str
+    score: float
+    metadata: dict
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of documents.
+
+    Parameters
+    ----------
+    ids, texts, metadata
+        One entry per document (transcript segment).
+    k1, b
+        BM25 term-frequency saturation and length normalisation.
+    """
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        texts: Sequence[str],
+        metadata: Sequence[dict],
+        *,
+        k1: float = 1.2,
+        b: float = 0.75,
+        info: dict | None = None,
+    ):
+        postings: dict[str, list[tuple[int, int]]] = {}
+        doc_len = np.zeros(len(texts), dtype=np.float32)
+        for doc, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_len[doc] = sum(counts.values())
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((doc, tf))
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum([len(postings[t]) for t in terms], out=offsets[1:])
+        pairs = [pair for term in terms for pair in postings[term]]
+        docs = np.array([doc for doc, _ in pairs], dtype=np.int32)
+        tfs = np.array([tf for _, tf in pairs], dtype=np.float32)
+        self._init(
+            list(ids),
+            list(metadata),
+            terms,
+            offsets,
+            docs,
+            tfs,
+            doc_len,
+            k1=k1,
+            b=b,
+            info=info or {},
+        )
+
+    def _init(self, ids, metadata, terms, offsets, docs, tfs, doc_len, *, k1, b, info):
+        self.ids = ids
+        self.metadata = metadata
+        self.info = info
+        self._terms = {term: i for i, term in enumerate(terms)}
+        self._offsets = offsets
+        self._docs = docs
+        self._tfs = tfs
+        self._doc_len = doc_len
+        self._k1 = k1
+        self._b = b
+        n = len(ids)
+        df = np.diff(offsets).astype(np.float64)
+        # Lucene's idf, never negative for terms in most documents
+        self._idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        self._max_idf = float(math.log1p((n + 0.5) / 0.5)) if n else 0.0
+        avg = float(doc_len.mean()) if n else 1.0
+        self._norm = (k1 * (1 - b + b * doc_len / max(avg, 1e-6))).astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: str, top_k: int) -> list[LexicalHit]:
+        """Best ``top_k`` documents for ``query``, highest score first."""
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            i = self._terms.get(term)
+            if i is None:
+                continue
+            lo, hi = self._offsets[i], self._offsets[i + 1]
+            docs, tfs = self._docs[lo:hi], self._tfs[lo:hi]
+            # docs are unique within one posting list, plain fancy-index add works
+            scores[docs] += (
+                self._idf[i] * tfs * (self._k1 + 1) / (tfs + self._norm[docs])
+            )
+        matched = np.flatnonzero(scores)
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        order = matched[np.argsort(-scores[matched], kind="stable")]
+        return [
+            LexicalHit(self.ids[doc], float(scores[doc]), self.metadata[doc])
+            for doc in order.tolist()
+        ]
+
+    def coverage(self, query: str, hit: LexicalHit) -> float:
+        """Share of the query's idf weight whose terms occur in ``hit``.
+
+        Query terms missing from the whole video count with the highest idf,
+        so a question about something the video never mentions is not decisive.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return 0.0
+        text = hit.metadata.get("content", "")
+        present = set(tokenize(text))
+        total = found = 0.0
+        for term in terms:
+            i = self._terms.get(term)
+            weight = float(self._idf[i]) if i is not None else self._max_idf
+            total += weight
+            if term in present:
+                found += weight
+        return found / total if total else 0.0
+
+    def decisive(
+        self,
+        query: str,
+        hits: Sequence[LexicalHit],
+        *,
+        min_coverage: float = 0.8,
+        margin: float = 1.5,
+    ) -> bool:
+        """Whether ``hits[0]`` can answer ``query`` without a vector search.
+
+        It must contain at least ``min_coverage`` of the query's idf weight and
+        score ``margin`` times higher than the runner-up.
+        """
+        if not hits or self.coverage(query, hits[0]) < min_coverage:
+            return False
+        return len(hits) == 1 or hits[0].score >= margin * hits[1].score
+
+    def save(self, path: str) -> None:
+        tmp = f"{path}.tmp.npz"
+        header = {
+            "ids": self.ids,
+            "metadata": self.metadata,
+            "terms": sorted(self._terms, key=self._terms.__getitem__),
+            "k1": self._k1,
+            "b": self._b,
+            "info": self.info,
+        }
+        np.savez(
+            tmp,
+            header=np.frombuffer(json.dumps(header).encode("utf-8"), dtype=np.uint8),
+            offsets=self._offsets,
+            docs=self._docs,
+            tfs=self._tfs,
+            doc_len=self._doc_len,
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> BM25Index:
+        with np.load(path) as data:
+            header = json.loads(data["header"].tobytes())
+            index = cls.__new__(cls)
+            index._init(
+                header["ids"],
+                header["metadata"],
+                header["terms"],
+                data["offsets"],
+                data["docs"],
+                data["tfs"],
+                data["doc_len"],
+                k1=header["k1"],
+                b=header["b"],
+                info=header["info"],
+            )
+        return index
+
+
+class LexicalStore:
+    """Directory of per-video :class:`BM25Index` files with a small LRU."""
+
+    def __init__(self, directory: str | None = None, *, memory_entries: int = 16):
+        self._dir = directory or os.getenv(
+            "LEXICAL_INDEX_DIR", os.path.join(DATA_DIR, "lexical")
+        )
+        os.makedirs(self._dir, exist_ok=True)
+        self._memory: OrderedDict[str, tuple[int, BM25Index]] = OrderedDict()
+        self._memory_entries = memory_entries
+        self._lock = threading.Lock()
+
+    def _path(self, video_id: str) -> str:
+        return os.path.join(self._dir, f"{video_id}.npz")
+
+    def save(self, video_id: str, index: BM25Index) -> None:
+        index.save(self._path(video_id))
+
+    def get(self, video_id: str) -> BM25Index | None:
+        """Index of ``video_id``, reloaded when a re-ingest replaced the file."""
+        path = self._path(video_id)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            cached = self._memory.get(video_id)
+            if cached is not None and cached[0] == mtime_ns:
+                self._memory.move_to_end(video_id)
+                return cached[1]
+        try:
+            index = BM25Index.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("ignoring unreadable lexical index %s: %s", path, e)
+            return None
+        with self._lock:
+            self._memory[video_id] = (mtime_ns, index)
+            self._memory.move_to_end(video_id)
+            while len(self._memory) > self._memory_entries:
+                self._memory.popitem(last=False)
+        return index
+
+    def is_current(self, video_id: str, info: dict) -> bool:
+        index = self.get(video_id)
+        return index is not None and index.info == info
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]], k: int = 60
+) -> list[tuple[str, float]]:
+    """Merge ranked ID lists; each list contributes ``1 / (k + rank)`` per ID."""
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def fuse_matches(
+    matches: Sequence[dict],
+    hits: Sequence[LexicalHit],
+    top_k: int,
+    *,
+    k: int = 60,
+) -> list[dict]:
+    """Vector-store ``matches`` and lexical ``hits`` fused by reciprocal rank.
+
+    Returns match dicts (``id``/``score``/``metadata``) whose score is the
+    fused one, best first.
+    """
+    by_id = {hit.id: {"id": hit.id, "metadata": hit.metadata} for hit in hits}
+    # Pinecone matches are model objects, only item access is guaranteed
+    by_id.update(
+        (match["id"], {"id": match["id"], "metadata": match["metadata"]})
+        for match in matches
+    )
+    fused = reciprocal_rank_fusion(
+        [[match["id"] for match in matches], [hit.id for hit in hits]], k=k
+    )
+    return [{**by_id[doc_id], "score": score} for doc_id, score in fused[:top_k]]
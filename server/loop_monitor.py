@@ -0,0 +1,85 @@
+"""Event-loop lag monitor for the realtime agent.
+
+Audio frames are forwarded every 10ms on the same loop that runs retrieval, so
+any blocking call shows up here as lag long before it is audible. Every sample
+is exported as ``overlap_event_loop_lag_seconds`` (see ``metrics.py``).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+
+from metrics import LOOP_LAG_SECONDS
+
+logger = logging.getLogger("overlap-loop")
+
+
+class LoopLagMonitor:
+    """Samples how late ``asyncio.sleep(interval)`` wakes up.
+
+    Parameters
+    ----------
+    interval
+        Sampling period in seconds.
+    warn_threshold
+        Lag (seconds) above which a warning is logged.
+    window
+        Number of recent samples kept for percentiles.
+    """
+
+    def __init__(
+        self,
+        *,
+        interval: float = 0.05,
+        warn_threshold: float = 0.02,
+        window: int = 1200,
+    ):
+        self._interval = interval
+        self._warn_threshold = warn_threshold
+        self._samples: deque[float] = deque(maxlen=window)
+        self._task: asyncio.Task | None = None
+        self.max_lag = 0.0
+        self.late_samples = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self._interval
+            await asyncio.sleep(self._interval)
+            lag = max(0.0, loop.time() - expected)
+            self._samples.append(lag)
+            LOOP_LAG_SECONDS.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag > self._warn_threshold:
+                self.late_samples += 1
+                logger.warning("event loop lagged %.1f ms", lag * 1000)
+
+    def percentile(self, q: float) -> float:
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "p50_ms": self.percentile(50) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "max_ms": self.max_lag * 1000,
+            "late_samples": self.late_samples,
+            "samples": len(self._samples),
+        }
@@ -0,0 +1,115 @@
+"""Latency spans exported as Prometheus histograms.
+
+``with span("embed"): ...`` times a pipeline stage into
+``overlap_stage_seconds{stage="embed"}`` and counts exceptions in
+``overlap_stage_errors_total``. The Flask server exports them on ``/metrics``,
+the LiveKit worker on ``AGENT_METRICS_PORT``.
+
+Both run several processes (gunicorn workers, one process per agent job). With
+``PROMETHEUS_MULTIPROC_DIR`` set before the processes start, every process
+writes its samples there and the exporter aggregates them all; see
+:func:`enable_multiprocess`.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+
+MULTIPROC_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+STAGE_SECONDS = Histogram(
+    "overlap_stage_seconds",
+    "Latency of pipeline stages",
+    ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 180),
+)
+INPUT_AUDIO_SECONDS = Counter(
+    "overlap_input_audio_seconds",
+    "Microphone audio received and forwarded to the realtime model",
+    ["state"],
+)
+RETRIEVAL_PATHS = Counter(
+    "overlap_retrieval_path",
+    "Agent retrievals by path: lexical only, result cache, hybrid, vector only",
+    ["path"],
+)
+LOOP_LAG_SECONDS = Histogram(
+    "overlap_event_loop_lag_seconds",
+    "How late the agent's event loop wakes up from a sleep",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 0.5, 1),
+)
+STAGE_ERRORS = Counter("overlap_stage_errors", "Pipeline stages that raised", ["stage"])
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time the block as ``stage``; exceptions are counted and re-raised."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.perf_counter() - started)
+
+
+def observe(stage: str, seconds: float) -> None:
+    """Record a duration measured elsewhere (e.g. across two events)."""
+    STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+def enable_multiprocess(directory: str | None = None) -> str:
+    """Point ``PROMETHEUS_MULTIPROC_DIR`` at a directory without stale samples.
+
+    Call it in the parent process before the processes that record metrics are
+    started; they must import ``prometheus_client`` after this.
+    """
+    directory = directory or os.getenv(MULTIPROC_ENV)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.endswith(".db"):
+                os.remove(os.path.join(directory, name))
+    else:
+        directory = tempfile.mkdtemp(prefix="overlap-metrics-")
+    os.environ[MULTIPROC_ENV] = directory
+    return directory
+
+
+def _registry() -> CollectorRegistry:
+    if not os.getenv(MULTIPROC_ENV):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render() -> tuple[bytes, str]:
+    """Body and content type of a scrape, aggregated over processes if enabled."""
+    return generate_latest(_registry()), CONTENT_TYPE_LATEST
+
+
+def start_metrics_server(port: int, addr: str = "0.0.0.0") -> None:
+    """Serve ``/metrics`` from a background thread of this process."""
+    start_http_server(port, addr, registry=_registry())
+
+
+def mark_process_dead(pid: int) -> None:
+    if os.getenv(MULTIPROC_ENV):
+        multiprocess.mark_process_dead(pid)
@@ -3,11 +3,15 @@
 from __future__ import annotations
 
 import asyncio
+import functools
+import json
 import os
+import random
+import time
+from collections.abc import AsyncIterable
 from dataclasses import dataclass
 from typing import Callable, Literal, Protocol
 
-import openai
 from livekit import rtc
 from livekit.agents import llm, stt, tokenize, transcription, utils, vad
 from livekit.agents._constants import ATTRIBUTE_AGENT_STATE
@@ -15,7 +19,25 @@ from livekit.agents._types import AgentState
 from livekit.agents.log import logger
 from livekit.agents.multimodal import agent_playout
 from livekit.plugins.openai import realtime
-from pinecone import Pinecone
+from livekit.rtc.participant import PublishDataError
+
+from agent_resources import shared_resources
+from audio_buffer import AudioRingBuffer
+from embeddings import EmbeddingCache
+from ingest import video_namespace
+from lexical import fuse_matches
+from loop_monitor import LoopLagMonitor
+from metrics import INPUT_AUDIO_SECONDS, RETRIEVAL_PATHS, observe, span
+from playback_window import PlaybackWindow, asks_about_recent
+from result_cache import ResultCacheOptions, SemanticResultCache
+from speech_gate import GateOptions, SpeechGate
+from transcript_store import is_video_id
+
+INPUT_SAMPLE_RATE = 24000
+INPUT_FRAME_SAMPLES = 2400
+"""Samples per ``input_audio_buffer.append`` (100ms)"""
+CONTEXT_TOPIC = "overlap-context"
+"""Data message topic of the retrieved context sent to the linked participant"""
 
 EventTypes = Literal[
     "user_started_speaking",
@@ -50,6 +72,14 @@ class AgentTranscriptionOptions:
 class S2SModel(Protocol): ...
 
 
+def format_citations(citations: list[dict]) -> str:
+    """Render citations as ``[mm:ss] snippet`` lines for the model."""
+    return "\n".join(
+        f"[{int(c['start']) // 60:02d}:{int(c['start']) % 60:02d}] {c['text']}"
+        for c in citations
+    )
+
+
 @dataclass(frozen=True)
 class _ImplOptions:
     transcription: AgentTranscriptionOptions
@@ -65,6 +95,8 @@ class MultimodalAgent(utils.EventEmitter[EventTypes]):
         fnc_ctx: llm.FunctionContext | None = None,
         transcription: AgentTranscriptionOptions = AgentTranscriptionOptions(),
         loop: asyncio.AbstractEventLoop | None = None,
+        input_buffer_seconds: float = 2.0,
+        input_gate: GateOptions | None = None,
     ):
         super().__init__()
         self._loop = loop or asyncio.get_event_loop()
@@ -85,7 +117,24 @@ class MultimodalAgent(utils.EventEmitter[EventTypes]):
         # audio input
         self._read_micro_atask: asyncio.Task | None = None
         self._subscribed_track: rtc.RemoteAudioTrack | None = None
-        self._input_audio_ch = utils.aio.Chan[rtc.AudioFrame]()
+        # bounded: if the session stalls the oldest audio is dropped, see
+        # audio_buffer.py
+        self._input_audio = AudioRingBuffer(
+            int(INPUT_SAMPLE_RATE * input_buffer_seconds)
+        )
+        self._input_audio_ready = asyncio.Event()
+        self._input_overflowing = False
+        # optional local VAD, only speech (plus padding) reaches the model
+        self._input_gate = (
+            SpeechGate(
+                lambda: rtc.AudioFrame.create(
+                    INPUT_SAMPLE_RATE, 1, INPUT_FRAME_SAMPLES
+                ),
+                input_gate,
+            )
+            if input_gate is not None
+            else None
+        )
 
         # audio output
         self._playing_handle: agent_playout.PlayoutHandle | None = None
@@ -104,6 +153,10 @@ class MultimodalAgent(utils.EventEmitter[EventTypes]):
     def fnc_ctx(self) -> llm.FunctionContext | None:
         return self._session.fnc_ctx
 
+    @property
+    def input_gate(self) -> SpeechGate | None:
+        return self._input_gate
+
     @fnc_ctx.setter
     def fnc_ctx(self, value: llm.FunctionContext | None) -> None:
         self._session.fnc_ctx = value
@@ -136,24 +189,7 @@ class MultimodalAgent(utils.EventEmitter[EventTypes]):
         )
         self._main_atask = asyncio.create_task(self._main_task())
 
-        @self._session.on("response_content_added")
-        def _on_content_added(message: realtime.RealtimeContent):
-            tr_fwd = transcription.TTSSegmentsForwarder(
-                room=self._room,
-                participant=self._room.local_participant,
-                speed=self._opts.transcription.agent_transcription_speed,
-                sentence_tokenizer=self._opts.transcription.sentence_tokenizer,
-                word_tokenizer=self._opts.transcription.word_tokenizer,
-                hyphenate_word=self._opts.transcription.hyphenate_word,
-            )
-
-            self._playing_handle = self._agent_playout.play(
-                item_id=message.item_id,
-                content_index=message.content_index,
-                transcription_fwd=tr_fwd,
-                text_stream=message.text_stream,
-                audio_stream=message.audio_stream,
-            )
+        self._session.on("response_content_added", self._on_response_content_added)
 
         @self._session.on("input_speech_committed")
         def _input_speech_committed():
@@ -189,6 +225,29 @@ class MultimodalAgent(utils.EventEmitter[EventTypes]):
 
                 self._playing_handle = None
 
+    def _on_response_content_added(self, message: realtime.RealtimeContent) -> None:
+        self._play_content(message, message.text_stream)
+
+    def _play_content(
+        self, message: realtime.RealtimeContent, text_stream: AsyncIterable[str]
+    ) -> None:
+        tr_fwd = transcription.TTSSegmentsForwarder(
+            room=self._room,
+            participant=self._room.local_participant,
+            speed=self._opts.transcription.agent_transcription_speed,
+            sentence_tokenizer=self._opts.transcription.sentence_tokenizer,
+            word_tokenizer=self._opts.transcription.word_tokenizer,
+            hyphenate_word=self._opts.transcription.hyphenate_word,
+        )
+
+        self._playing_handle = self._agent_playout.play(
+            item_id=message.item_id,
+            content_index=message.content_index,
+            transcription_fwd=tr_fwd,
+            text_stream=text_stream,
+            audio_stream=message.audio_stream,
+        )
+
     def _update_state(self, state: AgentState, delay: float = 0.0):
         """Set the current state of the agent"""
 
@@ -234,14 +293,30 @@ class MultimodalAgent(utils.EventEmitter[EventTypes]):
 
         await self._agent_publication.wait_for_subscription()
 
-        bstream = utils.audio.AudioByteStream(
-            24000,
-            1,
-            samples_per_channel=2400,
-        )
-        async for frame in self._input_audio_ch:
-            for f in bstream.write(frame.data.tobytes()):
-                self._session.input_audio_buffer.append(f)
+        # frames are reused: the session base64-encodes frame.data
+        # synchronously, so the buffer is free again right after append()
+        gate = self._input_gate
+        if gate is not None:
+            frame = gate.next_frame()
+        else:
+            frame = rtc.AudioFrame.create(INPUT_SAMPLE_RATE, 1, INPUT_FRAME_SAMPLES)
+        frame_seconds = INPUT_FRAME_SAMPLES / INPUT_SAMPLE_RATE
+        while True:
+            await self._input_audio_ready.wait()
+            self._input_audio_ready.clear()
+            while self._input_audio.read_into(frame.data):
+                if gate is None:
+                    self._session.input_audio_buffer.append(frame)
+                    continue
+
+                forward = gate.push(frame)
+                for f in forward:
+                    self._session.input_audio_buffer.append(f)
+                INPUT_AUDIO_SECONDS.labels("received").inc(frame_seconds)
+                INPUT_AUDIO_SECONDS.labels("forwarded").inc(
+                    frame_seconds * len(forward)
+                )
+                frame = gate.next_frame()
 
     def _on_participant_connected(self, participant: rtc.RemoteParticipant):
         if self._linked_participant is None:
@@ -260,9 +335,15 @@ class MultimodalAgent(utils.EventEmitter[EventTypes]):
         self._subscribe_to_microphone()
 
     async def _micro_task(self, track: rtc.LocalAudioTrack) -> None:
-        stream_24khz = rtc.AudioStream(track, sample_rate=24000, num_channels=1)
+        stream_24khz = rtc.AudioStream(
+            track, sample_rate=INPUT_SAMPLE_RATE, num_channels=1
+        )
         async for ev in stream_24khz:
-            self._input_audio_ch.send_nowait(ev.frame)
+            dropped = self._input_audio.write(ev.frame.data)
+            if dropped and not self._input_overflowing:
+                logger.warning("input audio buffer full, dropping the oldest audio")
+            self._input_overflowing = dropped > 0
+            self._input_audio_ready.set()
 
     def _subscribe_to_microphone(self, *args, **kwargs) -> None:
         """Subscribe to the participant microphone if found"""
@@ -305,127 +386,402 @@ class MultimodalAgent(utils.EventEmitter[EventTypes]):
 
 class CustomMultimodalAgent(MultimodalAgent):
     def __init__(self, *args, **kwargs):
+        if os.getenv("INPUT_VAD", "0") == "1":
+            kwargs.setdefault("input_gate", GateOptions.from_env())
+        resources = kwargs.pop("resources", None)
+        # the session's instructions without the retrieved context
+        self._instructions = kwargs.pop("instructions", "")
         super().__init__(*args, **kwargs)
-        # Initialize Pinecone
-        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-        openai.api_key = os.getenv("OPENAI_API_KEY_EMBEDDINGS")
-        self._index = pc.Index("overlap")
+        # clients, caches and the retrieval pool are per worker process, shared
+        # by every room it serves (see agent_resources.py)
+        self._resources = resources or shared_resources()
+        self._index = self._resources.index
+        self._embedding_cache = self._resources.embedding_cache
+        self._embedder = self._resources.embedder
+        # embedding + vector query are blocking network calls, keep them off the
+        # loop that forwards audio frames
+        self._retrieval_executor = self._resources.retrieval_executor
+        self._retrieval_timeout = float(os.getenv("RETRIEVAL_TIMEOUT", "2.0"))
+        self._retrieval_top_k = int(os.getenv("RETRIEVAL_TOP_K", "5"))
+        self._retrieval_nearby_k = int(os.getenv("RETRIEVAL_NEARBY_K", "2"))
+        self._retrieval_window = float(os.getenv("RETRIEVAL_WINDOW_SECONDS", "120"))
+        # hybrid: BM25 first, vector search only when the keywords aren't enough
+        self._retrieval_mode = os.getenv("RETRIEVAL_MODE", "hybrid")
+        self._lexical_min_coverage = float(os.getenv("LEXICAL_DECISIVE_COVERAGE", "0.8"))
+        self._lexical_margin = float(os.getenv("LEXICAL_DECISIVE_MARGIN", "1.5"))
+        self._rrf_k = int(os.getenv("RRF_K", "60"))
+        # per room: serves near-paraphrased follow-ups without a vector query
+        self._result_cache = (
+            SemanticResultCache(ResultCacheOptions.from_env())
+            if os.getenv("RESULT_CACHE", "1") == "1"
+            else None
+        )
+        # chunks + embeddings around the playback position, see playback_window.py
+        self._playback = (
+            PlaybackWindow(
+                self._resources.lexical,
+                self._embedder,
+                self._retrieval_executor,
+                behind=self._retrieval_window,
+                ahead=float(os.getenv("PLAYBACK_PREFETCH_AHEAD_SECONDS", "30")),
+                slack=float(os.getenv("PLAYBACK_PREFETCH_SLACK_SECONDS", "60")),
+            )
+            if os.getenv("PLAYBACK_PREFETCH", "1") == "1"
+            else None
+        )
+        self._recent_seconds = float(os.getenv("PLAYBACK_RECENT_SECONDS", "30"))
+        self._retrieval_tasks: set[asyncio.Future] = set()
+        self._loop_lag = LoopLagMonitor()
+
+        # the realtime plugin drops system-role conversation items, so the
+        # retrieved context goes into the session instructions, replacing the
+        # previous one; the id names the context currently in there
+        self._context: str | None = None
+        self._context_id: str | None = None
+
+        # fraction of turns whose retrieval is logged in
+        # full; everything else only shows up in the latency metrics
+        self._log_sample_rate = float(os.getenv("CONTEXT_LOG_SAMPLE_RATE", "0"))
+        self._turn_committed_at: float | None = None
+
+    @property
+    def embedding_cache(self) -> EmbeddingCache:
+        return self._embedding_cache
+
+    @property
+    def result_cache(self) -> SemanticResultCache | None:
+        return self._result_cache
+
+    @property
+    def playback(self) -> PlaybackWindow | None:
+        return self._playback
+
+    @property
+    def loop_lag(self) -> LoopLagMonitor:
+        return self._loop_lag
+
+    def _active_video_id(self) -> str | None:
+        """Video the linked participant is watching, from attributes or metadata"""
+        participant = self._linked_participant
+        if participant is None:
+            return None
+        video_id = participant.attributes.get("video_id")
+        if not video_id and participant.metadata:
+            try:
+                video_id = json.loads(participant.metadata).get("video_id")
+            except ValueError:
+                video_id = None
+        if video_id and not is_video_id(video_id):
+            logger.warning(f"ignoring invalid video_id {video_id!r}")
+            return None
+        return video_id or None
+
+    def _playback_position(self) -> float | None:
+        participant = self._linked_participant
+        if participant is None:
+            return None
+        try:
+            return float(participant.attributes["playback_position"])
+        except (KeyError, ValueError):
+            return None
+
+    def update_playback_position(self) -> None:
+        """Move the prefetched window to the linked participant's position."""
+        video_id, position = self._active_video_id(), self._playback_position()
+        if self._playback is not None and video_id and position is not None:
+            self._playback.update(video_id, position)
+
+    def _sampled(self) -> bool:
+        return self._log_sample_rate > 0 and random.random() < self._log_sample_rate
+
+    def _search_context(
+        self,
+        text: str,
+        *,
+        video_id: str | None = None,
+        position: float | None = None,
+        verbose: bool = False,
+    ) -> list[dict]:
+        """Blocking part of the retrieval, runs on the retrieval executor.
+
+        Returns citations (see :func:`format_citations`) in transcript order.
+
+        The video's BM25 index is searched first; when its best hit is decisive
+        (see :meth:`lexical.BM25Index.decisive`) those hits are used as they are and the
+        embedding round trip is skipped. Otherwise the vector matches are fused
+        with the lexical ones by reciprocal rank. With a playback ``position``
+        the best vector matches near it are added, so "what did they just say"
+        questions find the right lines; they come from the prefetched playback
+        window when it covers the position, and questions about what was just
+        said are answered from it without an embedding. A query whose embedding is close to a
+        recent one for the same video (and position) reuses its citations, see
+        :mod:`result_cache`.
+        """
+        namespace = (
+            video_namespace(video_id, self._resources.profile) if video_id else None
+        )
+        nearby_range = (
+            (position - self._retrieval_window, position + 10.0)
+            if position is not None
+            else None
+        )
+        window = (
+            self._playback.current(video_id, *nearby_range)
+            if self._playback is not None and video_id and nearby_range
+            else None
+        )
+        if window is not None and asks_about_recent(text):
+            recent = window.recent(
+                position, self._recent_seconds, self._retrieval_nearby_k + 1
+            )
+            if recent:
+                RETRIEVAL_PATHS.labels("playback").inc()
+                if verbose:
+                    logger.info(f"Answering {text[:100]!r} from the playback window")
+                return self._citations(recent, verbose)
+        lexical_index = (
+            self._resources.lexical.get(video_id)
+            if video_id and self._retrieval_mode == "hybrid"
+            else None
+        )
+        lexical_hits = []
+        if lexical_index is not None:
+            with span("lexical_search"):
+                lexical_hits = lexical_index.search(text, self._retrieval_top_k)
+            if lexical_index.decisive(
+                text,
+                lexical_hits,
+                min_coverage=self._lexical_min_coverage,
+                margin=self._lexical_margin,
+            ):
+                RETRIEVAL_PATHS.labels("lexical").inc()
+                if verbose:
+                    logger.info(f"Lexical match is decisive for {text[:100]!r}")
+                return self._citations(
+                    [
+                        {"id": hit.id, "score": hit.score, "metadata": hit.metadata}
+                        for hit in lexical_hits
+                    ],
+                    verbose,
+                )
 
-    async def retrieve_context_from_pinecone(self, text_stream) -> str:
+        # Get embeddings
+        with span("retrieval_embed"):
+            embedding = self._embedder.embed([text])[0]
+        if verbose:
+            logger.info(f"Received embedding vector of length: {len(embedding)}")
+            logger.info(f"Embedding cache stats: {self._embedding_cache.stats()}")
+
+        cache = self._result_cache if video_id else None
+        if cache is not None:
+            version = self._resources.manifests.version(video_id, namespace)
+            cached = cache.get(video_id, version, embedding, position=position)
+            if cached is not None:
+                RETRIEVAL_PATHS.labels("cached").inc()
+                if verbose:
+                    logger.info(f"Result cache hit, stats: {cache.stats()}")
+                return cached
+
+        # Query the vector store, scoped to the active video
+        with span("vector_query"):
+            matches = list(
+                self._index.query(
+                    vector=embedding,
+                    top_k=self._retrieval_top_k,
+                    namespace=namespace,
+                    include_metadata=True,
+                )["matches"]
+            )
+            if lexical_hits:
+                matches = fuse_matches(
+                    matches, lexical_hits, self._retrieval_top_k, k=self._rrf_k
+                )
+            if window is not None:
+                nearby = window.nearest(
+                    embedding, *nearby_range, self._retrieval_nearby_k
+                )
+            elif nearby_range is not None:
+                nearby = self._index.query(
+                    vector=embedding,
+                    top_k=self._retrieval_nearby_k,
+                    namespace=namespace,
+                    include_metadata=True,
+                    filter={
+                        "timestamp": {"$gte": nearby_range[0], "$lte": nearby_range[1]}
+                    },
+                )["matches"]
+            else:
+                nearby = []
+            if nearby:
+                seen = {match["id"] for match in matches}
+                matches.extend(match for match in nearby if match["id"] not in seen)
+
+        RETRIEVAL_PATHS.labels("hybrid" if lexical_index is not None else "vector").inc()
+        if verbose:
+            logger.info(
+                f"Received {len(matches)} matches from vector store namespace {namespace!r}"
+            )
+
+        citations = self._citations(matches, verbose)
+        if cache is not None:
+            cache.put(video_id, version, embedding, citations, position=position)
+        return citations
+
+    def _citations(self, matches: list, verbose: bool) -> list[dict]:
+        # Cite the snippets precomputed at ingest
+        matches.sort(key=lambda m: m["metadata"].get("timestamp", 0))
+        citations = []
+        for i, match in enumerate(matches, 1):
+            try:
+                metadata = match['metadata']
+                start = float(metadata.get('context_start', metadata.get('timestamp', 0)))
+                if verbose:
+                    logger.info(f"Match {i}: Score={match['score']:.4f}, Timestamp={start}")
+                citations.append(
+                    {
+                        "id": match["id"],
+                        "start": start,
+                        "end": float(metadata.get("end", start + metadata.get("duration", 0))),
+                        "text": metadata.get('context') or metadata.get('content', ''),
+                        "score": round(float(match["score"]), 4),
+                    }
+                )
+            except Exception as e:
+                logger.error(f"Error processing match {i}: {e}")
+                continue
+
+        if verbose:
+            logger.info(f"Generated {len(citations)} citations: {format_citations(citations)[:200]}...")  # Log first 200 chars
+        return citations
+
+    async def retrieve_context_from_pinecone(self, text_stream) -> list[dict]:
         try:
             # Collect the full text from the stream
             text = ""
             if hasattr(text_stream, '__aiter__'):
-                logger.info("Processing async text stream...")
                 async for chunk in text_stream:
                     text += chunk
             else:
-                logger.info("Processing regular string input...")
                 text = str(text_stream)
-                
-            logger.info(f"Input text for embedding: {text[:100]}...")  # Log first 100 chars
-            
-            # Get embeddings
-            logger.info("Requesting embeddings from OpenAI...")
-            response = openai.embeddings.create(
-                model="text-embedding-3-large",
-                input=text,
+
+            verbose = self._sampled()
+            if verbose:
+                logger.info(f"Input text for embedding: {text[:100]}...")  # Log first 100 chars
+
+            video_id = self._active_video_id()
+            search = functools.partial(
+                self._search_context,
+                text,
+                video_id=video_id,
+                position=self._playback_position(),
+                verbose=verbose,
             )
-            embedding = response.data[0].embedding
-            logger.info(f"Received embedding vector of length: {len(embedding)}")
-            
-            # Query Pinecone
-            logger.info("Querying Pinecone index 'overlap' for similar contexts...")
-            results = self._index.query(
-                vector=embedding,
-                top_k=5,
-                include_metadata=True
+            loop = asyncio.get_running_loop()
+            # includes the wait for a free retrieval thread
+            with span("retrieval"):
+                return await asyncio.wait_for(
+                    loop.run_in_executor(self._retrieval_executor, search),
+                    timeout=self._retrieval_timeout,
+                )
+
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Retrieval timed out after {self._retrieval_timeout}s, "
+                "continuing without context"
             )
-            
-            logger.info(f"Received {len(results['matches'])} matches from Pinecone")
-            
-            # Build context
-            context_items = []
-            for i, match in enumerate(results['matches'], 1):
-                try:
-                    timestamp = match['metadata'].get('timestamp', 'N/A')
-                    score = match.get('score', 'N/A')
-                    logger.info(f"Match {i}: Score={score:.4f}, Timestamp={timestamp}")
-                    context_items.append(f"Timestamp: {timestamp}, Score: {score}")
-                except Exception as e:
-                    logger.error(f"Error processing match {i}: {e}")
-                    continue
-                    
-            context = "\n".join(context_items)
-            logger.info(f"Generated context ({len(context)} chars): {context[:200]}...")  # Log first 200 chars
-            return context
-            
+            return []
         except Exception as e:
             logger.error(f"Error in retrieve_context_from_pinecone: {str(e)}")
             logger.exception("Full traceback:")  # This will log the full stack trace
-            return ""
-
-    async def enhance_with_context(self, text_stream, context: str):
-        """Convert the enhanced text into an async generator to maintain stream compatibility"""
-        async def enhanced_stream():
-            # First yield the context
-            logger.info(f"Enhancing stream with context ({len(context)} chars)")
-            yield context + "\n"
-            
-            # Then yield the original stream contents
-            chunk_count = 0
-            total_chars = 0
-            if hasattr(text_stream, '__aiter__'):
-                logger.info("Streaming original content from async iterator...")
-                async for chunk in text_stream:
-                    chunk_count += 1
-                    total_chars += len(chunk)
-                    logger.debug(f"Yielding chunk {chunk_count} ({len(chunk)} chars)")
-                    yield chunk
-            else:
-                text = str(text_stream)
-                logger.info(f"Yielding original content as single string ({len(text)} chars)")
-                yield text
-                
-            logger.info(f"Stream enhancement complete. Total: {chunk_count} chunks, {total_chars} chars")
-                
-        return enhanced_stream()
+            return []
 
     def start(self, room: rtc.Room, participant: rtc.RemoteParticipant | str | None = None) -> None:
         super().start(room, participant)
+        self._loop_lag.start()
+        # the frontend may have published a position before the agent joined
+        self.update_playback_position()
 
-        @self._session.on("response_content_added")
-        def _on_content_added(message: realtime.RealtimeContent):
-            # Create and run the async task
-            asyncio.create_task(self._handle_content_added(message))
-    
-    async def _handle_content_added(self, message: realtime.RealtimeContent):
-        """Separate async handler for content added events"""
-        logger.info("Processing new response content...")
-        
-        # Retrieve and enhance context
-        logger.info("Retrieving context from Pinecone...")
-        context = await self.retrieve_context_from_pinecone(message.text_stream)
-        
-        logger.info("Enhancing text stream with retrieved context...")
-        enhanced_text_stream = await self.enhance_with_context(message.text_stream, context)
-
-        logger.info("Setting up transcription forwarder...")
-        tr_fwd = transcription.TTSSegmentsForwarder(
-            room=self._room,
-            participant=self._room.local_participant,
-            speed=self._opts.transcription.agent_transcription_speed,
-            sentence_tokenizer=self._opts.transcription.sentence_tokenizer,
-            word_tokenizer=self._opts.transcription.word_tokenizer,
-            hyphenate_word=self._opts.transcription.hyphenate_word,
+        @self._session.on("input_speech_committed")
+        def _on_turn_committed():
+            self._turn_committed_at = time.perf_counter()
+
+        @self.on("agent_started_speaking")
+        def _on_playout_started():
+            # user's turn committed -> first audio frame of the answer played
+            if self._turn_committed_at is not None:
+                observe("playout_start", time.perf_counter() - self._turn_committed_at)
+                self._turn_committed_at = None
+
+        @self._session.on("input_speech_started")
+        def _cancel_retrievals():
+            # the user interrupted, whatever we were looking up is stale now
+            for task in list(self._retrieval_tasks):
+                task.cancel()
+
+        @self._session.on("input_speech_transcription_completed")
+        def _on_user_transcript(ev: realtime.InputTranscriptionCompleted):
+            # retrieve from what the user asked, in parallel with the model's answer
+            if ev.transcript.strip():
+                self._start_retrieval(ev.transcript)
+
+    def _full_instructions(self) -> str:
+        if not self._context:
+            return self._instructions
+        return f"{self._instructions}\n\n{self._context}"
+
+    def update_session(self, **changes) -> None:
+        """``session_update`` that keeps the retrieved context in the instructions."""
+        if "instructions" in changes:
+            self._instructions = changes["instructions"]
+            changes["instructions"] = self._full_instructions()
+        self._session.session_update(**changes)
+
+    def _start_retrieval(self, query: str) -> None:
+        task = asyncio.ensure_future(self._retrieve_and_inject(query))
+        self._retrieval_tasks.add(task)
+        task.add_done_callback(self._retrieval_tasks.discard)
+
+    async def _retrieve_and_inject(self, query: str) -> None:
+        citations = await self.retrieve_context_from_pinecone(query)
+        logger.debug(f"Event loop lag: {self._loop_lag.stats()}")
+        if self._input_gate is not None:
+            logger.debug(f"Input audio gate: {self._input_gate.stats()}")
+        if not citations:
+            return
+        context = format_citations(citations)
+
+        self._context = (
+            f"Context retrieved from the podcast for the user's last question:\n{context}"
         )
+        self._context_id = utils.shortuuid()
+        self._session.session_update(instructions=self._full_instructions())
+        logger.info(f"Injected retrieved context into the session ({len(context)} chars)")
 
-        logger.info("Initiating playout with enhanced stream...")
-        self._playing_handle = self._agent_playout.play(
-            item_id=message.item_id,
-            content_index=message.content_index,
-            transcription_fwd=tr_fwd,
-            text_stream=enhanced_text_stream,
-            audio_stream=message.audio_stream,
+        # the client shows the sources next to the answer; they never go
+        # through the transcription of the agent's speech
+        await self._publish_citations(query, citations, self._context_id)
+
+    async def _publish_citations(
+        self, query: str, citations: list[dict], context_id: str
+    ) -> None:
+        payload = json.dumps(
+            {
+                "video_id": self._active_video_id(),
+                "question": query,
+                # names the context the answer was given with
+                "context_id": context_id,
+                "citations": citations,
+            }
         )
-        logger.info("Playout initiated successfully")
+        destinations = (
+            [self._linked_participant.identity] if self._linked_participant else []
+        )
+        try:
+            await self._room.local_participant.publish_data(
+                payload,
+                reliable=True,
+                destination_identities=destinations,
+                topic=CONTEXT_TOPIC,
+            )
+        except PublishDataError as e:
+            logger.warning(f"Publishing retrieved context failed: {e}")
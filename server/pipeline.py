@@ -0,0 +1,57 @@
+"""Processing of one video: transcript, ingest, summary.
+
+Shared by the ``/process_video`` handler (``server.py``), which runs it as a
+background job, and by ``bulk_ingest.py``.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from ingest import IngestStats, ingest_video, transcript_digest
+from jobs import Job
+from metrics import span
+from services import Services
+
+
+@dataclass
+class ProcessedVideo:
+    transcript: list[dict]
+    summary: str | None
+    stats: IngestStats
+
+
+def process_video(
+    services: Services, video_id: str, job: Job, *, summarize: bool = True
+) -> ProcessedVideo:
+    """Fetch, (re-)ingest and summarize ``video_id``, reporting stages on ``job``."""
+    job.set_stage("transcript")
+    with span("transcript_fetch"):
+        transcript = services.transcripts.get(video_id).entries()
+
+    # embeddings into the vector store, plus the BM25 index
+    job.set_stage("embed", total=len(transcript))
+    with span("ingest"):
+        stats = ingest_video(
+            video_id,
+            transcript,
+            embedder=services.embedder,
+            index=services.index,
+            manifests=services.manifests,
+            options=services.ingest_options,
+            on_progress=job.progress,
+            lexical=services.lexical,
+            profile=services.embedding_profile,
+        )
+
+    summary = None
+    if summarize:
+        job.set_stage("summarize")
+        with span("summarize"):
+            summary = services.summarizer.summarize(
+                video_id,
+                transcript,
+                transcript_digest(transcript),
+                on_token=job.add_token,
+            )
+    return ProcessedVideo(transcript, summary, stats)
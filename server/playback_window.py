@@ -0,0 +1,247 @@
+"""Transcript chunks around the viewer's playback position, kept in memory.
+
+The frontend publishes the position of the video player as the
+``playback_position`` participant attribute. :class:`PlaybackWindow` keeps
+the chunks from ``behind`` seconds before to ``ahead`` seconds after it, with
+their embeddings, and moves the window in the background when the position
+leaves the part already loaded (slack on both sides avoids reloading on every
+update during normal playback).
+
+The chunks come from the video's BM25 index (see :mod:`lexical`), which holds
+the ID, text and metadata of every ingested segment. Their embeddings are
+requested through the cached embedder with the same texts ingest embedded,
+so they are cache hits, and chunks that stay in the window are not
+re-embedded. A re-ingest replaces the index file, which reloads the window.
+
+With a loaded window, :meth:`Window.nearest` replaces the vector-store query
+for matches near the position, and "what did he just say" questions
+(:func:`asks_about_recent`) are answered by :meth:`Window.recent` without an
+embedding at all.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+from collections.abc import Sequence
+from concurrent.futures import Executor
+from dataclasses import dataclass
+
+import numpy as np
+import openai
+
+from embeddings import Embedder
+from lexical import BM25Index, LexicalStore
+
+logger = logging.getLogger("overlap-playback-window")
+
+_RECENT = re.compile(
+    r"\bjust (said|say|says|mention\w*|talk\w*|explain\w*|happen\w*)\b"
+    r"|\bright now\b|\ba (second|moment|minute) ago\b|\bthis part\b",
+    re.IGNORECASE,
+)
+
+
+def asks_about_recent(question: str) -> bool:
+    """Whether ``question`` is about what was said right before the position."""
+    return _RECENT.search(question) is not None
+
+
+@dataclass(frozen=True)
+class Window:
+    """Chunks of ``video_id`` starting between ``start`` and ``end`` seconds."""
+
+    video_id: str
+    source: BM25Index
+    start: float
+    end: float
+    ids: list[str]
+    metadata: list[dict]
+    timestamps: np.ndarray
+    ends: np.ndarray
+    """End time of every chunk, its start plus duration for caption lines"""
+    vectors: np.ndarray
+    """Unit-length embeddings, one row per chunk"""
+
+    def covers(self, start: float, end: float) -> bool:
+        return self.start <= start and end <= self.end
+
+    def _rows(self, start: float, end: float) -> slice:
+        lo = np.searchsorted(self.timestamps, start, side="left")
+        hi = np.searchsorted(self.timestamps, end, side="right")
+        return slice(int(lo), int(hi))
+
+    def _match(self, row: int, score: float) -> dict:
+        return {"id": self.ids[row], "score": score, "metadata": self.metadata[row]}
+
+    def nearest(
+        self, vector: Sequence[float], start: float, end: float, top_k: int
+    ) -> list[dict]:
+        """The ``top_k`` chunks starting in ``[start, end]`` most similar to
+        ``vector``, shaped like vector-store matches."""
+        rows = self._rows(start, end)
+        if rows.start >= rows.stop or top_k <= 0:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        scores = self.vectors[rows] @ query
+        best = np.argsort(-scores, kind="stable")[:top_k]
+        return [self._match(rows.start + int(i), float(scores[i])) for i in best]
+
+    def recent(self, position: float, seconds: float, count: int) -> list[dict]:
+        """The last ``count`` chunks played in the ``seconds`` before ``position``.
+
+        A chunk counts when it ends after ``position - seconds``, so the chunk
+        playing at ``position`` is included however long ago it started.
+        """
+        if count <= 0:
+            return []
+        stop = int(np.searchsorted(self.timestamps, position, side="right"))
+        rows = np.flatnonzero(self.ends[:stop] >= position - seconds)
+        return [self._match(int(row), 1.0) for row in rows[-count:]]
+
+
+class PlaybackWindow:
+    """Sliding :class:`Window` of one room, moved by :meth:`update`.
+
+    Parameters
+    ----------
+    behind, ahead
+        Seconds of transcript kept before and after the position.
+    slack
+        Extra seconds loaded on both sides, so the window only moves every
+        ``slack`` seconds of playback.
+    """
+
+    def __init__(
+        self,
+        lexical: LexicalStore,
+        embedder: Embedder,
+        executor: Executor,
+        *,
+        behind: float = 120.0,
+        ahead: float = 30.0,
+        slack: float = 60.0,
+    ):
+        self._lexical = lexical
+        self._embedder = embedder
+        self._executor = executor
+        self.behind = behind
+        self.ahead = ahead
+        self.slack = slack
+        self._window: Window | None = None
+        # start and end times of every chunk of the last index loaded from
+        self._timestamps: tuple[BM25Index, np.ndarray, np.ndarray] | None = None
+        self._wanted: tuple[str, float] | None = None
+        self._task: asyncio.Task | None = None
+        self.loads = 0
+        self.embedded = 0  # chunk embeddings requested, cache hits included
+
+    def current(self, video_id: str, start: float, end: float) -> Window | None:
+        """The loaded window if it covers ``[start, end]`` of the current ingest."""
+        window = self._window
+        if (
+            window is None
+            or window.video_id != video_id
+            or not window.covers(start, end)
+            # a re-ingest replaced the index
+            or self._lexical.get(video_id) is not window.source
+        ):
+            return None
+        return window
+
+    def update(self, video_id: str, position: float) -> None:
+        """Move the window to ``position``; loads in the background if needed."""
+        self._wanted = (video_id, position)
+        if self.current(video_id, position - self.behind, position + self.ahead):
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        # positions keep arriving while a load runs, load again for the last one
+        while self._wanted is not None:
+            video_id, position = self._wanted
+            if self.current(video_id, position - self.behind, position + self.ahead):
+                return
+            try:
+                window = await loop.run_in_executor(
+                    self._executor, self._load, video_id, position
+                )
+            except (openai.OpenAIError, OSError, ValueError) as e:
+                # keep the old window, questions it misses use the vector store
+                logger.warning(f"prefetching the playback window failed: {e}")
+                return
+            if window is None:
+                return
+            self._window = window
+
+    def _load(self, video_id: str, position: float) -> Window | None:
+        index = self._lexical.get(video_id)
+        if index is None or not len(index):
+            return None
+        if self._timestamps is None or self._timestamps[0] is not index:
+            starts = np.asarray(
+                [float(m.get("timestamp", 0.0)) for m in index.metadata]
+            )
+            ends = np.asarray(
+                [
+                    float(
+                        m.get("end", m.get("timestamp", 0.0) + m.get("duration", 0.0))
+                    )
+                    for m in index.metadata
+                ]
+            )
+            self._timestamps = (index, starts, ends)
+        _, timestamps, ends = self._timestamps
+        previous = self._window
+        if previous is not None and previous.source is not index:
+            previous = None
+        start = position - self.behind - self.slack
+        end = position + self.ahead + self.slack
+        lo = int(np.searchsorted(timestamps, start, side="left"))
+        hi = int(np.searchsorted(timestamps, end, side="right"))
+
+        known = (
+            dict(zip(previous.ids, previous.vectors)) if previous is not None else {}
+        )
+        ids = index.ids[lo:hi]
+        metadata = index.metadata[lo:hi]
+        missing = [i for i, vector_id in enumerate(ids) if vector_id not in known]
+        if missing:
+            embeddings = self._embedder.embed(
+                [metadata[i].get("content", "") for i in missing]
+            )
+            self.embedded += len(missing)
+            for i, embedding in zip(missing, embeddings):
+                vector = np.asarray(embedding, dtype=np.float32)
+                known[ids[i]] = vector / (np.linalg.norm(vector) or 1.0)
+        dims = len(next(iter(known.values()))) if known else 0
+        vectors = (
+            np.stack([known[vector_id] for vector_id in ids])
+            if ids
+            else np.zeros((0, dims), dtype=np.float32)
+        )
+        self.loads += 1
+        logger.debug(
+            f"playback window of {video_id} at {position:.0f}s: {len(ids)} chunks, "
+            f"{len(missing)} embedded"
+        )
+        return Window(
+            video_id=video_id,
+            source=index,
+            start=start,
+            end=end,
+            ids=list(ids),
+            metadata=list(metadata),
+            timestamps=timestamps[lo:hi],
+            ends=ends[lo:hi],
+            vectors=vectors,
+        )
+
+    async def aclose(self) -> None:
+        self._wanted = None
+        if self._task is not None:
+            self._task.cancel()
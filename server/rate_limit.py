@@ -0,0 +1,87 @@
+"""Client-side rate limiting of the embeddings API.
+
+The API limits requests and tokens per minute per organization. Bulk ingest
+(``bulk_ingest.py``) runs several videos at once, each with its own pool of
+embedding batches, so a shared :class:`RateLimiter` keeps all of them under
+the limits instead of letting them run into 429s and back off one by one.
+:class:`RateLimitedEmbedder` goes between the cache and the API client, so
+cache hits are not counted.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Sequence
+
+from chunking import estimate_tokens
+from embeddings import Embedder
+
+
+class RateLimiter:
+    """Token buckets for requests and tokens per minute, shared by threads.
+
+    Both buckets hold up to one minute of budget and refill continuously. A
+    limit of 0 disables that bucket.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited = 0.0
+        """Seconds callers spent blocked in :meth:`acquire`"""
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(
+            self.requests_per_minute,
+            self._requests + elapsed * self.requests_per_minute / 60,
+        )
+        self._tokens = min(
+            self.tokens_per_minute,
+            self._tokens + elapsed * self.tokens_per_minute / 60,
+        )
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Block until one request of ``tokens`` tokens fits in both budgets."""
+        if tokens > self.tokens_per_minute > 0:
+            # larger than the whole bucket: wait for a full one
+            tokens = int(self.tokens_per_minute)
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = 0.0
+                if self.requests_per_minute > 0 and self._requests < 1:
+                    wait = (1 - self._requests) * 60 / self.requests_per_minute
+                if self.tokens_per_minute > 0 and self._tokens < tokens:
+                    wait = max(
+                        wait, (tokens - self._tokens) * 60 / self.tokens_per_minute
+                    )
+                if wait == 0.0:
+                    if self.requests_per_minute > 0:
+                        self._requests -= 1
+                    if self.tokens_per_minute > 0:
+                        self._tokens -= tokens
+                    self.waited += now - started
+                    return
+            time.sleep(wait)
+
+
+class RateLimitedEmbedder:
+    """An :class:`~embeddings.Embedder` whose calls wait for ``limiter``."""
+
+    def __init__(self, embedder: Embedder, limiter: RateLimiter):
+        self._embedder = embedder
+        self.limiter = limiter
+        self.model = embedder.model
+
+    def embed(self, texts: Sequence[str]) -> list[list[float]]:
+        self.limiter.acquire(sum(estimate_tokens(text) for text in texts))
+        return self._embedder.embed(texts)
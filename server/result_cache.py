@@ -0,0 +1,169 @@
+"""Per-room cache of retrieval results, looked up by query similarity.
+
+Follow-up questions are often near-paraphrases of an earlier one ("what did
+he say about the layoffs" / "what was that about layoffs again"). Their
+embedding is still computed (it is cached by exact text only), but when it is
+close enough to the embedding of a question answered recently for the same
+video, that answer's citations are reused and the vector-store queries are
+skipped.
+
+Entries of one video are kept as rows of a matrix, so a lookup is one
+matrix-vector product over at most ``max_entries`` rows. Entries expire after
+``ttl`` seconds; when the cache is full, expired rows go first, then the least
+recently used. Every entry remembers the ingest version of its video (see
+:meth:`ingest.ManifestStore.version`); a lookup with a newer version drops
+all of the video's entries.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class ResultCacheOptions:
+    threshold: float = 0.95
+    """Minimum cosine similarity between a query and a cached one"""
+    ttl: float = 300.0
+    """Seconds an entry is served"""
+    max_entries: int = 32
+    """Entries kept per video"""
+    position_tolerance: float = 15.0
+    """Playback positions (seconds) of a query and a cached one may differ by this
+    much, results include matches near the position"""
+
+    @classmethod
+    def from_env(cls) -> ResultCacheOptions:
+        return cls(
+            threshold=float(os.getenv("RESULT_CACHE_THRESHOLD", cls.threshold)),
+            ttl=float(os.getenv("RESULT_CACHE_TTL_SECONDS", cls.ttl)),
+            max_entries=int(os.getenv("RESULT_CACHE_ENTRIES", cls.max_entries)),
+            position_tolerance=float(
+                os.getenv("RESULT_CACHE_POSITION_TOLERANCE", cls.position_tolerance)
+            ),
+        )
+
+
+class _VideoEntries:
+    def __init__(self, version, dim: int, capacity: int):
+        self.version = version
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        # NaN position: the query had none; -inf created: the row is empty
+        self.positions = np.full(capacity, np.nan)
+        self.created = np.full(capacity, -np.inf)
+        self.used = np.full(capacity, -np.inf)
+        self.results: list[list[dict] | None] = [None] * capacity
+
+
+class SemanticResultCache:
+    """Retrieval results of one room, per video, keyed by query embedding.
+
+    Thread-safe: lookups run on the retrieval executor.
+    """
+
+    def __init__(self, options: ResultCacheOptions | None = None):
+        self.options = options or ResultCacheOptions()
+        self._videos: dict[str, _VideoEntries] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _entries(self, video_id: str, version) -> _VideoEntries | None:
+        entries = self._videos.get(video_id)
+        if entries is not None and entries.version != version:
+            # the video was re-ingested, its segments may have changed
+            del self._videos[video_id]
+            self.invalidations += 1
+            return None
+        return entries
+
+    def _live(self, entries: _VideoEntries, position: float | None, now: float):
+        live = entries.created > now - self.options.ttl
+        if position is None:
+            return live & np.isnan(entries.positions)
+        with np.errstate(invalid="ignore"):
+            near = np.abs(entries.positions - position) <= (
+                self.options.position_tolerance
+            )
+        return live & near
+
+    def get(
+        self,
+        video_id: str,
+        version,
+        vector: Sequence[float],
+        *,
+        position: float | None = None,
+    ) -> list[dict] | None:
+        """Results of the most similar cached query, if similar enough."""
+        query = _unit(vector)
+        now = time.monotonic()
+        with self._lock:
+            entries = self._entries(video_id, version)
+            if entries is None or entries.vectors.shape[1] != len(query):
+                self.misses += 1
+                return None
+            scores = entries.vectors @ query
+            scores[~self._live(entries, position, now)] = -np.inf
+            best = int(np.argmax(scores))
+            if scores[best] < self.options.threshold:
+                self.misses += 1
+                return None
+            entries.used[best] = now
+            self.hits += 1
+            return entries.results[best]
+
+    def put(
+        self,
+        video_id: str,
+        version,
+        vector: Sequence[float],
+        results: list[dict],
+        *,
+        position: float | None = None,
+    ) -> None:
+        query = _unit(vector)
+        now = time.monotonic()
+        with self._lock:
+            entries = self._entries(video_id, version)
+            if entries is None or entries.vectors.shape[1] != len(query):
+                entries = self._videos[video_id] = _VideoEntries(
+                    version, len(query), self.options.max_entries
+                )
+            expired = entries.created <= now - self.options.ttl
+            # an empty or expired row if there is one, else the least recently used
+            row = int(np.argmax(expired) if expired.any() else np.argmin(entries.used))
+            entries.vectors[row] = query
+            entries.positions[row] = np.nan if position is None else position
+            entries.created[row] = entries.used[row] = now
+            entries.results[row] = results
+
+    def invalidate(self, video_id: str | None = None) -> None:
+        """Forget the entries of ``video_id``, or of every video."""
+        with self._lock:
+            if video_id is None:
+                self._videos.clear()
+            else:
+                self._videos.pop(video_id, None)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "videos": len(self._videos),
+            }
+
+
+def _unit(vector: Sequence[float]) -> np.ndarray:
+    query = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(query))
+    return query / norm if norm else query
@@ -1,12 +1,19 @@
+import json
+import logging
 import os
-import uuid
 
-import openai
 from dotenv import load_dotenv
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
-from pinecone import Pinecone
-from youtube_transcript_api import YouTubeTranscriptApi
+
+from jobs import QueueFull
+from metrics import render as render_metrics
+from metrics import span
+from pipeline import process_video as process_video_pipeline
+from services import Services
+from transcript_store import is_video_id
+
+logger = logging.getLogger("overlap-server")
 
 app = Flask(__name__)
 # Update CORS configuration
@@ -16,7 +23,7 @@ CORS(app, resources={
             "http://localhost:3000",  # Development
             "https://your-production-domain.com"  # Prod
         ],
-        "methods": ["POST", "OPTIONS"],
+        "methods": ["GET", "POST", "OPTIONS"],
         "allow_headers": ["Content-Type"],
         "max_age": 3600
     }
@@ -25,10 +32,10 @@ CORS(app, resources={
 # Load environment variables
 load_dotenv()
 
-# Initialize OpenAI and Pinecone
-openai.api_key = os.getenv("OPENAI_API_KEY_EMBEDDINGS")
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-index = pc.Index(os.getenv("PINECONE_INDEX"))
+# OpenAI, the vector store (Pinecone unless VECTOR_BACKEND=local) and the job
+# queue are created on first use, once per worker process (see gunicorn.conf.py)
+services = Services.from_env()
+os.register_at_fork(after_in_child=services.reset)
 
 @app.route('/transcript', methods=['POST'])
 def get_transcript():
@@ -36,14 +43,100 @@ def get_transcript():
     video_id = data.get('videoId')
     if not video_id:
         return jsonify({"error": "Missing video_id in request body"}), 400
+    if not is_video_id(video_id):
+        return jsonify({"error": "Invalid video_id"}), 400
 
     try:
-        transcript = YouTubeTranscriptApi.get_transcript(video_id)
-        return jsonify({"transcript": transcript})
+        with span("transcript_fetch"):
+            transcript = services.transcripts.get(video_id)
     except Exception as e:
         print(f"Error fetching transcript: {e}")
         return jsonify({"error": "Failed to fetch transcript"}), 500
 
+    # lazy loading: either a time range in seconds or an offset/limit page
+    try:
+        if data.get('start') is not None or data.get('end') is not None:
+            first, last = transcript.index_range(
+                float(data.get('start') or 0), float(data.get('end') or float('inf'))
+            )
+        else:
+            first = int(data.get('offset') or 0)
+            limit = data.get('limit')
+            last = len(transcript) if limit is None else first + int(limit)
+            if first < 0 or last < first:
+                raise ValueError("negative offset or limit")
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid range parameters"}), 400
+
+    first = max(0, first)
+    last = min(len(transcript), last)
+    return jsonify({
+        "transcript": transcript.entries(first, last),
+        "offset": first,
+        "total": len(transcript),
+        "nextOffset": last if last < len(transcript) else None,
+    })
+
+def run_process_video(video_id, job):
+    # transcript, embeddings (vector store + BM25 index), summary
+    result = process_video_pipeline(services, video_id, job)
+    stats = result.stats
+    print(
+        f"Ingested {stats.lines} segments from {stats.source_lines} lines "
+        f"({stats.skipped} unchanged, {stats.deleted} removed) in {stats.seconds:.2f}s"
+    )
+
+    return {
+        "status": "success",
+        "transcript": result.transcript,
+        "summary": result.summary
+    }
+
+TRANSCRIPT_PAGE_SIZE = 500
+
+def stream_process_video(video_id, job, sse):
+    """Transcript pages, ingest progress and summary tokens as they become ready"""
+    def event(kind, payload):
+        body = json.dumps({"type": kind, **payload})
+        return f"event: {kind}\ndata: {body}\n\n" if sse else body + "\n"
+
+    try:
+        with span("transcript_fetch"):
+            transcript = services.transcripts.get(video_id)
+    except Exception:
+        logger.exception("fetching the transcript of %s failed", video_id)
+        yield event("error", {"error": "Failed to fetch transcript"})
+        return
+
+    for first in range(0, len(transcript), TRANSCRIPT_PAGE_SIZE):
+        yield event("transcript", {
+            "offset": first,
+            "total": len(transcript),
+            "entries": transcript.entries(first, first + TRANSCRIPT_PAGE_SIZE),
+        })
+
+    version, sent_tokens, last_progress = -1, 0, None
+    while True:
+        version = job.wait_for_update(version, timeout=15)
+        finished = job.wait(0)
+        progress = (job.stage, job.percent)
+        if progress != last_progress:
+            last_progress = progress
+            yield event("progress", {"stage": job.stage, "percent": job.percent})
+        tokens = job.tokens[sent_tokens:]
+        if tokens:
+            sent_tokens += len(tokens)
+            yield event("summary", {"delta": "".join(tokens)})
+        if finished:
+            break
+
+    if job.status == "succeeded":
+        yield event("done", {"summary": job.result["summary"]})
+    else:
+        # the job logged its traceback when it failed
+        logger.error("processing %s failed: %s", video_id, job.error)
+        yield event("error", {"error": "Failed to process video"})
+
 @app.route('/process_video', methods=['POST'])
 def process_video():
     print("Received request for /process_video")  
@@ -51,45 +144,64 @@ def process_video():
     video_id = data.get('videoId')
     if not video_id:
         return jsonify({"error": "Missing video_id in request body"}), 400
+    if not is_video_id(video_id):
+        return jsonify({"error": "Invalid video_id"}), 400
 
     try:
-        # Get transcript
-        transcript = YouTubeTranscriptApi.get_transcript(video_id)
-        
-        # Generate embeddings and store in Pinecone
-        for entry in transcript:
-            sentence = entry['text']
-            timestamp = entry['start']
-            duration = entry['duration']
-            # Updated embedding creation using new OpenAI client
-            response = openai.embeddings.create(
-                model="text-embedding-3-large",
-                input=sentence
-            )
-            embedding = response.data[0].embedding
-            
-            namespace = f"overlap_{video_id}_embeddings"
-            index.upsert([(str(uuid.uuid4()), embedding, {"timestamp": timestamp, "duration": duration, "content": sentence})], namespace=namespace)
-
-        full_transcript = ' '.join([entry['text'] for entry in transcript])
-        summary_response = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are an expert at summarizing and you write elaborate and info-packed summarizes with all the key insights and including all the important concepts from text. Write the summary in exactly 10 sentences."},
-                {"role": "user", "content": full_transcript}
-            ]
+        job = services.jobs.submit(
+            video_id, lambda job: run_process_video(video_id, job)
         )
-        summary = summary_response.choices[0].message.content
-
-        return jsonify({
-            "status": "success",
-            "transcript": transcript,
-            "summary": summary
-        }), 200
-        
-    except Exception as e:
-        print(f"Error processing video: {e}")
+    except QueueFull:
+        return jsonify({"error": "Server busy, try again later"}), 503
+
+    # async clients poll /jobs/<id>, everyone else waits for the (shared) job
+    if data.get('async') or request.args.get('async'):
+        return jsonify(job.to_dict()), 202
+
+    accept = request.headers.get('Accept', '')
+    sse = 'text/event-stream' in accept
+    if data.get('stream') or sse or 'application/x-ndjson' in accept:
+        return Response(
+            stream_with_context(stream_process_video(video_id, job, sse)),
+            mimetype='text/event-stream' if sse else 'application/x-ndjson',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+        )
+
+    job.wait()
+    if job.status != "succeeded":
+        print(f"Error processing video: {job.error}")
         return jsonify({"error": "Failed to process video"}), 500
 
+    return jsonify(job.result), 200
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = services.jobs.get(job_id)
+    if job is None:
+        # with several workers the job may be running in another process
+        state = services.jobs.load_state(job_id)
+        if state is None:
+            return jsonify({"error": "Unknown job"}), 404
+        return jsonify(state), 200
+
+    body = job.to_dict()
+    if job.status == "succeeded":
+        # like the state saved for other workers; the transcript is on /transcript
+        body["result"] = job.saved_result()
+    return jsonify(body), 200
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify({"status": "ok", "pid": os.getpid()})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
+@app.route('/stats/embedding_cache', methods=['GET'])
+def embedding_cache_stats():
+    return jsonify(services.embedding_cache.stats())
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,172 @@
+"""Per-process clients and stores used by the Flask server.
+
+Nothing is created until first use, and everything is dropped in a forked
+child, so a gunicorn master that imports ``server`` (``--preload``) never
+hands its sockets, SQLite connections or thread pools to the workers. Each
+worker builds its own pooled OpenAI client, vector-store client and job queue.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from typing import Any, Callable, TypeVar
+
+import httpx
+import openai
+
+from embeddings import (
+    CachedEmbedder,
+    EmbeddingCache,
+    EmbeddingProfile,
+    OpenAIEmbedder,
+)
+from ingest import IngestOptions, ManifestStore
+from jobs import JobQueue
+from lexical import LexicalStore
+from rate_limit import RateLimitedEmbedder, RateLimiter
+from summarize import Summarizer, SummaryCache
+from transcript_store import TranscriptStore
+from vector_store import VectorStore, open_vector_store
+
+logger = logging.getLogger("overlap-services")
+
+T = TypeVar("T")
+
+
+class Services:
+    """Lazily built, process-local dependencies of the request handlers.
+
+    Parameters
+    ----------
+    max_connections
+        Size of the OpenAI HTTP connection pool; match it to the number of
+        request threads plus background job threads of one worker.
+    timeout
+        OpenAI request timeout in seconds.
+    embedding_limiter
+        Shared budget of the embedding requests that miss the cache.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_connections: int = 32,
+        timeout: float = 60.0,
+        embedding_limiter: RateLimiter | None = None,
+    ):
+        self._max_connections = max_connections
+        self._timeout = timeout
+        self._embedding_limiter = embedding_limiter
+        self._instances: dict[str, Any] = {}
+        # re-entrant: building the embedder needs the OpenAI client, and so on
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_env(cls) -> Services:
+        return cls(
+            max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "32")),
+            timeout=float(os.getenv("OPENAI_TIMEOUT", "60")),
+        )
+
+    def _get(self, name: str, factory: Callable[[], T]) -> T:
+        with self._lock:
+            if name not in self._instances:
+                logger.info("initializing %s in process %d", name, os.getpid())
+                self._instances[name] = factory()
+            return self._instances[name]
+
+    @property
+    def openai(self) -> openai.OpenAI:
+        return self._get(
+            "openai",
+            lambda: openai.OpenAI(
+                api_key=os.getenv("OPENAI_API_KEY_EMBEDDINGS"),
+                timeout=self._timeout,
+                http_client=openai.DefaultHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=self._max_connections,
+                        max_keepalive_connections=self._max_connections,
+                    )
+                ),
+            ),
+        )
+
+    @property
+    def embedding_profile(self) -> EmbeddingProfile:
+        return self._get("embedding_profile", EmbeddingProfile.from_env)
+
+    @property
+    def index(self) -> VectorStore:
+        return self._get(
+            "index", lambda: open_vector_store(profile=self.embedding_profile)
+        )
+
+    @property
+    def embedding_cache(self) -> EmbeddingCache:
+        return self._get("embedding_cache", EmbeddingCache.from_env)
+
+    @property
+    def api_embedder(self) -> OpenAIEmbedder:
+        """The uncached embedder, its counters are the API usage."""
+        return self._get(
+            "api_embedder",
+            lambda: OpenAIEmbedder.for_profile(self.embedding_profile, self.openai),
+        )
+
+    @property
+    def embedder(self) -> CachedEmbedder:
+        def build() -> CachedEmbedder:
+            embedder = self.api_embedder
+            if self._embedding_limiter is not None:
+                embedder = RateLimitedEmbedder(embedder, self._embedding_limiter)
+            return CachedEmbedder(embedder, self.embedding_cache)
+
+        return self._get("embedder", build)
+
+    @property
+    def ingest_options(self) -> IngestOptions:
+        return self._get("ingest_options", IngestOptions.from_env)
+
+    @property
+    def lexical(self) -> LexicalStore:
+        return self._get("lexical", LexicalStore)
+
+    @property
+    def manifests(self) -> ManifestStore:
+        return self._get("manifests", ManifestStore)
+
+    @property
+    def jobs(self) -> JobQueue:
+        return self._get("jobs", JobQueue.from_env)
+
+    @property
+    def summarizer(self) -> Summarizer:
+        return self._get(
+            "summarizer",
+            lambda: Summarizer.from_env(client=self.openai, cache=SummaryCache()),
+        )
+
+    @property
+    def transcripts(self) -> TranscriptStore:
+        return self._get("transcripts", TranscriptStore.from_env)
+
+    def reset(self) -> None:
+        """Forget every instance without closing it (they belong to the parent)."""
+        self._instances = {}
+        self._lock = threading.RLock()
+
+    def close(self, wait: bool = True) -> None:
+        """Finish running jobs, drop queued ones and release the clients."""
+        with self._lock:
+            instances, self._instances = self._instances, {}
+        if "jobs" in instances:
+            instances["jobs"].shutdown(wait=wait, cancel_pending=True)
+        if "index" in instances:
+            instances["index"].flush()
+        if "embedding_cache" in instances:
+            instances["embedding_cache"].close()
+        if "openai" in instances:
+            instances["openai"].close()
+        logger.info("closed services of process %d", os.getpid())
@@ -0,0 +1,181 @@
+"""Energy-based speech gate in front of the realtime session's input buffer.
+
+While the user listens to the podcast the microphone mostly carries silence or
+room noise, and streaming it costs uplink bandwidth and model input tokens.
+The gate measures each 100ms frame's level against an adaptive noise floor and
+only forwards speech, plus ``pre_roll_ms`` of audio before it (so the onset is
+not clipped) and ``post_roll_ms`` after it. The post-roll must be longer than
+the server VAD's ``silence_duration_ms``, otherwise the model never sees the
+silence that ends the user's turn.
+
+Frames are allocated once (``pre_roll + 1`` of them) and reused round-robin.
+
+Run it on a recording to see how much audio would be suppressed::
+
+    python speech_gate.py recording.wav --threshold-db -50
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import wave
+from dataclasses import dataclass
+from typing import Callable, Generic, Protocol, TypeVar
+
+import numpy as np
+
+
+class _Frame(Protocol):
+    @property
+    def data(self) -> memoryview: ...
+
+
+F = TypeVar("F", bound=_Frame)
+
+
+@dataclass(frozen=True)
+class GateOptions:
+    threshold_db: float = -50.0
+    """Frames quieter than this (dBFS) are never speech"""
+    margin_db: float = 10.0
+    """Speech must also be this much louder than the noise floor"""
+    pre_roll_ms: int = 300
+    """Audio forwarded from before the first speech frame"""
+    post_roll_ms: int = 1000
+    """Audio forwarded after the last speech frame"""
+    frame_ms: int = 100
+    """Duration of the frames pushed into the gate"""
+
+    @classmethod
+    def from_env(cls) -> GateOptions:
+        return cls(
+            threshold_db=float(os.getenv("INPUT_VAD_THRESHOLD_DB", cls.threshold_db)),
+            margin_db=float(os.getenv("INPUT_VAD_MARGIN_DB", cls.margin_db)),
+            pre_roll_ms=int(os.getenv("INPUT_VAD_PRE_ROLL_MS", cls.pre_roll_ms)),
+            post_roll_ms=int(os.getenv("INPUT_VAD_POST_ROLL_MS", cls.post_roll_ms)),
+        )
+
+
+def level_db(samples: np.ndarray, scratch: np.ndarray) -> float:
+    """RMS level of int16 ``samples`` in dBFS, squaring into ``scratch``."""
+    np.square(samples, out=scratch, dtype=np.float32)
+    mean = float(scratch.mean()) / (32768.0 * 32768.0)
+    return 10.0 * math.log10(mean + 1e-12)
+
+
+class SpeechGate(Generic[F]):
+    """Decides per frame whether audio is forwarded.
+
+    Parameters
+    ----------
+    make_frame
+        Builds one empty frame of ``options.frame_ms``; called ``pre_roll + 1``
+        times up front.
+    """
+
+    def __init__(self, make_frame: Callable[[], F], options: GateOptions):
+        self._options = options
+        self._pre_roll = max(0, math.ceil(options.pre_roll_ms / options.frame_ms))
+        self._post_roll = max(0, math.ceil(options.post_roll_ms / options.frame_ms))
+        self._frames = [make_frame() for _ in range(self._pre_roll + 1)]
+        self._next = 0
+        self._held: list[F] = []  # frames kept as pre-roll, oldest first
+        self._scratch = np.empty(len(self._frames[0].data), dtype=np.float32)
+        self._noise_floor = options.threshold_db
+        self._hangover = 0
+
+        self.frames = 0
+        self.forwarded = 0
+
+    def next_frame(self) -> F:
+        """Frame to fill before the next :meth:`push`."""
+        frame = self._frames[self._next]
+        self._next = (self._next + 1) % len(self._frames)
+        return frame
+
+    def push(self, frame: F) -> list[F]:
+        """Frames to forward now, oldest first (empty while it is quiet)."""
+        self.frames += 1
+        level = level_db(np.frombuffer(frame.data, dtype=np.int16), self._scratch)
+        speech = level > max(
+            self._options.threshold_db, self._noise_floor + self._options.margin_db
+        )
+        if not speech:
+            # follow drops immediately, rises slowly (~10s to adapt)
+            if level < self._noise_floor:
+                self._noise_floor = level
+            else:
+                self._noise_floor += 0.01 * (level - self._noise_floor)
+
+        if speech:
+            self._hangover = self._post_roll
+            out, self._held = [*self._held, frame], []
+        elif self._hangover > 0:
+            self._hangover -= 1
+            out = [frame]
+        else:
+            # hold it as pre-roll; its slot is reused once pre_roll newer
+            # frames have been handed out
+            self._held.append(frame)
+            if len(self._held) > self._pre_roll:
+                self._held.pop(0)
+            out = []
+        self.forwarded += len(out)
+        return out
+
+    @property
+    def suppressed_percent(self) -> float:
+        if not self.frames:
+            return 0.0
+        return 100.0 * (self.frames - self.forwarded) / self.frames
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "frames": self.frames,
+            "forwarded": self.forwarded,
+            "suppressed_percent": round(self.suppressed_percent, 1),
+            "noise_floor_db": round(self._noise_floor, 1),
+        }
+
+
+class _ArrayFrame:
+    def __init__(self, samples: int):
+        self._data = bytearray(2 * samples)
+
+    @property
+    def data(self) -> memoryview:
+        return memoryview(self._data).cast("h")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("recording", help="16-bit mono WAV")
+    parser.add_argument("--threshold-db", type=float, default=GateOptions.threshold_db)
+    parser.add_argument("--margin-db", type=float, default=GateOptions.margin_db)
+    parser.add_argument("--pre-roll-ms", type=int, default=GateOptions.pre_roll_ms)
+    parser.add_argument("--post-roll-ms", type=int, default=GateOptions.post_roll_ms)
+    args = parser.parse_args()
+
+    with wave.open(args.recording, "rb") as f:
+        if f.getsampwidth() != 2 or f.getnchannels() != 1:
+            parser.error("expected a 16-bit mono WAV")
+        rate = f.getframerate()
+        audio = f.readframes(f.getnframes())
+
+    options = GateOptions(
+        args.threshold_db, args.margin_db, args.pre_roll_ms, args.post_roll_ms
+    )
+    samples = rate * options.frame_ms // 1000
+    gate = SpeechGate(lambda: _ArrayFrame(samples), options)
+    view = memoryview(audio).cast("h")
+    for first in range(0, len(view) - samples + 1, samples):
+        frame = gate.next_frame()
+        frame.data[:] = view[first : first + samples]
+        gate.push(frame)
+    print(gate.stats())
+
+
+if __name__ == "__main__":
+    main()
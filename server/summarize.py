@@ -0,0 +1,187 @@
+"""Map-reduce summarization of long transcripts.
+
+The transcript is split into token-bounded sections that are summarized
+concurrently, then the section summaries are reduced into the final
+10-sentence summary. Results are cached per ``(video_id, PROMPT_VERSION)``
+together with the transcript digest they were computed from.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+import openai
+
+from chunking import estimate_tokens
+from embeddings import DATA_DIR
+
+logger = logging.getLogger("overlap-summarize")
+
+PROMPT_VERSION = "v1"
+"""Bump when any prompt below changes so cached summaries are recomputed"""
+
+SUMMARY_PROMPT = "You are an expert at summarizing and you write elaborate and info-packed summarizes with all the key insights and including all the important concepts from text. Write the summary in exactly 10 sentences."
+SECTION_PROMPT = "You are an expert at summarizing. Summarize this section of a podcast transcript, keeping every key insight, name, number and important concept. Be dense and factual."
+REDUCE_PROMPT = "You are an expert at summarizing and you write elaborate and info-packed summarizes with all the key insights and including all the important concepts from text. The text is a sequence of summaries of consecutive sections of one podcast. Write the summary of the whole podcast in exactly 10 sentences."
+
+
+def split_sections(texts: Sequence[str], max_tokens: int) -> list[str]:
+    """Join ``texts`` into sections of at most ``max_tokens`` (approximately)."""
+    sections: list[str] = []
+    current: list[str] = []
+    tokens = 0
+    for text in texts:
+        size = estimate_tokens(text)
+        if current and tokens + size > max_tokens:
+            sections.append(" ".join(current))
+            current, tokens = [], 0
+        current.append(text)
+        tokens += size
+    if current:
+        sections.append(" ".join(current))
+    return sections
+
+
+class SummaryCache:
+    def __init__(self, directory: str | None = None):
+        self._dir = directory or os.getenv(
+            "SUMMARY_CACHE_DIR", os.path.join(DATA_DIR, "summaries")
+        )
+        os.makedirs(self._dir, exist_ok=True)
+
+    def _path(self, video_id: str) -> str:
+        return os.path.join(self._dir, f"{video_id}.{PROMPT_VERSION}.json")
+
+    def get(self, video_id: str, digest: str) -> str | None:
+        try:
+            with open(self._path(video_id), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry["summary"] if entry.get("digest") == digest else None
+
+    def put(self, video_id: str, digest: str, summary: str) -> None:
+        path = self._path(video_id)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"digest": digest, "summary": summary}, f)
+        os.replace(f"{path}.tmp", path)
+
+
+class Summarizer:
+    """Hierarchical summarizer.
+
+    Parameters
+    ----------
+    max_section_tokens
+        Size of the sections summarized in the map step. A transcript that fits
+        in one section is summarized with a single request.
+    max_workers
+        Concurrent section requests.
+    """
+
+    def __init__(
+        self,
+        *,
+        client: Any = None,
+        model: str = "gpt-4o",
+        max_section_tokens: int = 12_000,
+        max_workers: int = 4,
+        cache: SummaryCache | None = None,
+    ):
+        self._client = client or openai
+        self._model = model
+        self._max_section_tokens = max_section_tokens
+        self._max_workers = max_workers
+        self._cache = cache
+
+    @classmethod
+    def from_env(
+        cls, *, client: Any = None, cache: SummaryCache | None = None
+    ) -> Summarizer:
+        return cls(
+            client=client,
+            model=os.getenv("SUMMARY_MODEL", "gpt-4o"),
+            max_section_tokens=int(os.getenv("SUMMARY_SECTION_TOKENS", "12000")),
+            max_workers=int(os.getenv("SUMMARY_WORKERS", "4")),
+            cache=cache,
+        )
+
+    def _complete(self, system: str, text: str, **kwargs: Any) -> Any:
+        return self._client.chat.completions.create(
+            model=self._model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": text},
+            ],
+            **kwargs,
+        )
+
+    def _summarize_sections(self, sections: list[str], system: str) -> list[str]:
+        with ThreadPoolExecutor(max_workers=self._max_workers) as pool:
+            responses = pool.map(lambda s: self._complete(system, s), sections)
+            return [r.choices[0].message.content for r in responses]
+
+    def _reduce_input(self, transcript: Sequence[dict]) -> tuple[str, str]:
+        """Run the map step(s), return the final system prompt and its input"""
+        sections = split_sections(
+            [entry["text"] for entry in transcript], self._max_section_tokens
+        )
+        system = SUMMARY_PROMPT
+        while len(sections) > 1:
+            logger.info("summarizing %d sections", len(sections))
+            summaries = self._summarize_sections(sections, SECTION_PROMPT)
+            system = REDUCE_PROMPT
+            # very long inputs may need more than one round to fit the reduce step
+            reduced = split_sections(summaries, self._max_section_tokens)
+            if len(reduced) >= len(sections):
+                # section summaries don't fit the budget any better than the
+                # sections did, another round would never end
+                logger.warning(
+                    "section summaries exceed %d tokens, reducing %d at once",
+                    self._max_section_tokens,
+                    len(summaries),
+                )
+                return system, " ".join(summaries)
+            sections = reduced
+        return system, sections[0] if sections else ""
+
+    def summarize(
+        self,
+        video_id: str,
+        transcript: Sequence[dict],
+        digest: str,
+        *,
+        on_token: Callable[[str], None] | None = None,
+    ) -> str:
+        """Summary of ``transcript``, from the cache when ``digest`` matches.
+
+        With ``on_token`` the final step is streamed and every text delta is
+        passed to it as it arrives (a cached summary arrives as one delta).
+        """
+        if self._cache is not None:
+            cached = self._cache.get(video_id, digest)
+            if cached is not None:
+                if on_token is not None:
+                    on_token(cached)
+                return cached
+
+        system, text = self._reduce_input(transcript)
+        if on_token is None:
+            summary = self._complete(system, text).choices[0].message.content
+        else:
+            parts = []
+            for chunk in self._complete(system, text, stream=True):
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    on_token(delta)
+            summary = "".join(parts)
+
+        if self._cache is not None:
+            self._cache.put(video_id, digest, summary)
+        return summary
@@ -0,0 +1,65 @@
+from array import array
+
+import pytest
+
+from audio_buffer import AudioRingBuffer
+
+
+def _samples(*values):
+    return array("h", values)
+
+
+def _read(buffer, n):
+    out = memoryview(bytearray(2 * n)).cast("h")
+    return out.tolist() if buffer.read_into(out) else None
+
+
+def test_reads_back_in_order_across_the_wraparound():
+    buffer = AudioRingBuffer(5)
+    buffer.write(_samples(1, 2, 3, 4))
+    assert _read(buffer, 3) == [1, 2, 3]
+
+    # 5, 6, 7 wrap past the end of the storage
+    assert buffer.write(_samples(5, 6, 7)) == 0
+    assert len(buffer) == 4
+    assert _read(buffer, 4) == [4, 5, 6, 7]
+    assert len(buffer) == 0
+
+
+def test_read_waits_for_a_full_frame():
+    buffer = AudioRingBuffer(8)
+    buffer.write(_samples(1, 2))
+
+    assert _read(buffer, 3) is None
+    assert len(buffer) == 2
+    buffer.write(_samples(3))
+    assert _read(buffer, 3) == [1, 2, 3]
+
+
+def test_overflow_drops_the_oldest_samples():
+    buffer = AudioRingBuffer(4)
+    buffer.write(_samples(1, 2, 3))
+
+    assert buffer.write(_samples(4, 5, 6)) == 2
+    assert _read(buffer, 4) == [3, 4, 5, 6]
+
+    # a write larger than the whole buffer keeps only its newest samples
+    assert buffer.write(_samples(7, 8, 9, 10, 11, 12)) == 2
+    assert _read(buffer, 4) == [9, 10, 11, 12]
+    assert (buffer.written, buffer.dropped) == (12, 4)
+
+
+def test_accepts_byte_buffers_and_clears():
+    buffer = AudioRingBuffer(4)
+    buffer.write(_samples(7, -7).tobytes())
+    assert _read(buffer, 2) == [7, -7]
+
+    buffer.write(_samples(1, 2))
+    buffer.clear()
+    assert len(buffer) == 0
+    assert _read(buffer, 1) is None
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        AudioRingBuffer(0)
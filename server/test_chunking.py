@@ -0,0 +1,59 @@
+import pytest
+
+from chunking import ChunkOptions, chunk_transcript, estimate_tokens
+
+
+def _captions(count, *, duration=2.0, text="four word caption here"):
+    return [
+        {"start": 2.0 * i, "duration": duration, "text": f"{text} {i}"}
+        for i in range(count)
+    ]
+
+
+def test_chunks_overlap_and_cover_every_line():
+    transcript = _captions(100)
+
+    chunks = chunk_transcript(transcript, ChunkOptions(max_tokens=40, overlap_lines=2))
+
+    assert chunks[0]["first_line"] == 0
+    assert chunks[-1]["last_line"] == 99
+    for previous, chunk in zip(chunks, chunks[1:]):
+        # the next chunk repeats the last two lines of the previous one
+        assert chunk["first_line"] == previous["last_line"] - 1
+    for chunk in chunks:
+        lines = transcript[chunk["first_line"] : chunk["last_line"] + 1]
+        assert chunk["text"] == " ".join(line["text"] for line in lines)
+        assert sum(estimate_tokens(line["text"]) for line in lines) <= 40
+        assert chunk["start"] == lines[0]["start"]
+        assert chunk["end"] == pytest.approx(chunk["start"] + chunk["duration"])
+
+
+def test_chunks_respect_max_seconds():
+    chunks = chunk_transcript(
+        _captions(100), ChunkOptions(max_tokens=10_000, max_seconds=20.0)
+    )
+
+    assert all(chunk["duration"] <= 20.0 for chunk in chunks)
+    assert chunks[-1]["last_line"] == 99
+
+
+@pytest.mark.parametrize("overlap_lines", [0, 2, 5, 50])
+def test_chunking_always_advances(overlap_lines):
+    # every line alone exceeds the token budget, so each window is one line and
+    # the overlap covers all of it
+    transcript = _captions(30, text="x" * 400)
+
+    chunks = chunk_transcript(
+        transcript, ChunkOptions(max_tokens=10, overlap_lines=overlap_lines)
+    )
+
+    firsts = [chunk["first_line"] for chunk in chunks]
+    assert firsts == sorted(set(firsts))
+    assert chunks[-1]["last_line"] == 29
+    assert len(chunks) <= len(transcript)
+
+
+def test_empty_and_single_line_transcripts():
+    assert chunk_transcript([], ChunkOptions()) == []
+    (chunk,) = chunk_transcript(_captions(1), ChunkOptions())
+    assert (chunk["first_line"], chunk["last_line"]) == (0, 0)
@@ -0,0 +1,76 @@
+from embeddings import EmbeddingProfile
+from ingest import IngestOptions, ManifestStore, ingest_video, video_namespace
+from vector_store import LocalVectorStore
+
+TRANSCRIPT = [
+    {"start": float(i), "duration": 1.0, "text": f"caption line number {i}"}
+    for i in range(20)
+]
+DEFAULT = EmbeddingProfile()
+SMALL = EmbeddingProfile(dimensions=1024)
+
+
+class StubEmbedder:
+    model = "text-embedding-3-large"
+
+    def __init__(self):
+        self.texts = 0
+
+    def embed(self, texts):
+        self.texts += len(texts)
+        return [[1.0, float(len(text))] for text in texts]
+
+
+def _ingest(manifests, index, embedder, profile):
+    return ingest_video(
+        "video",
+        TRANSCRIPT,
+        embedder=embedder,
+        index=index,
+        manifests=manifests,
+        options=IngestOptions(chunking=None),
+        profile=profile,
+    )
+
+
+def test_profiles_of_a_video_keep_their_own_manifest(tmp_path):
+    manifests = ManifestStore(str(tmp_path))
+    index = LocalVectorStore(None)
+    embedder = StubEmbedder()
+
+    _ingest(manifests, index, embedder, DEFAULT)
+    _ingest(manifests, index, embedder, SMALL)
+    assert embedder.texts == 2 * len(TRANSCRIPT)
+
+    # switching back to either profile finds its vectors still in place
+    assert _ingest(manifests, index, embedder, DEFAULT).skipped == len(TRANSCRIPT)
+    assert _ingest(manifests, index, embedder, SMALL).skipped == len(TRANSCRIPT)
+    assert embedder.texts == 2 * len(TRANSCRIPT)
+
+    default = manifests.load("video", video_namespace("video", DEFAULT))
+    small = manifests.load("video", video_namespace("video", SMALL))
+    assert default["namespace"] == video_namespace("video")
+    assert small["namespace"] == video_namespace("video", SMALL)
+    # the default profile keeps the manifest file it had before profiles
+    assert manifests.load("video") == default
+
+
+def test_reingest_only_embeds_changed_segments(tmp_path):
+    manifests = ManifestStore(str(tmp_path))
+    index = LocalVectorStore(None)
+    embedder = StubEmbedder()
+    _ingest(manifests, index, embedder, DEFAULT)
+
+    changed = [dict(entry) for entry in TRANSCRIPT[:-1]]
+    changed[3]["text"] = "a corrected caption"
+    stats = ingest_video(
+        "video",
+        changed,
+        embedder=embedder,
+        index=index,
+        manifests=manifests,
+        options=IngestOptions(chunking=None),
+    )
+
+    assert (stats.lines, stats.deleted) == (1, 2)
+    assert embedder.texts == len(TRANSCRIPT) + 1
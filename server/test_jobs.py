@@ -0,0 +1,57 @@
+import os
+
+import jobs
+from jobs import JobQueue
+
+
+def _result(job):
+    return {"status": "success", "transcript": [{"text": "hi"}], "summary": "short"}
+
+
+def test_saved_state_leaves_out_the_transcript(tmp_path):
+    queue = JobQueue(state_dir=str(tmp_path))
+    job = queue.submit("video", _result)
+    job.wait()
+    queue.shutdown()
+
+    state = queue.load_state(job.id)
+
+    assert state["status"] == "succeeded"
+    assert state["result"] == {"status": "success", "summary": "short"}
+    assert job.saved_result() == state["result"]
+    assert job.result["transcript"] == [{"text": "hi"}]
+
+
+def test_submit_coalesces_on_key():
+    queue = JobQueue(max_workers=1)
+    started = []
+
+    def slow(job):
+        started.append(job.id)
+        job.wait(0.2)
+
+    first = queue.submit("video", slow)
+    assert queue.submit("video", slow) is first
+    first.wait()
+    queue.shutdown()
+    assert started == [first.id]
+
+
+def test_expired_state_files_are_swept_at_most_once_a_minute(tmp_path, monkeypatch):
+    clock = {"now": 1000.0}
+    monkeypatch.setattr(jobs.time, "monotonic", lambda: clock["now"])
+    queue = JobQueue(state_dir=str(tmp_path), retention=3600.0)
+    listed = []
+    listdir = os.listdir
+    monkeypatch.setattr(
+        jobs.os, "listdir", lambda path: listed.append(path) or listdir(path)
+    )
+
+    for key in ["a", "b", "c"]:
+        queue.submit(key, _result).wait()
+    assert len(listed) == 1
+
+    clock["now"] += 61.0
+    queue.submit("d", _result).wait()
+    queue.shutdown()
+    assert len(listed) == 2
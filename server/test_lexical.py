@@ -0,0 +1,92 @@
+import pytest
+
+from lexical import BM25Index, LexicalHit, LexicalStore, fuse_matches, tokenize
+
+TEXTS = [
+    "we moved the whole cluster to kubernetes last year",
+    "kubernetes kubernetes everywhere, the operators love it",
+    "our hiring plan for the next quarter",
+    "the quarter closed with record revenue",
+]
+
+
+def _index():
+    ids = [f"s{i}" for i in range(len(TEXTS))]
+    return BM25Index(ids, TEXTS, [{"content": text} for text in TEXTS])
+
+
+def test_tokenize_drops_stopwords_and_numbers():
+    assert tokenize("What did the guest say about Kubernetes in 2023?") == [
+        "kubernetes"
+    ]
+
+
+def test_search_ranks_by_bm25():
+    index = _index()
+
+    hits = index.search("kubernetes operators", 10)
+
+    # both words beat one word, a term missing from a segment adds nothing
+    assert [hit.id for hit in hits] == ["s1", "s0"]
+    assert hits[0].score > hits[1].score > 0
+    assert index.search("revenue quarter", 1)[0].id == "s3"
+    assert index.search("blockchain", 10) == []
+
+
+def test_rare_terms_outweigh_common_ones():
+    index = _index()
+
+    # "hiring" is in one segment, "quarter" in two
+    assert index.search("hiring quarter", 10)[0].id == "s2"
+
+
+def test_decisive_needs_coverage_and_margin():
+    index = _index()
+
+    hits = index.search("kubernetes operators", 10)
+    assert index.decisive("kubernetes operators", hits, margin=1.5)
+    # the runner-up is too close for a larger margin
+    ratio = hits[0].score / hits[1].score
+    assert not index.decisive("kubernetes operators", hits, margin=ratio + 0.1)
+
+    # the best hit lacks most of the query's weight
+    hits = index.search("kubernetes migration hiring", 10)
+    assert not index.decisive("kubernetes migration hiring", hits)
+    assert not index.decisive("kubernetes", [])
+
+
+def test_coverage_counts_unknown_terms_with_the_highest_idf():
+    index = _index()
+    hit = index.search("hiring", 1)[0]
+
+    assert index.coverage("hiring", hit) == pytest.approx(1.0)
+    assert index.coverage("hiring blockchain", hit) < 0.5
+
+
+def test_store_round_trip(tmp_path):
+    store = LexicalStore(str(tmp_path))
+    store.save("video", BM25Index(["a"], ["kubernetes"], [{}], info={"v": 1}))
+
+    index = LexicalStore(str(tmp_path)).get("video")
+
+    assert [hit.id for hit in index.search("kubernetes", 1)] == ["a"]
+    assert store.is_current("video", {"v": 1})
+    assert not store.is_current("video", {"v": 2})
+    assert store.get("missing") is None
+
+
+def test_fuse_matches_orders_by_reciprocal_rank():
+    matches = [
+        {"id": "a", "score": 0.9, "metadata": {"from": "vector"}},
+        {"id": "b", "score": 0.8, "metadata": {}},
+        {"id": "c", "score": 0.7, "metadata": {}},
+    ]
+    hits = [LexicalHit("c", 5.0, {}), LexicalHit("d", 4.0, {}), LexicalHit("a", 1, {})]
+
+    fused = fuse_matches(matches, hits, 10, k=60)
+
+    # a: 1/61 + 1/63, c: 1/63 + 1/61, tied ahead of b: 1/62 and d: 1/62
+    assert [match["id"] for match in fused] == ["a", "c", "b", "d"]
+    assert fused[0]["score"] == pytest.approx(1 / 61 + 1 / 63)
+    assert fused[0]["metadata"] == {"from": "vector"}
+    assert [match["id"] for match in fuse_matches(matches, hits, 2)] == ["a", "c"]
@@ -0,0 +1,63 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from lexical import BM25Index, LexicalStore
+from playback_window import PlaybackWindow
+
+
+class StubEmbedder:
+    model = "stub"
+
+    def embed(self, texts):
+        return [[1.0, float(len(text))] for text in texts]
+
+
+def _store(tmp_path, starts, length):
+    """A lexical store with one video of ``length``-second chunks at ``starts``."""
+    metadata = [
+        {"timestamp": start, "end": start + length, "content": f"chunk at {start}"}
+        for start in starts
+    ]
+    lexical = LexicalStore(str(tmp_path))
+    lexical.save(
+        "video",
+        BM25Index(
+            [f"video-{start}" for start in starts],
+            [m["content"] for m in metadata],
+            metadata,
+        ),
+    )
+    return lexical
+
+
+def _loaded_window(lexical, position):
+    async def load():
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            playback = PlaybackWindow(lexical, StubEmbedder(), executor)
+            playback.update("video", position)
+            await playback._task
+            return playback.current("video", position - 120.0, position + 10.0)
+
+    return asyncio.run(load())
+
+
+def test_recent_includes_the_chunk_playing_at_position(tmp_path):
+    # 60s chunks overlapping by 6s: the one playing at 100 started at 54
+    lexical = _store(tmp_path, [0.0, 54.0, 108.0, 162.0], 60.0)
+    window = _loaded_window(lexical, 100.0)
+
+    assert window is not None
+    recent = window.recent(100.0, 30.0, 4)
+
+    assert [match["id"] for match in recent] == ["video-54.0"]
+
+
+def test_recent_keeps_the_last_chunks_up_to_count(tmp_path):
+    lexical = _store(tmp_path, [float(start) for start in range(0, 200, 10)], 10.0)
+    window = _loaded_window(lexical, 105.0)
+
+    recent = window.recent(105.0, 30.0, 2)
+
+    # chunks at 80, 90 and 100 played in the last 30s, 110 hasn't started
+    assert [match["id"] for match in recent] == ["video-90.0", "video-100.0"]
+    assert window.recent(105.0, 30.0, 0) == []
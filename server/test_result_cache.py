@@ -0,0 +1,78 @@
+import result_cache
+from result_cache import ResultCacheOptions, SemanticResultCache
+
+RESULTS = [{"id": "a", "start": 1.0}]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _cache(monkeypatch, **options):
+    clock = Clock()
+    monkeypatch.setattr(result_cache.time, "monotonic", clock)
+    return SemanticResultCache(ResultCacheOptions(**options)), clock
+
+
+def test_similar_query_hits_and_dissimilar_misses(monkeypatch):
+    cache, _ = _cache(monkeypatch, threshold=0.95)
+    cache.put("video", 1, [1.0, 0.0], RESULTS)
+
+    assert cache.get("video", 1, [2.0, 0.1]) is RESULTS
+    assert cache.get("video", 1, [0.0, 1.0]) is None
+    assert cache.get("other", 1, [1.0, 0.0]) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    cache, clock = _cache(monkeypatch, ttl=60.0)
+    cache.put("video", 1, [1.0, 0.0], RESULTS)
+
+    clock.now += 59.0
+    assert cache.get("video", 1, [1.0, 0.0]) is RESULTS
+    clock.now += 2.0
+    assert cache.get("video", 1, [1.0, 0.0]) is None
+
+
+def test_position_tolerance(monkeypatch):
+    cache, _ = _cache(monkeypatch, position_tolerance=15.0)
+    cache.put("video", 1, [1.0, 0.0], RESULTS, position=100.0)
+
+    assert cache.get("video", 1, [1.0, 0.0], position=110.0) is RESULTS
+    assert cache.get("video", 1, [1.0, 0.0], position=120.0) is None
+    # a query without a position only matches entries without one
+    assert cache.get("video", 1, [1.0, 0.0]) is None
+    cache.put("video", 1, [1.0, 0.0], [], position=None)
+    assert cache.get("video", 1, [1.0, 0.0]) == []
+
+
+def test_new_ingest_version_invalidates_the_video(monkeypatch):
+    cache, _ = _cache(monkeypatch)
+    cache.put("video", 1, [1.0, 0.0], RESULTS)
+    cache.put("other", 1, [1.0, 0.0], RESULTS)
+
+    assert cache.get("video", 2, [1.0, 0.0]) is None
+    assert cache.get("video", 1, [1.0, 0.0]) is None
+    assert cache.get("other", 1, [1.0, 0.0]) is RESULTS
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_full_cache_replaces_the_least_recently_used(monkeypatch):
+    cache, clock = _cache(monkeypatch, max_entries=2)
+    cache.put("video", 1, [1.0, 0.0], [{"id": "x"}])
+    clock.now += 1
+    cache.put("video", 1, [0.0, 1.0], [{"id": "y"}])
+    clock.now += 1
+    cache.get("video", 1, [1.0, 0.0])
+    clock.now += 1
+
+    cache.put("video", 1, [-1.0, 0.0], [{"id": "z"}])
+
+    assert cache.get("video", 1, [1.0, 0.0]) == [{"id": "x"}]
+    assert cache.get("video", 1, [0.0, 1.0]) is None
+    assert cache.get("video", 1, [-1.0, 0.0]) == [{"id": "z"}]
@@ -0,0 +1,64 @@
+from speech_gate import GateOptions, SpeechGate
+
+SAMPLES = 160
+OPTIONS = GateOptions(pre_roll_ms=200, post_roll_ms=300, frame_ms=100)
+
+
+class Frame:
+    def __init__(self):
+        self._data = bytearray(2 * SAMPLES)
+
+    @property
+    def data(self) -> memoryview:
+        return memoryview(self._data).cast("h")
+
+
+def _push(gate, amplitude):
+    frame = gate.next_frame()
+    for i in range(0, SAMPLES, 2):
+        frame.data[i] = amplitude
+        frame.data[i + 1] = -amplitude
+    return len(gate.push(frame))
+
+
+def test_silence_is_held_back():
+    gate = SpeechGate(Frame, OPTIONS)
+
+    assert [_push(gate, 0) for _ in range(10)] == [0] * 10
+    assert gate.suppressed_percent == 100.0
+
+
+def test_speech_brings_its_pre_roll_and_hangover():
+    gate = SpeechGate(Frame, OPTIONS)
+    for _ in range(5):
+        _push(gate, 0)
+
+    # two held frames of pre-roll come out with the first speech frame
+    assert _push(gate, 10_000) == 3
+    assert _push(gate, 10_000) == 1
+    # then three frames of post-roll, and quiet again
+    assert [_push(gate, 0) for _ in range(5)] == [1, 1, 1, 0, 0]
+    assert gate.forwarded == 7
+
+
+def test_speech_during_hangover_restarts_it():
+    gate = SpeechGate(Frame, OPTIONS)
+    _push(gate, 10_000)
+    _push(gate, 0)
+    _push(gate, 0)
+
+    assert _push(gate, 10_000) == 1
+    assert [_push(gate, 0) for _ in range(4)] == [1, 1, 1, 0]
+
+
+def test_noise_floor_adapts_to_room_noise():
+    # on its own, this level is well above threshold and the initial floor
+    assert _push(SpeechGate(Frame, OPTIONS), 700) == 1
+
+    gate = SpeechGate(Frame, OPTIONS)
+    # room noise just under the threshold margin raises the floor slowly
+    for _ in range(400):
+        assert _push(gate, 300) == 0
+
+    assert _push(gate, 700) == 0
+    assert _push(gate, 10_000) == 3
@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+
+from summarize import Summarizer
+
+
+class StubClient:
+    """Chat completions that answer every request with a fixed-size summary."""
+
+    def __init__(self):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **kwargs):
+        self.calls += 1
+        message = SimpleNamespace(content="summary " * 50)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def test_tiny_section_budget_terminates():
+    client = StubClient()
+    summarizer = Summarizer(client=client, max_section_tokens=10, max_workers=2)
+    transcript = [{"text": f"line {i} " * 10} for i in range(20)]
+
+    summary = summarizer.summarize("video", transcript, "digest")
+
+    assert summary == "summary " * 50
+    # one map round over the 20 sections, then the final reduce
+    assert client.calls == 21
+
+
+def test_reduces_in_rounds_until_one_section():
+    client = StubClient()
+    summarizer = Summarizer(client=client, max_section_tokens=400, max_workers=2)
+    transcript = [{"text": "word " * 100} for _ in range(40)]
+
+    summarizer.summarize("video", transcript, "digest")
+
+    # 40 lines of ~125 tokens -> 14 sections -> 14 summaries of ~100 tokens
+    # -> 4 sections -> 4 summaries -> 1 section, then the final reduce
+    assert client.calls == 14 + 4 + 1
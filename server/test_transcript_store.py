@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from transcript_store import Transcript, TranscriptStore, is_video_id
+
+
+def _transcript(captions):
+    return Transcript.from_entries(
+        [
+            {"start": start, "duration": duration, "text": f"caption {i}"}
+            for i, (start, duration) in enumerate(captions)
+        ]
+    )
+
+
+def test_index_range_of_sequential_captions():
+    transcript = _transcript([(float(i), 1.0) for i in range(10)])
+
+    assert transcript.index_range(2.5, 5.0) == (2, 5)
+    assert transcript.index_range(0.0, 100.0) == (0, 10)
+    assert transcript.index_range(50.0, 60.0) == (10, 10)
+
+
+def test_index_range_with_overlapping_captions():
+    # a long caption overlaps the three after it, so end times aren't sorted
+    transcript = _transcript([(0.0, 10.0), (1.0, 1.0), (2.0, 1.0), (3.0, 1.0)])
+
+    # caption 0 still plays at 5s, the short ones before it ended already
+    assert transcript.index_range(5.0, 6.0) == (0, 4)
+    assert transcript.index_range(0.0, 3.0) == (0, 3)
+    assert transcript.index_range(10.0, 20.0) == (4, 4)
+
+
+def test_store_fetches_once_and_serves_from_disk(tmp_path):
+    calls = []
+
+    def fetch(video_id):
+        calls.append(video_id)
+        return [{"start": 0.0, "duration": 1.5, "text": "héllo"}]
+
+    store = TranscriptStore(str(tmp_path), fetch=fetch)
+    assert store.get("abc").entries() == [
+        {"start": 0.0, "duration": 1.5, "text": "héllo"}
+    ]
+
+    reopened = TranscriptStore(str(tmp_path), fetch=fetch)
+    transcript = reopened.get("abc")
+    assert calls == ["abc"]
+    np.testing.assert_array_equal(transcript.start, [0.0])
+    assert transcript.entries()[0]["text"] == "héllo"
+
+
+def test_rejects_video_ids_that_are_not_file_names(tmp_path):
+    assert is_video_id("dQw4w9WgXcQ")
+    for video_id in ["", "../x", "a/b", "a.b", None, 42]:
+        assert not is_video_id(video_id)
+
+    store = TranscriptStore(str(tmp_path), fetch=lambda video_id: [])
+    with pytest.raises(ValueError):
+        store.get("../x")
@@ -0,0 +1,145 @@
+import numpy as np
+import pytest
+
+from vector_store import LocalVectorStore
+
+
+def _ids(result):
+    return [match["id"] for match in result["matches"]]
+
+
+def _vectors(count, dim=16, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+
+
+def test_upsert_query_delete():
+    store = LocalVectorStore(None)
+    store.upsert(
+        [
+            ("a", [1.0, 0.0, 0.0], {"timestamp": 1.0}),
+            ("b", [0.0, 1.0, 0.0], {"timestamp": 2.0}),
+            ("c", [0.7, 0.7, 0.0], {"timestamp": 3.0}),
+        ],
+        namespace="ns",
+    )
+
+    result = store.query(vector=[1.0, 0.1, 0.0], top_k=2, namespace="ns")
+    assert _ids(result) == ["a", "c"]
+    assert result["matches"][0]["metadata"] == {"timestamp": 1.0}
+    assert result["matches"][0]["score"] == pytest.approx(0.995, abs=1e-3)
+
+    # an upsert of an existing ID replaces its row
+    store.upsert([("a", [0.0, 0.0, 1.0], {"timestamp": 4.0})], namespace="ns")
+    assert _ids(store.query(vector=[1.0, 0.1, 0.0], top_k=1, namespace="ns")) == ["c"]
+
+    store.delete(["c", "missing"], namespace="ns")
+    result = store.query(vector=[1.0, 0.1, 0.0], top_k=5, namespace="ns")
+    assert _ids(result) == ["b", "a"]
+    assert store.query(vector=[1.0, 0.0, 0.0], top_k=1, namespace="other") == {
+        "matches": [],
+        "namespace": "other",
+    }
+
+
+def test_rejects_vectors_of_another_dimension():
+    store = LocalVectorStore(None)
+    store.upsert([("a", [1.0, 0.0])], namespace="ns")
+
+    with pytest.raises(ValueError):
+        store.upsert([("b", [1.0, 0.0, 0.0])], namespace="ns")
+    with pytest.raises(ValueError):
+        store.query(vector=[1.0, 0.0, 0.0], top_k=1, namespace="ns")
+
+
+def test_metadata_filters():
+    store = LocalVectorStore(None)
+    vectors = _vectors(10)
+    store.upsert(
+        [
+            (f"v{i}", vector, {"timestamp": float(i), "speaker": "ab"[i % 2]})
+            for i, vector in enumerate(vectors)
+        ],
+        namespace="ns",
+    )
+
+    def matching(filter):
+        result = store.query(vector=vectors[0], top_k=10, namespace="ns", filter=filter)
+        return sorted(_ids(result), key=lambda vector_id: int(vector_id[1:]))
+
+    assert matching({"timestamp": {"$gte": 3.0, "$lt": 6.0}}) == ["v3", "v4", "v5"]
+    assert matching({"speaker": "b"}) == ["v1", "v3", "v5", "v7", "v9"]
+    assert matching({"speaker": {"$ne": "b"}, "timestamp": {"$lte": 4.0}}) == [
+        "v0",
+        "v2",
+        "v4",
+    ]
+    assert matching({"timestamp": {"$in": [1.0, 8.0]}}) == ["v1", "v8"]
+    assert matching(
+        {"$and": [{"timestamp": {"$nin": [0.0, 1.0]}}, {"timestamp": {"$lt": 4.0}}]}
+    ) == ["v2", "v3"]
+    # a field no row has matches nothing
+    assert matching({"missing": {"$gt": 1.0}}) == []
+    with pytest.raises(ValueError):
+        matching({"timestamp": {"$regex": "1"}})
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16"])
+def test_persists_across_reopen(tmp_path, dtype):
+    vectors = _vectors(50)
+    store = LocalVectorStore(str(tmp_path), dtype=dtype)
+    store.upsert(
+        [(f"v{i}", vector, {"i": i}) for i, vector in enumerate(vectors)],
+        namespace="ns",
+    )
+    store.delete(["v0"], namespace="ns")
+    store.flush()
+
+    reopened = LocalVectorStore(str(tmp_path))
+    result = reopened.query(vector=vectors[7], top_k=3, namespace="ns")
+    assert _ids(result)[0] == "v7"
+    assert result["matches"][0]["metadata"] == {"i": 7}
+    assert (
+        _ids(reopened.query(vector=vectors[0], top_k=50, namespace="ns")).count("v0")
+        == 0
+    )
+
+    # a reader picks up what another writer flushed later, and can write itself
+    store.upsert([("new", -vectors[7])], namespace="ns")
+    store.flush()
+    assert _ids(reopened.query(vector=-vectors[7], top_k=1, namespace="ns")) == ["new"]
+    reopened.upsert([("v7", -vectors[7])], namespace="ns")
+    assert sorted(
+        _ids(reopened.query(vector=-vectors[7], top_k=2, namespace="ns"))
+    ) == ["new", "v7"]
+
+
+def test_int8_rescoring_orders_by_exact_score():
+    store = LocalVectorStore(None, quantization="int8", rescore_factor=4)
+    # both rows quantize to the same codes, only the stored rows tell them apart
+    store.upsert(
+        [("low", [1.0, 0.001]), ("high", [1.0, 0.002]), ("far", [-1.0, 0.0])],
+        namespace="ns",
+    )
+
+    result = store.query(vector=[0.0, 1.0], top_k=2, namespace="ns")
+
+    assert _ids(result) == ["high", "low"]
+    assert result["matches"][0]["score"] > result["matches"][1]["score"]
+
+
+def test_int8_matches_exact_search():
+    vectors = _vectors(500, dim=64)
+    exact = LocalVectorStore(None)
+    quantized = LocalVectorStore(None, quantization="int8")
+    records = [(f"v{i}", vector) for i, vector in enumerate(vectors)]
+    exact.upsert(records, namespace="ns")
+    quantized.upsert(records, namespace="ns")
+
+    for query in _vectors(5, dim=64, seed=1):
+        expected = exact.query(vector=query, top_k=5, namespace="ns")
+        result = quantized.query(vector=query, top_k=5, namespace="ns")
+        assert _ids(result) == _ids(expected)
+        # candidates are rescored against the stored rows, not the codes
+        assert [m["score"] for m in result["matches"]] == pytest.approx(
+            [m["score"] for m in expected["matches"]]
+        )
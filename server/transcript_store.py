@@ -0,0 +1,226 @@
+"""Local store for fetched YouTube transcripts.
+
+Transcripts are fetched once and saved as compressed columnar arrays (``.npz``
+with ``start``/``duration`` columns, UTF-8 text offsets and one text blob), so
+``/transcript`` and ``/process_video`` share them and ranges can be served
+without decoding the whole transcript into dicts. Entries expire after a TTL
+and the least recently used files are evicted when the store outgrows its
+size budget.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+from typing import Callable
+
+import numpy as np
+from youtube_transcript_api import YouTubeTranscriptApi
+
+from embeddings import DATA_DIR
+
+logger = logging.getLogger("overlap-transcripts")
+
+_VIDEO_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def is_video_id(video_id: object) -> bool:
+    """Whether ``video_id`` looks like a YouTube video ID.
+
+    Every store names its files after the video ID, so IDs from requests and
+    participant attributes are checked with this before they reach one.
+    """
+    return isinstance(video_id, str) and _VIDEO_ID.fullmatch(video_id) is not None
+
+
+class Transcript:
+    """Columnar transcript; ``entries()`` yields YouTube-style dicts."""
+
+    def __init__(
+        self,
+        start: np.ndarray,
+        duration: np.ndarray,
+        text_offsets: np.ndarray,
+        text: bytes,
+        fetched_at: float,
+    ):
+        self.start = start
+        self.duration = duration
+        self.text_offsets = text_offsets
+        self.text = text
+        self.fetched_at = fetched_at
+        # captions may overlap, so end times aren't sorted; entry i of this
+        # running maximum is the latest end of entries 0..i
+        self._max_end = np.maximum.accumulate(start + duration) if len(start) else start
+
+    @classmethod
+    def from_entries(cls, entries: Sequence[dict]) -> Transcript:
+        encoded = [entry["text"].encode("utf-8") for entry in entries]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        return cls(
+            start=np.array([e["start"] for e in entries], dtype=np.float64),
+            duration=np.array([e["duration"] for e in entries], dtype=np.float64),
+            text_offsets=offsets,
+            text=b"".join(encoded),
+            fetched_at=time.time(),
+        )
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def entries(self, first: int = 0, last: int | None = None) -> list[dict]:
+        """Entries ``first`` (inclusive) to ``last`` (exclusive) as dicts."""
+        last = len(self) if last is None else min(last, len(self))
+        offsets = self.text_offsets
+        return [
+            {
+                "text": self.text[offsets[i] : offsets[i + 1]].decode("utf-8"),
+                "start": start,
+                "duration": duration,
+            }
+            for i, start, duration in zip(
+                range(first, last),
+                self.start[first:last].tolist(),
+                self.duration[first:last].tolist(),
+            )
+        ]
+
+    def index_range(self, start: float, end: float) -> tuple[int, int]:
+        """Index range of the entries overlapping ``[start, end)`` seconds."""
+        first = int(np.searchsorted(self._max_end, start, side="right"))
+        last = int(np.searchsorted(self.start, end, side="left"))
+        return first, max(first, last)
+
+
+class TranscriptStore:
+    """Fetch-through transcript cache on disk with a small in-memory LRU.
+
+    Parameters
+    ----------
+    directory
+        Where ``<video_id>.npz`` files are kept.
+    ttl
+        Seconds before a stored transcript is refetched.
+    max_bytes
+        Size budget of the directory; least recently used files go first.
+    fetch
+        ``video_id -> list of entries``, YouTube by default.
+    """
+
+    def __init__(
+        self,
+        directory: str | None = None,
+        *,
+        ttl: float = 7 * 24 * 3600,
+        max_bytes: int = 256 << 20,
+        memory_entries: int = 16,
+        fetch: Callable[[str], Sequence[dict]] = YouTubeTranscriptApi.get_transcript,
+    ):
+        self._dir = directory or os.path.join(DATA_DIR, "transcripts")
+        os.makedirs(self._dir, exist_ok=True)
+        self._ttl = ttl
+        self._max_bytes = max_bytes
+        self._memory: OrderedDict[str, Transcript] = OrderedDict()
+        self._memory_entries = memory_entries
+        self._fetch = fetch
+        self._lock = threading.Lock()
+        self._video_locks: dict[str, threading.Lock] = {}
+
+    @classmethod
+    def from_env(cls) -> TranscriptStore:
+        return cls(
+            os.getenv("TRANSCRIPT_STORE_DIR"),
+            ttl=float(os.getenv("TRANSCRIPT_TTL_SECONDS", "604800")),  # a week
+            max_bytes=int(os.getenv("TRANSCRIPT_STORE_MAX_MB", "256")) << 20,
+        )
+
+    def _path(self, video_id: str) -> str:
+        if not is_video_id(video_id):
+            raise ValueError(f"invalid video ID: {video_id!r}")
+        return os.path.join(self._dir, f"{video_id}.npz")
+
+    def _video_lock(self, video_id: str) -> threading.Lock:
+        with self._lock:
+            return self._video_locks.setdefault(video_id, threading.Lock())
+
+    def get(self, video_id: str) -> Transcript:
+        """Stored transcript of ``video_id``, fetched if missing or expired."""
+        # one fetch per video even when /transcript and /process_video race
+        with self._video_lock(video_id):
+            transcript = self._load(video_id)
+            if transcript is None:
+                logger.info("fetching transcript for %s", video_id)
+                transcript = Transcript.from_entries(self._fetch(video_id))
+                self._save(video_id, transcript)
+            with self._lock:
+                self._memory[video_id] = transcript
+                self._memory.move_to_end(video_id)
+                while len(self._memory) > self._memory_entries:
+                    self._memory.popitem(last=False)
+            return transcript
+
+    def _expired(self, transcript: Transcript) -> bool:
+        return time.time() - transcript.fetched_at > self._ttl
+
+    def _load(self, video_id: str) -> Transcript | None:
+        with self._lock:
+            transcript = self._memory.get(video_id)
+        if transcript is not None and not self._expired(transcript):
+            return transcript
+
+        path = self._path(video_id)
+        try:
+            with np.load(path) as data:
+                transcript = Transcript(
+                    start=data["start"],
+                    duration=data["duration"],
+                    text_offsets=data["text_offsets"],
+                    text=data["text"].tobytes(),
+                    fetched_at=float(data["fetched_at"]),
+                )
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("discarding unreadable transcript %s: %s", path, e)
+            return None
+        if self._expired(transcript):
+            return None
+        try:
+            os.utime(path)  # mtime doubles as last-access time for eviction
+        except OSError:
+            pass
+        return transcript
+
+    def _save(self, video_id: str, transcript: Transcript) -> None:
+        path = self._path(video_id)
+        tmp = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp,
+            start=transcript.start,
+            duration=transcript.duration,
+            text_offsets=transcript.text_offsets,
+            text=np.frombuffer(transcript.text, dtype=np.uint8),
+            fetched_at=np.float64(transcript.fetched_at),
+        )
+        os.replace(tmp, path)
+        self._evict()
+
+    def _evict(self) -> None:
+        files = []
+        for name in os.listdir(self._dir):
+            if name.endswith(".npz") and ".tmp" not in name:
+                stat = os.stat(os.path.join(self._dir, name))
+                files.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self._max_bytes:
+                break
+            os.remove(os.path.join(self._dir, name))
+            total -= size
+            logger.info("evicted transcript %s", name)
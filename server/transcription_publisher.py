@@ -0,0 +1,176 @@
+"""Ordered, coalesced transcription publishing for one room.
+
+The agent's session events (user started speaking, transcription completed or
+failed, response status) each change a transcription segment. Publishing every
+change from its own task gave no ordering and one FFI round trip per change,
+and looked up the microphone track of the participant every time.
+
+:class:`TranscriptionPublisher` queues segment updates in arrival order and a
+single task publishes them: updates arriving within ``interval`` of each other
+are sent together, one ``publish_transcription`` per participant, and a newer
+update of a segment that is still queued replaces the older one in place. Only
+one publish is in flight at a time; while it is, updates keep coalescing, and
+at most ``max_pending`` segments are queued (the oldest interim ones are dropped
+first). Microphone track SIDs are cached until the room reports a track change.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from livekit import rtc
+from livekit.rtc.participant import PublishTranscriptionError
+
+logger = logging.getLogger("overlap-transcription")
+
+# room events after which a participant's microphone track may have changed
+_TRACK_EVENTS = (
+    "track_published",
+    "track_unpublished",
+    "local_track_published",
+    "local_track_unpublished",
+    "participant_disconnected",
+)
+
+
+@dataclass
+class _Update:
+    participant_identity: str
+    track_sid: str
+    text: str
+    final: bool
+
+
+class TranscriptionPublisher:
+    """Publishes transcription segment updates for the participants of ``room``.
+
+    Parameters
+    ----------
+    interval
+        Seconds to wait after the first queued update for more to coalesce.
+    max_pending
+        Maximum number of queued segments.
+    """
+
+    def __init__(
+        self, room: rtc.Room, *, interval: float = 0.05, max_pending: int = 64
+    ):
+        self._room = room
+        self._interval = interval
+        self._max_pending = max_pending
+        self._pending: OrderedDict[str, _Update] = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._track_sids: dict[str, str | None] = {}
+        self._closed = False
+
+        self.published = 0  # publish_transcription calls
+        self.coalesced = 0  # updates merged into a queued one
+        self.dropped = 0  # updates discarded because the queue was full
+
+        for event in _TRACK_EVENTS:
+            room.on(event, self._invalidate)
+        self._task = asyncio.ensure_future(self._run())
+
+    def _invalidate(self, *args) -> None:
+        self._track_sids.clear()
+
+    def _mic_track_sid(self, participant: rtc.Participant) -> str | None:
+        identity = participant.identity
+        if identity not in self._track_sids:
+            self._track_sids[identity] = next(
+                (
+                    track.sid
+                    for track in participant.track_publications.values()
+                    if track.source == rtc.TrackSource.SOURCE_MICROPHONE
+                ),
+                None,
+            )
+        return self._track_sids[identity]
+
+    def update(
+        self,
+        participant: rtc.Participant,
+        segment_id: str,
+        text: str,
+        *,
+        final: bool = True,
+    ) -> None:
+        """Queue ``text`` as the new content of segment ``segment_id``."""
+        if self._closed:
+            return
+        track_sid = self._mic_track_sid(participant)
+        if track_sid is None:
+            logger.debug(f"{participant.identity} has no microphone track yet")
+            return
+
+        update = _Update(participant.identity, track_sid, text, final)
+        if segment_id in self._pending:
+            # keeps the segment's place in the queue
+            self._pending[segment_id] = update
+            self.coalesced += 1
+        else:
+            if len(self._pending) >= self._max_pending:
+                self._drop_one()
+            self._pending[segment_id] = update
+        self._wakeup.set()
+
+    def _drop_one(self) -> None:
+        victim = next(
+            (sid for sid, update in self._pending.items() if not update.final),
+            next(iter(self._pending)),
+        )
+        del self._pending[victim]
+        self.dropped += 1
+        if self.dropped == 1 or self.dropped % 100 == 0:
+            logger.warning(f"transcription queue full, dropped {self.dropped} updates")
+
+    async def _run(self) -> None:
+        while not self._closed or self._pending:
+            await self._wakeup.wait()
+            if self._interval > 0 and not self._closed:
+                await asyncio.sleep(self._interval)
+            self._wakeup.clear()
+            batch, self._pending = self._pending, OrderedDict()
+            await self._publish(batch)
+
+    async def _publish(self, batch: OrderedDict[str, _Update]) -> None:
+        # one Transcription per participant track, segments in queue order
+        grouped: dict[tuple[str, str], list[rtc.TranscriptionSegment]] = {}
+        for segment_id, update in batch.items():
+            grouped.setdefault(
+                (update.participant_identity, update.track_sid), []
+            ).append(
+                rtc.TranscriptionSegment(
+                    id=segment_id,
+                    text=update.text,
+                    start_time=0,
+                    end_time=0,
+                    language="en",
+                    final=update.final,
+                )
+            )
+        for (identity, track_sid), segments in grouped.items():
+            try:
+                await self._room.local_participant.publish_transcription(
+                    rtc.Transcription(
+                        participant_identity=identity,
+                        track_sid=track_sid,
+                        segments=segments,
+                    )
+                )
+                self.published += 1
+            except PublishTranscriptionError as e:
+                logger.warning(f"publishing transcription failed: {e}")
+
+    async def aclose(self) -> None:
+        """Publish what is queued, then stop."""
+        if self._closed:
+            return
+        self._closed = True
+        for event in _TRACK_EVENTS:
+            self._room.off(event, self._invalidate)
+        self._wakeup.set()
+        await self._task
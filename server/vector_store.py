@@ -0,0 +1,504 @@
+"""Vector store backends used by ingest and retrieval.
+
+Both backends accept the subset of the Pinecone ``Index`` API we use
+(``upsert`` / ``delete`` / ``query`` with namespaces), so callers don't care
+which one they talk to. Select one with ``VECTOR_BACKEND=pinecone|local``.
+
+The local backend keeps each namespace in a float32 (or, with
+``dtype="float16"``, float16) NumPy matrix, persisted as a raw ``vectors.f32``
+/ ``vectors.f16`` file that is memory-mapped on load, and answers queries with
+an exact brute-force top-k over normalized dot products (cosine, like the
+Pinecone index). With ``quantization="int8"`` the search runs over int8 codes
+(decoded block-wise) and only the best candidates are rescored against the
+stored rows, so the full-precision matrix can stay on disk; this trades some
+CPU for a 4x smaller resident index.
+
+:func:`open_vector_store` takes an :class:`~embeddings.EmbeddingProfile`: it
+picks the local storage from it and rejects vectors whose dimension does not
+match the profile (and, for Pinecone, an index of another dimension).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from collections.abc import Sequence
+from typing import Any, Protocol
+
+import numpy as np
+
+from embeddings import DATA_DIR, EmbeddingProfile
+
+logger = logging.getLogger("overlap-vector-store")
+
+
+class VectorStore(Protocol):
+    def upsert(self, vectors: Sequence[Any], namespace: str | None = None) -> Any: ...
+
+    def delete(self, ids: list[str], namespace: str | None = None) -> Any: ...
+
+    def query(
+        self,
+        *,
+        vector: Sequence[float],
+        top_k: int,
+        namespace: str | None = None,
+        include_metadata: bool = True,
+        filter: dict | None = None,
+    ) -> Any: ...
+
+    def flush(self) -> None: ...
+
+
+class PineconeStore:
+    """Thin adapter over a Pinecone ``Index``."""
+
+    def __init__(self, index: Any):
+        self._index = index
+
+    def upsert(self, vectors: Sequence[Any], namespace: str | None = None) -> Any:
+        return self._index.upsert(vectors, namespace=namespace)
+
+    def delete(self, ids: list[str], namespace: str | None = None) -> Any:
+        return self._index.delete(ids=ids, namespace=namespace)
+
+    def query(
+        self,
+        *,
+        vector: Sequence[float],
+        top_k: int,
+        namespace: str | None = None,
+        include_metadata: bool = True,
+        filter: dict | None = None,
+    ) -> Any:
+        return self._index.query(
+            vector=vector,
+            top_k=top_k,
+            namespace=namespace,
+            include_metadata=include_metadata,
+            filter=filter,
+        )
+
+    def flush(self) -> None:
+        pass
+
+
+def _as_record(vector: Any) -> tuple[str, Sequence[float], dict]:
+    if isinstance(vector, dict):
+        return vector["id"], vector["values"], vector.get("metadata") or {}
+    if len(vector) == 2:
+        return vector[0], vector[1], {}
+    return vector[0], vector[1], vector[2] or {}
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _quantize(matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.rint(matrix / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+_VECTOR_FILES = {"float32": "vectors.f32", "float16": "vectors.f16"}
+
+
+class _Namespace:
+    def __init__(self, dim: int, dtype: str = "float32"):
+        self.dim = dim
+        self.dtype = dtype
+        self.ids: list[str] = []
+        self.rows: dict[str, int] = {}
+        self.metadata: list[dict] = []
+        self.matrix = np.zeros((0, dim), dtype=dtype)
+        self.codes: np.ndarray | None = None
+        self.scales: np.ndarray | None = None
+        self.columns: dict[str, np.ndarray] = {}
+        self.dirty = False
+        self.mtime_ns = 0
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    def changed(self) -> None:
+        self.dirty = True
+        self.codes = self.scales = None
+        self.columns.clear()
+
+    def column(self, field: str) -> np.ndarray:
+        """Metadata ``field`` of every row as an array, for vectorized filters"""
+        column = self.columns.get(field)
+        if column is None:
+            values = [m.get(field) for m in self.metadata]
+            try:
+                column = np.array(values, dtype=np.float64)
+            except (TypeError, ValueError):
+                column = np.array(values, dtype=object)
+            self.columns[field] = column
+        return column
+
+    def writable(self) -> None:
+        # memory-mapped matrices are read-only, copy before the first write
+        if not self.matrix.flags.writeable:
+            self.matrix = np.array(self.matrix)
+
+    def reserve(self, rows: int) -> None:
+        self.writable()
+        if rows <= self.matrix.shape[0]:
+            return
+        grown = np.zeros(
+            (max(rows, 2 * self.matrix.shape[0], 64), self.dim), self.dtype
+        )
+        grown[: self.size] = self.matrix[: self.size]
+        self.matrix = grown
+
+
+class LocalVectorStore:
+    """In-process vector index with memory-mapped persistence.
+
+    Parameters
+    ----------
+    directory
+        Where namespaces are persisted, one sub-directory each. ``None`` keeps
+        everything in memory.
+    quantization
+        ``"none"`` or ``"int8"``.
+    rescore_factor
+        With int8 quantization, ``top_k * rescore_factor`` candidates are
+        rescored against the stored rows.
+    dtype
+        ``"float32"`` or ``"float16"``, how new namespaces store their rows.
+        Existing namespaces keep the type they were saved with.
+    """
+
+    def __init__(
+        self,
+        directory: str | None,
+        *,
+        quantization: str = "none",
+        rescore_factor: int = 4,
+        dtype: str = "float32",
+    ):
+        if quantization not in ("none", "int8"):
+            raise ValueError(f"unsupported quantization: {quantization}")
+        if dtype not in _VECTOR_FILES:
+            raise ValueError(f"unsupported dtype: {dtype}")
+        self._dir = directory
+        self._dtype = dtype
+        self._quantization = quantization
+        self._rescore_factor = rescore_factor
+        self._namespaces: dict[str, _Namespace] = {}
+        self._lock = threading.RLock()
+
+    def _ns_dir(self, namespace: str) -> str:
+        assert self._dir is not None
+        return os.path.join(self._dir, namespace or "__default__")
+
+    def _namespace(
+        self, namespace: str | None, dim: int | None = None
+    ) -> _Namespace | None:
+        name = namespace or ""
+        ns = self._namespaces.get(name)
+        if self._dir is not None and (ns is None or not ns.dirty):
+            loaded = self._load(name, ns)
+            if loaded is not None:
+                ns = self._namespaces[name] = loaded
+        if ns is None and dim is not None:
+            ns = self._namespaces[name] = _Namespace(dim, self._dtype)
+        return ns
+
+    def _load(self, name: str, current: _Namespace | None) -> _Namespace | None:
+        path = self._ns_dir(name)
+        meta_path = os.path.join(path, "index.json")
+        try:
+            mtime_ns = os.stat(meta_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if current is not None and current.mtime_ns == mtime_ns:
+            return None
+
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        ns = _Namespace(meta["dim"], meta.get("dtype", "float32"))
+        ns.ids = meta["ids"]
+        ns.metadata = meta["metadata"]
+        ns.rows = {vector_id: row for row, vector_id in enumerate(ns.ids)}
+        if ns.size:
+            matrix = np.memmap(
+                os.path.join(path, _VECTOR_FILES[ns.dtype]), dtype=ns.dtype, mode="r"
+            )
+            if matrix.size != ns.size * ns.dim:
+                # a writer is between replacing the two files, keep what we have
+                logger.warning("namespace %s is mid-update, not reloading", name)
+                return None
+            ns.matrix = matrix.reshape(ns.size, ns.dim)
+        ns.mtime_ns = mtime_ns
+        return ns
+
+    def upsert(self, vectors: Sequence[Any], namespace: str | None = None) -> dict:
+        records = [_as_record(v) for v in vectors]
+        if not records:
+            return {"upserted_count": 0}
+
+        values = _normalize(np.asarray([r[1] for r in records], dtype=np.float32))
+        with self._lock:
+            ns = self._namespace(namespace, dim=values.shape[1])
+            assert ns is not None
+            if values.shape[1] != ns.dim:
+                raise ValueError(
+                    f"vector dimension {values.shape[1]} does not match "
+                    f"namespace dimension {ns.dim}"
+                )
+            ns.reserve(ns.size + len(records))
+            for (vector_id, _, metadata), row_values in zip(records, values):
+                row = ns.rows.get(vector_id)
+                if row is None:
+                    row = ns.rows[vector_id] = ns.size
+                    ns.ids.append(vector_id)
+                    ns.metadata.append(metadata)
+                else:
+                    ns.metadata[row] = metadata
+                ns.matrix[row] = row_values
+            ns.changed()
+        return {"upserted_count": len(records)}
+
+    def delete(self, ids: list[str], namespace: str | None = None) -> dict:
+        with self._lock:
+            ns = self._namespace(namespace)
+            if ns is None:
+                return {}
+            ns.writable()
+            for vector_id in ids:
+                row = ns.rows.pop(vector_id, None)
+                if row is None:
+                    continue
+                # move the last row into the hole
+                last = ns.size - 1
+                if row != last:
+                    moved = ns.ids[last]
+                    ns.ids[row], ns.metadata[row] = moved, ns.metadata[last]
+                    ns.matrix[row] = ns.matrix[last]
+                    ns.rows[moved] = row
+                ns.ids.pop()
+                ns.metadata.pop()
+            ns.changed()
+        return {}
+
+    def query(
+        self,
+        *,
+        vector: Sequence[float],
+        top_k: int,
+        namespace: str | None = None,
+        include_metadata: bool = True,
+        filter: dict | None = None,
+    ) -> dict:
+        """Exact top-k by cosine similarity.
+
+        ``filter`` uses Pinecone's metadata filter syntax; supported operators
+        are ``$eq $ne $gt $gte $lt $lte $in $nin`` and a top-level ``$and``.
+        """
+        query = _normalize(np.asarray(vector, dtype=np.float32))
+        with self._lock:
+            ns = self._namespace(namespace)
+            if ns is None or ns.size == 0:
+                return {"matches": [], "namespace": namespace or ""}
+            if query.shape[0] != ns.dim:
+                raise ValueError(
+                    f"query dimension {query.shape[0]} does not match "
+                    f"namespace dimension {ns.dim}"
+                )
+
+            matrix = ns.matrix[: ns.size]
+            allowed = None
+            if filter:
+                allowed = np.flatnonzero(_filter_mask(ns, filter))
+                matrix = matrix[allowed]
+            size = matrix.shape[0]
+            k = min(top_k, size)
+
+            if size == 0:
+                rows, scores = np.empty(0, np.int64), np.empty(0, np.float32)
+            elif self._quantization == "int8" and allowed is None:
+                if ns.codes is None or ns.scales is None:
+                    # quantized lazily so bulk upserts don't re-quantize every chunk
+                    ns.codes, ns.scales = _quantize(matrix)
+                approx = _block_scores(ns.codes, query) * ns.scales
+                candidates = _top_k(approx, min(size, k * self._rescore_factor))
+                scores = matrix[candidates].astype(np.float32) @ query
+                order = np.argsort(-scores)[:k]
+                rows, scores = candidates[order], scores[order]
+            else:
+                # filtered subsets are small, score them exactly
+                all_scores = _block_scores(matrix, query)
+                rows = _top_k(all_scores, k)
+                scores = all_scores[rows]
+
+            if allowed is not None:
+                rows = allowed[rows]
+
+            matches = []
+            for row, score in zip(rows.tolist(), scores.tolist()):
+                match: dict[str, Any] = {"id": ns.ids[row], "score": score}
+                if include_metadata:
+                    match["metadata"] = ns.metadata[row]
+                matches.append(match)
+        return {"matches": matches, "namespace": namespace or ""}
+
+    def flush(self) -> None:
+        """Persist dirty namespaces. Readers in other processes pick them up."""
+        if self._dir is None:
+            return
+        with self._lock:
+            for name, ns in self._namespaces.items():
+                if ns.dirty:
+                    self._save(name, ns)
+
+    def _save(self, name: str, ns: _Namespace) -> None:
+        path = self._ns_dir(name)
+        os.makedirs(path, exist_ok=True)
+        vectors_path = os.path.join(path, _VECTOR_FILES[ns.dtype])
+        meta_path = os.path.join(path, "index.json")
+
+        ns.matrix[: ns.size].tofile(f"{vectors_path}.tmp")
+        with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "dim": ns.dim,
+                    "dtype": ns.dtype,
+                    "ids": ns.ids,
+                    "metadata": ns.metadata,
+                },
+                f,
+                separators=(",", ":"),
+            )
+        os.replace(f"{vectors_path}.tmp", vectors_path)
+        os.replace(f"{meta_path}.tmp", meta_path)
+        ns.dirty = False
+        ns.mtime_ns = os.stat(meta_path).st_mtime_ns
+
+
+_FILTER_OPS = {
+    "$eq": lambda column, value: column == value,
+    "$ne": lambda column, value: column != value,
+    "$gt": lambda column, value: column > value,
+    "$gte": lambda column, value: column >= value,
+    "$lt": lambda column, value: column < value,
+    "$lte": lambda column, value: column <= value,
+    "$in": lambda column, value: np.isin(column, list(value)),
+    "$nin": lambda column, value: ~np.isin(column, list(value)),
+}
+
+
+def _filter_mask(ns: _Namespace, filter: dict) -> np.ndarray:
+    mask = np.ones(ns.size, dtype=bool)
+    for field, condition in filter.items():
+        if field == "$and":
+            for sub in condition:
+                mask &= _filter_mask(ns, sub)
+            continue
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        column = ns.column(field)
+        for op, value in condition.items():
+            if op not in _FILTER_OPS:
+                raise ValueError(f"unsupported filter operator: {op}")
+            with np.errstate(invalid="ignore"):
+                mask &= np.asarray(_FILTER_OPS[op](column, value), dtype=bool)
+    return mask
+
+
+def _block_scores(
+    matrix: np.ndarray, query: np.ndarray, block: int = 8192
+) -> np.ndarray:
+    """``matrix @ query`` in float32 for float32, float16 or int8 rows."""
+    if matrix.dtype == np.float32:
+        return matrix @ query
+    # decode block by block so the float32 temporary stays small
+    scores = np.empty(matrix.shape[0], dtype=np.float32)
+    for start in range(0, matrix.shape[0], block):
+        part = matrix[start : start + block].astype(np.float32)
+        scores[start : start + block] = part @ query
+    return scores
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    if k >= scores.shape[0]:
+        return np.argsort(-scores)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+class ProfiledStore:
+    """Rejects vectors whose dimension differs from the embedding profile."""
+
+    def __init__(self, store: VectorStore, profile: EmbeddingProfile):
+        self._store = store
+        self.profile = profile
+
+    def _check(self, vector: Sequence[float]) -> None:
+        if len(vector) != self.profile.dimensions:
+            raise ValueError(
+                f"{len(vector)}-dimensional vector does not match embedding "
+                f"profile {self.profile.key}"
+            )
+
+    def upsert(self, vectors: Sequence[Any], namespace: str | None = None) -> Any:
+        for vector in vectors:
+            self._check(_as_record(vector)[1])
+        return self._store.upsert(vectors, namespace=namespace)
+
+    def delete(self, ids: list[str], namespace: str | None = None) -> Any:
+        return self._store.delete(ids, namespace=namespace)
+
+    def query(self, *, vector: Sequence[float], **kwargs) -> Any:
+        self._check(vector)
+        return self._store.query(vector=vector, **kwargs)
+
+    def flush(self) -> None:
+        self._store.flush()
+
+
+def open_vector_store(
+    index_name: str | None = None, profile: EmbeddingProfile | None = None
+) -> VectorStore:
+    """Build the backend selected by ``VECTOR_BACKEND`` (default: pinecone).
+
+    With a ``profile`` the local backend stores vectors as the profile says,
+    and every upsert and query is checked against its dimensions.
+    """
+    backend = os.getenv("VECTOR_BACKEND", "pinecone")
+    if backend == "local":
+        storage = profile.storage if profile else "float32"
+        store: VectorStore = LocalVectorStore(
+            os.getenv("LOCAL_INDEX_DIR", os.path.join(DATA_DIR, "index")),
+            quantization="int8"
+            if storage == "int8"
+            else os.getenv("LOCAL_INDEX_QUANTIZATION", "none"),
+            dtype="float32" if storage == "float32" else "float16",
+        )
+    elif backend == "pinecone":
+        from pinecone import Pinecone
+
+        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+        index_name = index_name or os.getenv("PINECONE_INDEX")
+        index = pc.Index(index_name)
+        if profile is not None:
+            # a Pinecone index has one dimension for all of its namespaces
+            dimension = index.describe_index_stats()["dimension"]
+            if dimension != profile.dimensions:
+                raise ValueError(
+                    f"Pinecone index {index_name!r} has {dimension} dimensions, "
+                    f"embedding profile {profile.key} needs {profile.dimensions}"
+                )
+        store = PineconeStore(index)
+    else:
+        raise ValueError(f"unknown VECTOR_BACKEND: {backend}")
+    return ProfiledStore(store, profile) if profile is not None else store
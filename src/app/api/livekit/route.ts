@@ -4,6 +4,7 @@ export async function POST(request: Request) {
   const {
     instructions,
     openaiAPIKey,
+    videoId,
     sessionConfig: {
       turnDetection,
       modalities,
@@ -32,6 +33,7 @@ export async function POST(request: Request) {
       temperature: temperature,
       max_output_tokens: maxOutputTokens,
       openai_api_key: openaiAPIKey,
+      video_id: videoId,
       turn_detection: JSON.stringify({
         type: turnDetection,
         threshold: vadThreshold,
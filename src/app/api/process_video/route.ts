@@ -13,15 +13,18 @@ export async function POST(request: Request) {
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ videoId }),
+            body: JSON.stringify({ videoId, stream: true }),
         });
 
-        if (!response.ok) {
+        if (!response.ok || !response.body) {
             throw new Error('Failed to process video');
         }
 
-        const data = await response.json();
-        return NextResponse.json(data, { status: 200 });
+        // pass the NDJSON events through as they arrive
+        return new Response(response.body, {
+            status: 200,
+            headers: { 'Content-Type': 'application/x-ndjson', 'Cache-Control': 'no-cache' },
+        });
     } catch (error) {
         console.error('Error processing video:', error);
         return NextResponse.json({ error: 'Failed to process video' }, { status: 500 });
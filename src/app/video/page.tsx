@@ -10,11 +10,15 @@ import { CaptionItem } from '@/types/interfaces';
 
 const VideoPage = () => {
     const [loading, setLoading] = useState(true);
-    const [transcript, setTranscript] = useState([]);
+    const [transcript, setTranscript] = useState<CaptionItem[]>([]);
     const searchParams = useSearchParams();
     const url = searchParams.get('url');
     const videoId = url ? extractVideoId(url) : null;
-    const { setSummary } = useTranscript();
+    const { setSummary, setVideoId } = useTranscript();
+
+    useEffect(() => {
+        setVideoId(videoId);
+    }, [videoId, setVideoId]);
 
     useEffect(() => {
         const processVideo = async () => {
@@ -27,18 +31,40 @@ const VideoPage = () => {
                     body: JSON.stringify({ videoId }),
                 });
 
-                if (!response.ok) {
+                if (!response.ok || !response.body) {
                     throw new Error('Failed to process video');
                 }
 
-                const data = await response.json();
-                if (data.status === 'success') {
-                    setTranscript(data.transcript);
-                    setSummary(data.summary);
-                    setLoading(false);
-                } else {
-                    throw new Error('Processing failed');
+                // one JSON event per line: transcript pages, progress, summary deltas
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let buffered = '';
+                let summary = '';
+                setTranscript([]);
+                setSummary('');
+                while (true) {
+                    const { done, value } = await reader.read();
+                    if (done) break;
+                    buffered += decoder.decode(value, { stream: true });
+                    const lines = buffered.split('\n');
+                    buffered = lines.pop() ?? '';
+                    for (const line of lines) {
+                        if (!line.trim()) continue;
+                        const event = JSON.parse(line);
+                        if (event.type === 'transcript') {
+                            setTranscript((prev) => [...prev, ...event.entries]);
+                            setLoading(false);
+                        } else if (event.type === 'summary') {
+                            summary += event.delta;
+                            setSummary(summary);
+                        } else if (event.type === 'done') {
+                            setSummary(event.summary);
+                        } else if (event.type === 'error') {
+                            throw new Error(event.error);
+                        }
+                    }
                 }
+                setLoading(false);
             } catch (error) {
                 console.error('Error processing video:', error);
                 setLoading(false);
@@ -2,6 +2,12 @@ import { cn } from "@/lib/utils";
 import { useAgent } from "@/hooks/use-agent";
 import { useEffect, useRef, RefObject, useState } from "react";
 
+function formatTimestamp(seconds: number) {
+  const minutes = Math.floor(seconds / 60);
+  const rest = Math.floor(seconds % 60);
+  return `${String(minutes).padStart(2, "0")}:${String(rest).padStart(2, "0")}`;
+}
+
 export function Transcript({
   scrollContainerRef,
   scrollButtonRef,
@@ -9,7 +15,7 @@ export function Transcript({
   scrollContainerRef: RefObject<HTMLElement>;
   scrollButtonRef: RefObject<HTMLButtonElement>;
 }) {
-  const { displayTranscriptions } = useAgent();
+  const { displayTranscriptions, retrievedContext } = useAgent();
   const transcriptEndRef = useRef<HTMLDivElement>(null);
   const [showScrollButton, setShowScrollButton] = useState(false);
   const calculateDistanceFromBottom = (container: HTMLElement) => {
@@ -98,6 +104,16 @@ export function Transcript({
                   </div>
                 ),
             )}
+            {retrievedContext && retrievedContext.citations.length > 0 && (
+              <div className="max-w-[75%] rounded-lg bg-neutral-50 px-3 py-2 text-xs text-gray-600">
+                <div className="mb-1 font-semibold">Sources</div>
+                {retrievedContext.citations.map((citation) => (
+                  <div key={citation.id} className="truncate">
+                    [{formatTimestamp(citation.start)}] {citation.text}
+                  </div>
+                ))}
+              </div>
+            )}
             <div ref={transcriptEndRef} />
           </div>
         )}
@@ -11,7 +11,7 @@ export default function Video({ url, transcript }: VideoProps) {
   const [currentTime, setCurrentTime] = useState(0);
   const playerRef = useRef<YouTube>(null);
   const timerRef = useRef<NodeJS.Timeout | null>(null);
-  const { isPaused, setIsPaused } = useVideo();
+  const { isPaused, setIsPaused, playbackPositionRef } = useVideo();
 
   useEffect(() => {
     if (typeof url === 'string') {
@@ -60,7 +60,9 @@ export default function Video({ url, transcript }: VideoProps) {
     if (playerRef.current) {
       const player = playerRef.current.getInternalPlayer();
       if (player && typeof player.getCurrentTime === 'function') {
-        setCurrentTime(player.getCurrentTime());
+        const time = player.getCurrentTime();
+        setCurrentTime(time);
+        playbackPositionRef.current = time;
       }
     }
   };
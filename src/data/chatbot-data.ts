@@ -22,4 +22,5 @@ export interface ChatbotData {
     selectedPresetId: string | null;
     openaiAPIKey: string | null | undefined;
     instructions: string;
+    videoId?: string | null;
   }
\ No newline at end of file
@@ -5,15 +5,18 @@ import React, { createContext, useState, useContext } from 'react';
 type TranscriptContextType = {
   summary: string;
   setSummary: (summary: string) => void;
+  videoId: string | null;
+  setVideoId: (videoId: string | null) => void;
 };
 
 const TranscriptContext = createContext<TranscriptContextType | undefined>(undefined);
 
 export const TranscriptProvider: React.FC<{ children: React.ReactNode }> = ({ children }) => {
   const [summary, setSummary] = useState('');
+  const [videoId, setVideoId] = useState<string | null>(null);
 
   return (
-    <TranscriptContext.Provider value={{ summary, setSummary }}>
+    <TranscriptContext.Provider value={{ summary, setSummary, videoId, setVideoId }}>
       {children}
     </TranscriptContext.Provider>
   );
@@ -1,17 +1,20 @@
-import React, { createContext, useContext, useState } from 'react';
+import React, { createContext, useContext, useRef, useState } from 'react';
 
 interface VideoContextType {
   isPaused: boolean;
   setIsPaused: (isPaused: boolean) => void;
+  // player time in seconds; a ref so the 100ms timer doesn't re-render consumers
+  playbackPositionRef: React.MutableRefObject<number>;
 }
 
 const VideoContext = createContext<VideoContextType | undefined>(undefined);
 
 export function VideoProvider({ children }: { children: React.ReactNode }) {
   const [isPaused, setIsPaused] = useState(false);
+  const playbackPositionRef = useRef(0);
 
   return (
-    <VideoContext.Provider value={{ isPaused, setIsPaused }}>
+    <VideoContext.Provider value={{ isPaused, setIsPaused, playbackPositionRef }}>
       {children}
     </VideoContext.Provider>
   );
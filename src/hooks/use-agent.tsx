@@ -4,6 +4,7 @@ import {
   useVoiceAssistant,
 } from "@livekit/components-react";
 import {
+  ConnectionState,
   RoomEvent,
   TranscriptionSegment,
   Participant,
@@ -11,6 +12,7 @@ import {
   RemoteParticipant,
 } from "livekit-client";
 import { useConnection } from "@/hooks/use-connection";
+import { useVideo } from "@/hooks/VideoContext";
 
 interface Transcription {
   segment: TranscriptionSegment;
@@ -18,8 +20,33 @@ interface Transcription {
   publication?: TrackPublication;
 }
 
+export interface Citation {
+  id: string;
+  start: number;
+  end: number;
+  text: string;
+  score: number;
+}
+
+// sent by the agent on the "overlap-context" data topic after each retrieval
+export interface RetrievedContext {
+  video_id: string | null;
+  question: string;
+  // id of the context injected into the session for this question
+  context_id: string;
+  citations: Citation[];
+}
+
+const CONTEXT_TOPIC = "overlap-context";
+
+// the agent prefetches the transcript around the "playback_position" attribute;
+// republished when the player moved this many seconds (playback or a seek)
+const PLAYBACK_POSITION_STEP = 5;
+const PLAYBACK_POSITION_POLL_MS = 1000;
+
 interface AgentContextType {
   displayTranscriptions: Transcription[];
+  retrievedContext?: RetrievedContext;
   agent?: RemoteParticipant;
 }
 
@@ -29,12 +56,16 @@ export function AgentProvider({ children }: { children: React.ReactNode }) {
   const room = useMaybeRoomContext();
   const { shouldConnect } = useConnection();
   const { agent } = useVoiceAssistant();
+  const { playbackPositionRef } = useVideo();
   const [rawSegments, setRawSegments] = useState<{
     [id: string]: Transcription;
   }>({});
   const [displayTranscriptions, setDisplayTranscriptions] = useState<
     Transcription[]
   >([]);
+  const [retrievedContext, setRetrievedContext] = useState<
+    RetrievedContext | undefined
+  >();
 
   useEffect(() => {
     if (!room) {
@@ -53,13 +84,59 @@ export function AgentProvider({ children }: { children: React.ReactNode }) {
         return newSegments;
       });
     };
+    const updateRetrievedContext = (
+      payload: Uint8Array,
+      participant?: RemoteParticipant,
+      kind?: unknown,
+      topic?: string,
+    ) => {
+      if (topic !== CONTEXT_TOPIC) {
+        return;
+      }
+      try {
+        setRetrievedContext(JSON.parse(new TextDecoder().decode(payload)));
+      } catch (error) {
+        console.error("Invalid retrieved context message:", error);
+      }
+    };
     room.on(RoomEvent.TranscriptionReceived, updateRawSegments);
+    room.on(RoomEvent.DataReceived, updateRetrievedContext);
 
     return () => {
       room.off(RoomEvent.TranscriptionReceived, updateRawSegments);
+      room.off(RoomEvent.DataReceived, updateRetrievedContext);
     };
   }, [room]);
 
+  useEffect(() => {
+    if (!room) {
+      return;
+    }
+    let published: number | null = null;
+    const timer = setInterval(() => {
+      if (room.state !== ConnectionState.Connected) {
+        published = null;
+        return;
+      }
+      const position = playbackPositionRef.current;
+      if (
+        published !== null &&
+        Math.abs(position - published) < PLAYBACK_POSITION_STEP
+      ) {
+        return;
+      }
+      published = position;
+      room.localParticipant
+        .setAttributes({ playback_position: position.toFixed(1) })
+        .catch((error) => {
+          published = null;
+          console.error("Publishing the playback position failed:", error);
+        });
+    }, PLAYBACK_POSITION_POLL_MS);
+
+    return () => clearInterval(timer);
+  }, [room, playbackPositionRef]);
+
   useEffect(() => {
     const sorted = Object.values(rawSegments).sort(
       (a, b) =>
@@ -104,11 +181,12 @@ export function AgentProvider({ children }: { children: React.ReactNode }) {
     if (shouldConnect) {
       setRawSegments({});
       setDisplayTranscriptions([]);
+      setRetrievedContext(undefined);
     }
   }, [shouldConnect]);
 
   return (
-    <AgentContext.Provider value={{ displayTranscriptions, agent }}>
+    <AgentContext.Provider value={{ displayTranscriptions, retrievedContext, agent }}>
       {children}
     </AgentContext.Provider>
   );
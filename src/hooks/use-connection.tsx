@@ -34,7 +34,7 @@ const ConnectionContext = createContext<TokenGeneratorData | undefined>(
 export const ConnectionProvider = ({ children }: {
   children: React.ReactNode;
 }) => {
-  const { summary } = useTranscript();
+  const { summary, videoId } = useTranscript();
   const [connectionDetails, setConnectionDetails] = useState<{
     wsUrl: string;
     token: string;
@@ -48,6 +48,7 @@ export const ConnectionProvider = ({ children }: {
       Here's a summary of what you need to know: ${summary}. Wait for the user to speak first.
       `,
     openaiAPIKey: process.env.OPENAI_API_KEY,
+    videoId,
     sessionConfig: {
       model: ModelId.gpt_4o_realtime,
       transcriptionModel: TranscriptionModelId.whisper1,